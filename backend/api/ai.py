@@ -10,17 +10,19 @@
     AI_DEFAULT_STT_MODEL / AI_DEFAULT_TTS_MODEL / AI_DEFAULT_TTS_VOICE — 可选兜底
 
 用户级 model 选择在前端 Settings，经 body 传入（frontend/src/shared/services/aiModelPrefs.ts）
+ASGI 模式下 /chat 由 backend/api/streaming.py 以协程处理（共用这里的请求构造与 SSE 格式）。
 """
 import base64
 import io
 import json
 import logging
 import os
-from typing import Any
+from typing import Any, Iterator, Tuple
 
 import requests
 from flask import Blueprint, Response, g, request, stream_with_context
 
+from backend.exceptions import AppError
 from backend.utils.response import api_error, api_success
 
 logger = logging.getLogger(__name__)
@@ -70,39 +72,60 @@ def _mime_to_filename(mime: str) -> str:
 # /api/ai/chat — LLM 代理 (同步 + 流式)
 # ──────────────────────────────────────────────────────────
 
-@ai_bp.route("/chat", methods=["POST"])
-def chat():
+def build_chat_request(data: Any) -> Tuple[str, dict, dict]:
+    """校验并构造上游请求 → (upstream_url, headers, body)；不合法时抛 AppError"""
     try:
         base_url = _base_url()
         api_key = _api_key()
     except RuntimeError as e:
-        return api_error(str(e), 500)
+        raise AppError(str(e), 500)
 
-    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        data = {}
 
     # 白名单过滤
     body: dict[str, Any] = {k: v for k, v in data.items() if k in ALLOWED_CHAT_FIELDS}
     if "messages" not in body or not isinstance(body["messages"], list):
-        return api_error("messages 字段必填且必须为数组", 400)
+        raise AppError("messages 字段必填且必须为数组", 400)
 
     # model 兜底
     model = body.get("model")
     if not isinstance(model, str) or not model.strip():
         default_model = os.environ.get("AI_DEFAULT_MODEL")
         if not default_model:
-            return api_error("AI_DEFAULT_MODEL not configured", 500)
+            raise AppError("AI_DEFAULT_MODEL not configured", 500)
         body["model"] = default_model
     else:
         body["model"] = model.strip()
 
-    stream = bool(body.get("stream"))
     upstream_url = f"{base_url}/chat/completions"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}",
     }
+    return upstream_url, headers, body
+
 
-    if stream:
+def sse_error_events(message: str) -> Iterator[str]:
+    """流式请求失败时返回给客户端的 SSE 片段"""
+    payload = json.dumps({"error": message}, ensure_ascii=False)
+    yield f"data: {payload}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def sse_relay_line(raw_line: str) -> str:
+    """上游 SSE 的一行原样透传（空行即事件分隔）"""
+    return f"{raw_line}\n\n" if raw_line else "\n"
+
+
+@ai_bp.route("/chat", methods=["POST"])
+def chat():
+    try:
+        upstream_url, headers, body = build_chat_request(request.get_json(silent=True))
+    except AppError as e:
+        return api_error(e.message, e.code)
+
+    if body.get("stream"):
         return _stream_chat(upstream_url, headers, body)
 
     try:
@@ -129,35 +152,27 @@ def _stream_chat(upstream_url: str, headers: dict, body: dict):
         )
     except requests.RequestException as e:
         logger.error("AI chat stream upstream request failed: %s", e)
-
-        def err_gen():
-            payload = json.dumps({"error": f"上游请求失败: {e}"}, ensure_ascii=False)
-            yield f"data: {payload}\n\n"
-            yield "data: [DONE]\n\n"
-
-        return Response(stream_with_context(err_gen()), mimetype="text/event-stream")
+        return Response(
+            stream_with_context(sse_error_events(f"上游请求失败: {e}")),
+            mimetype="text/event-stream",
+        )
 
     if not upstream.ok:
         status = upstream.status_code
         detail = upstream.text[:300]
         upstream.close()
         logger.warning("AI chat stream upstream %s: %s", status, detail)
-
-        def err_gen():
-            payload = json.dumps(
-                {"error": f"上游返回 {status}: {detail}"}, ensure_ascii=False
-            )
-            yield f"data: {payload}\n\n"
-            yield "data: [DONE]\n\n"
-
-        return Response(stream_with_context(err_gen()), mimetype="text/event-stream")
+        return Response(
+            stream_with_context(sse_error_events(f"上游返回 {status}: {detail}")),
+            mimetype="text/event-stream",
+        )
 
     def sse_gen():
         try:
             for raw_line in upstream.iter_lines(decode_unicode=True):
                 if raw_line is None:
                     continue
-                yield f"{raw_line}\n\n" if raw_line else "\n"
+                yield sse_relay_line(raw_line)
         except GeneratorExit:
             logger.info("AI chat stream client disconnected (user=%s)", g.user_id)
         finally:
@@ -7,6 +7,7 @@
 import json
 import time
 import logging
+from typing import List
 
 from flask import Blueprint, Response, g, jsonify, request, stream_with_context
 
@@ -61,65 +62,107 @@ def get_status():
     return api_success(generation_service.get_status_for_user(g.user_id))
 
 
+class ProgressEvents:
+    """
+    进度 SSE 的推送逻辑（Flask 生成器与 ASGI 协程共用）
+
+    每次 poll() 取一份状态快照，返回需要推送的 SSE 片段；
+    无活跃任务或空闲超时后 done 为 True。两次 poll() 之间应等待状态变化：
+    wait_for_change(user_id, version, wait_timeout())，再等待 coalesce_delay()。
+    """
+
+    MAX_IDLE_SECONDS = 300  # 5 分钟无变化则断开
+    HEARTBEAT_INTERVAL = 15  # 每 15 秒心跳，用于检测客户端断连
+    MIN_PUSH_INTERVAL = 0.5  # 两次推送的最小间隔，期间的多次变化合并为一次
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.version = 0
+        self.done = False
+        self.prev_status = {}
+        self.last_change = time.monotonic()
+        self.last_heartbeat = time.monotonic()
+        self.last_poll = 0.0
+
+    def poll(self) -> List[str]:
+        # 先取版本号再取快照：快照之后的变化会使随后的等待立即返回
+        self.version = generation_service.change_version(self.user_id)
+        current = generation_service.get_status_for_user(self.user_id)
+        events = []
+
+        # 推送有变化的任务状态
+        changed = {}
+        for rt, status in current.items():
+            if status != self.prev_status.get(rt):
+                changed[rt] = status
+
+        if changed:
+            self.last_change = time.monotonic()
+
+            # 检查终态事件
+            for rt, status in changed.items():
+                s = status["status"]
+                if s in ("completed", "stopped", "error"):
+                    event_type = s if s != "error" else "error"
+                    events.append(f"event: {event_type}\ndata: {json.dumps({'relation_type': rt, **status})}\n\n")
+
+            # 汇总进度事件
+            running = {
+                rt: st for rt, st in current.items() if st["status"] == "running"
+            }
+            if running:
+                events.append(f"event: progress\ndata: {json.dumps(running)}\n\n")
+        self.prev_status = current
+
+        now = self.last_poll = time.monotonic()
+
+        # 心跳：SSE 注释格式，客户端忽略，但触发 TCP 写入以检测断连
+        if now - self.last_heartbeat >= self.HEARTBEAT_INTERVAL:
+            events.append(":heartbeat\n\n")
+            self.last_heartbeat = now
+
+        # 超时断开
+        if now - self.last_change >= self.MAX_IDLE_SECONDS:
+            events.append(f"event: done\ndata: {json.dumps({'message': 'idle timeout'})}\n\n")
+            self.done = True
+
+        # 用已获取的 current 快照判断是否还有活跃任务
+        elif not any(s["status"] == "running" for s in current.values()):
+            events.append(f"event: done\ndata: {json.dumps({'message': 'no active tasks'})}\n\n")
+            self.done = True
+
+        return events
+
+    def wait_timeout(self) -> float:
+        """等待状态变化的最长时间（到下一次心跳或空闲超时）"""
+        now = time.monotonic()
+        return max(0.0, min(
+            self.HEARTBEAT_INTERVAL - (now - self.last_heartbeat),
+            self.MAX_IDLE_SECONDS - (now - self.last_change),
+        ))
+
+    def coalesce_delay(self) -> float:
+        """被唤醒后再等待的时间，合并频繁的进度更新"""
+        return max(0.0, self.MIN_PUSH_INTERVAL - (time.monotonic() - self.last_poll))
+
+
 @generation_bp.route("/generate/progress", methods=["GET"])
 def stream_progress():
-    """SSE 端点，实时推送当前用户的生成进度"""
+    """SSE 端点，实时推送当前用户的生成进度（ASGI 模式下见 api/streaming.py）"""
     # 在请求上下文中捕获 user_id，生成器函数中使用
     user_id = g.user_id
 
     def event_stream():
-        MAX_IDLE_SECONDS = 300  # 5 分钟无变化则断开
-        HEARTBEAT_INTERVAL = 15  # 每 15 秒心跳，用于检测客户端断连
-        prev_status = {}
-        last_change = time.monotonic()
-        last_heartbeat = time.monotonic()
-
+        progress = ProgressEvents(user_id)
         try:
             while True:
-                current = generation_service.get_status_for_user(user_id)
-
-                # 推送有变化的任务状态
-                changed = {}
-                for rt, status in current.items():
-                    if status != prev_status.get(rt):
-                        changed[rt] = status
-
-                if changed:
-                    last_change = time.monotonic()
-
-                    # 检查终态事件
-                    for rt, status in changed.items():
-                        s = status["status"]
-                        if s in ("completed", "stopped", "error"):
-                            event_type = s if s != "error" else "error"
-                            yield f"event: {event_type}\ndata: {json.dumps({'relation_type': rt, **status})}\n\n"
-
-                    # 汇总进度事件
-                    running = {
-                        rt: st for rt, st in current.items() if st["status"] == "running"
-                    }
-                    if running:
-                        yield f"event: progress\ndata: {json.dumps(running)}\n\n"
-                prev_status = current
-
-                now = time.monotonic()
-
-                # 心跳：SSE 注释格式，客户端忽略，但触发 TCP 写入以检测断连
-                if now - last_heartbeat >= HEARTBEAT_INTERVAL:
-                    yield ":heartbeat\n\n"
-                    last_heartbeat = now
-
-                # 超时断开
-                if now - last_change >= MAX_IDLE_SECONDS:
-                    yield f"event: done\ndata: {json.dumps({'message': 'idle timeout'})}\n\n"
+                yield from progress.poll()
+                if progress.done:
                     break
-
-                # 用已获取的 current 快照判断是否还有活跃任务
-                if not any(s["status"] == "running" for s in current.values()):
-                    yield f"event: done\ndata: {json.dumps({'message': 'no active tasks'})}\n\n"
-                    break
-
-                time.sleep(0.5)
+                generation_service.wait_for_change(
+                    user_id, progress.version, timeout=progress.wait_timeout()
+                )
+                time.sleep(progress.coalesce_delay())
 
         except GeneratorExit:
             logger.info(f"SSE client disconnected (user={user_id})")
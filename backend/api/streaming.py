@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+长连接端点的 ASGI 实现（backend/asgi.py 挂载）
+
+- GET  /api/relations/generate/progress — 生成进度 SSE
+- POST /api/ai/chat                     — LLM 代理（同步 + 流式）
+
+与 Flask 版本（api/generation.py、api/ai.py）行为一致，但以协程运行：
+等待任务状态变化、等待上游 token 时不占用线程，空闲连接只消耗内存。
+客户端断开时 StreamingResponse 取消协程，上游连接在 finally 中关闭。
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from backend.api.ai import UPSTREAM_TIMEOUT, build_chat_request, sse_error_events, sse_relay_line
+from backend.api.generation import ProgressEvents
+from backend.exceptions import AppError
+from backend.middleware.user_context import decode_user_id
+from backend.services.generation_service import generation_service
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PATH = "/api/relations/generate/progress"
+CHAT_PATH = "/api/ai/chat"
+
+# 由本模块处理的路径（其余请求交给 Flask）
+STREAM_PATHS = frozenset({PROGRESS_PATH, CHAT_PATH})
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+# 上游 HTTP 客户端（每个 worker 一个，连接复用）
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=UPSTREAM_TIMEOUT)
+    return _http_client
+
+
+def _api_success(data=None) -> JSONResponse:
+    return JSONResponse({"success": True, "data": data, "error": None})
+
+
+def _api_error(msg: str, status: int = 400) -> JSONResponse:
+    return JSONResponse({"success": False, "data": None, "error": msg}, status_code=status)
+
+
+async def _authenticate(request: Request) -> Optional[str]:
+    """解析 JWT → user_id（JWKS 拉取可能阻塞，放到线程池执行）"""
+    return await run_in_threadpool(
+        decode_user_id,
+        request.headers.get("Authorization", ""),
+        request.query_params.get("token"),
+    )
+
+
+def _unauthorized() -> JSONResponse:
+    return JSONResponse({"success": False, "error": "Unauthorized"}, status_code=401)
+
+
+# ──────────────────────────────────────────────────────────
+# 生成进度 SSE
+# ──────────────────────────────────────────────────────────
+
+async def stream_progress(request: Request):
+    user_id = await _authenticate(request)
+    if not user_id:
+        return _unauthorized()
+
+    async def event_stream():
+        progress = ProgressEvents(user_id)
+        try:
+            while True:
+                # poll 会取服务锁、查询任务注册表，放到线程池中执行以免阻塞事件循环
+                events = await run_in_threadpool(progress.poll)
+                for event in events:
+                    yield event
+                if progress.done:
+                    break
+                await generation_service.wait_for_change_async(
+                    user_id, progress.version, timeout=progress.wait_timeout()
+                )
+                await asyncio.sleep(progress.coalesce_delay())
+        except asyncio.CancelledError:
+            logger.info(f"SSE client disconnected (user={user_id})")
+            raise
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ──────────────────────────────────────────────────────────
+# LLM 代理
+# ──────────────────────────────────────────────────────────
+
+async def chat(request: Request):
+    user_id = await _authenticate(request)
+    if not user_id:
+        return _unauthorized()
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    try:
+        upstream_url, headers, body = build_chat_request(data)
+    except AppError as e:
+        return _api_error(e.message, e.code)
+
+    if body.get("stream"):
+        return await _stream_chat(upstream_url, headers, body, user_id)
+
+    try:
+        resp = await _client().post(upstream_url, headers=headers, json=body)
+    except httpx.HTTPError as e:
+        logger.error("AI chat upstream request failed: %s", e)
+        return _api_error(f"上游请求失败: {e}", 502)
+
+    if resp.is_error:
+        logger.warning("AI chat upstream %s: %s", resp.status_code, resp.text[:500])
+        return _api_error(f"上游返回 {resp.status_code}: {resp.text[:300]}", 502)
+
+    try:
+        return _api_success(resp.json())
+    except ValueError:
+        return _api_error("上游响应不是合法 JSON", 502)
+
+
+async def _stream_chat(upstream_url: str, headers: dict, body: dict, user_id: str):
+    """流式转发：上游 SSE 逐行透传，客户端断开时取消并关闭上游。"""
+    client = _client()
+    try:
+        upstream = await client.send(
+            client.build_request("POST", upstream_url, headers=headers, json=body), stream=True
+        )
+    except httpx.HTTPError as e:
+        logger.error("AI chat stream upstream request failed: %s", e)
+        return StreamingResponse(
+            iter(list(sse_error_events(f"上游请求失败: {e}"))), media_type="text/event-stream"
+        )
+
+    if upstream.is_error:
+        await upstream.aread()
+        status = upstream.status_code
+        detail = upstream.text[:300]
+        await upstream.aclose()
+        logger.warning("AI chat stream upstream %s: %s", status, detail)
+        return StreamingResponse(
+            iter(list(sse_error_events(f"上游返回 {status}: {detail}"))),
+            media_type="text/event-stream",
+        )
+
+    async def sse_gen():
+        try:
+            async for raw_line in upstream.aiter_lines():
+                yield sse_relay_line(raw_line)
+        except asyncio.CancelledError:
+            logger.info("AI chat stream client disconnected (user=%s)", user_id)
+            raise
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(sse_gen(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ──────────────────────────────────────────────────────────
+# 应用
+# ──────────────────────────────────────────────────────────
+
+@asynccontextmanager
+async def _lifespan(app):
+    yield
+    if _http_client is not None:
+        await _http_client.aclose()
+
+
+def _cors_origins():
+    # 与 Flask-CORS 配置一致（backend/app.py）
+    cors_origins = os.environ.get("CORS_ORIGINS", "*")
+    return [o.strip() for o in cors_origins.split(",")] if cors_origins != "*" else ["*"]
+
+
+streams_app = Starlette(
+    routes=[
+        Route(PROGRESS_PATH, stream_progress, methods=["GET"]),
+        Route(CHAT_PATH, chat, methods=["POST"]),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware, allow_origins=_cors_origins(), allow_methods=["*"], allow_headers=["*"]
+        ),
+    ],
+    lifespan=_lifespan,
+)
@@ -6,6 +6,7 @@ Flask 应用入口
 """
 import logging
 import os
+import threading
 from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from sqlalchemy.exc import SQLAlchemyError
@@ -58,6 +59,13 @@ def create_app():
 
     register_error_handlers(app)
 
+    # 可选：后台预热关系生成（导入生成器、加载 WordNet），不阻塞启动与健康检查
+    if os.environ.get("GENERATION_WARMUP", "0") == "1":
+        from backend.services.generation_service import generation_service
+        threading.Thread(
+            target=generation_service.warmup, name="gen-warmup", daemon=True
+        ).start()
+
     @app.route("/api/health")
     def health_check():
         from backend.services.generation_service import generation_service
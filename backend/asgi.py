@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI 入口 — 长连接端点以协程运行，其余请求交给 Flask 应用
+
+进度 SSE 与 AI 对话（见 backend/api/streaming.py）可能持续数分钟；
+WSGI 模式下每个连接独占一个 worker 线程，几个打开的页面就能占满线程。
+这里它们在事件循环中等待，成千上万个空闲连接只占内存；
+其余请求经 a2wsgi 在线程池中调用原 Flask 应用，行为不变。
+
+启动（gunicorn.conf.py 中 GUNICORN_ASGI=1 切换为 uvicorn worker）：
+    gunicorn -c gunicorn.conf.py backend.asgi:app
+"""
+from a2wsgi import WSGIMiddleware
+
+from backend.api.streaming import STREAM_PATHS, streams_app
+from backend.app import app as flask_app
+
+_wsgi_app = WSGIMiddleware(flask_app)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan" or scope.get("path") in STREAM_PATHS:
+        await streams_app(scope, receive, send)
+    else:
+        await _wsgi_app(scope, receive, send)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+关系批量写入 — words_relations / relation_generation_log
+
+每张表只有一条固定形状的语句：各列以数组参数传入，服务端 unnest 展开为行，
+因此无论批大小，SQL 文本都相同（可复用语句缓存），且每批只绑定几个参数。
+冲突处理与原先逐行 VALUES 写法一致：
+- words_relations：(word_id, related_word_id, relation_type) 冲突时忽略
+- relation_generation_log：(word_id, relation_type) 冲突时更新 processed_at / found_count
+
+关系以 RelationBuffer（列式数组）传入，直接转为数组参数。
+调用方负责事务（在同一 session 中调用后 commit）。
+基准：python scripts/benchmark_relation_writer.py
+"""
+from typing import Dict, List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.generators.relation_store import RelationBuffer
+
+# 单条语句的最大行数（限制单次请求的数组大小）
+MAX_ROWS_PER_STATEMENT = 5000
+
+_INSERT_RELATIONS = text(
+    "INSERT INTO words_relations "
+    "(user_id, word_id, related_word_id, relation_type, confidence) "
+    "SELECT CAST(:user_id AS uuid), r.word_id, r.related_word_id, r.relation_type, r.confidence "
+    "FROM unnest("
+    "CAST(:word_ids AS integer[]), CAST(:related_word_ids AS integer[]), "
+    "CAST(:relation_types AS relation_type_enum[]), CAST(:confidences AS double precision[])"
+    ") AS r(word_id, related_word_id, relation_type, confidence) "
+    "ON CONFLICT (word_id, related_word_id, relation_type) DO NOTHING"
+)
+
+_UPSERT_LOGS = text(
+    "INSERT INTO relation_generation_log "
+    "(user_id, word_id, relation_type, processed_at, found_count) "
+    "SELECT CAST(:user_id AS uuid), l.word_id, l.relation_type, l.processed_at, l.found_count "
+    "FROM unnest("
+    "CAST(:word_ids AS integer[]), CAST(:relation_types AS relation_type_enum[]), "
+    "CAST(:processed_ats AS timestamp[]), CAST(:found_counts AS integer[])"
+    ") AS l(word_id, relation_type, processed_at, found_count) "
+    "ON CONFLICT (word_id, relation_type) "
+    "DO UPDATE SET processed_at = EXCLUDED.processed_at, "
+    "found_count = EXCLUDED.found_count"
+)
+
+
+def insert_relations(session: Session, user_id: str, buffers: Sequence[RelationBuffer]) -> int:
+    """批量插入关系（已存在的忽略）；多个缓冲合并写入，返回实际插入的行数"""
+    word_ids: List[int] = []
+    related_word_ids: List[int] = []
+    relation_types: List[str] = []
+    confidences: List[float] = []
+    for buffer in buffers:
+        word_ids.extend(buffer.word_ids)
+        related_word_ids.extend(buffer.related_word_ids)
+        relation_types.extend([buffer.relation_type] * len(buffer))
+        confidences.extend(buffer.confidences)
+
+    inserted = 0
+    for offset in range(0, len(word_ids), MAX_ROWS_PER_STATEMENT):
+        end = offset + MAX_ROWS_PER_STATEMENT
+        result = session.execute(_INSERT_RELATIONS, {
+            "user_id": user_id,
+            "word_ids": word_ids[offset:end],
+            "related_word_ids": related_word_ids[offset:end],
+            "relation_types": relation_types[offset:end],
+            "confidences": confidences[offset:end],
+        })
+        inserted += result.rowcount
+    return inserted
+
+
+def upsert_generation_logs(session: Session, user_id: str, logs: List[Dict]):
+    """批量写入生成日志（同一单词、关系类型已存在时更新）"""
+    for offset in range(0, len(logs), MAX_ROWS_PER_STATEMENT):
+        batch = logs[offset:offset + MAX_ROWS_PER_STATEMENT]
+        session.execute(_UPSERT_LOGS, {
+            "user_id": user_id,
+            "word_ids": [entry["word_id"] for entry in batch],
+            "relation_types": [entry["relation_type"] for entry in batch],
+            "processed_ats": [entry["processed_at"] for entry in batch],
+            "found_counts": [entry["found_count"] for entry in batch],
+        })
@@ -8,21 +8,36 @@
 - RootGenerator: 词根关系（拉丁/希腊词根 + 词干分析）
 - ConfusedGenerator: 易混淆词（编辑距离 + 语义检查）
 - TopicGenerator: 主题关系（IELTS 预定义主题）
+
+生成器及 NLTK / data.py 词表按需导入（PEP 562 模块级 __getattr__）：
+`from backend.generators import SynonymGenerator` 照常可用，
+但仅导入 backend.generators.worker_pool 等轻量子模块时不会加载它们，
+Web 进程启动无需为关系生成付出导入开销。
 """
+import importlib
+
+# 导出名 → 定义所在子模块
+_EXPORTS = {
+    'BaseGenerator': '.base',
+    'GenerationResult': '.base',
+    'SynonymGenerator': '.synonym_generator',
+    'AntonymGenerator': '.antonym_generator',
+    'RootGenerator': '.root_generator',
+    'ConfusedGenerator': '.confused_generator',
+    'TopicGenerator': '.topic_generator',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
-from .base import BaseGenerator, GenerationResult
-from .synonym_generator import SynonymGenerator
-from .antonym_generator import AntonymGenerator
-from .root_generator import RootGenerator
-from .confused_generator import ConfusedGenerator
-from .topic_generator import TopicGenerator
-
-__all__ = [
-    'BaseGenerator',
-    'GenerationResult',
-    'SynonymGenerator',
-    'AntonymGenerator',
-    'RootGenerator',
-    'ConfusedGenerator',
-    'TopicGenerator',
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
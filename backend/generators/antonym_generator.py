@@ -7,17 +7,35 @@
 2. 手工定义的反义词对
 3. 形态学判断（否定前缀）
 """
-from typing import Callable, Dict, Optional, Set, List, Tuple
+from typing import Callable, Dict, Optional, Set, List
 from threading import Event
 
 from .base import BaseGenerator, GenerationResult
+from .relation_store import RelationSet
 from .data import antonym_manual_pairs, antonym_false_paris
+from .feature_store import feature_view
+from .lexicon import get_lexicon
+from .wordnet_utils import NLTK_AVAILABLE, get_synsets
+from .worker_pool import WorkerPool
 
-try:
-    from nltk.corpus import wordnet
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
+
+def _build_false_prefix_pairs() -> frozenset:
+    """构建不应该作为反义词的前缀词对（双向）"""
+    return frozenset(antonym_false_paris | {(w2, w1) for w1, w2 in antonym_false_paris})
+
+
+def _build_manual_antonyms() -> Dict[str, frozenset]:
+    """构建手工反义词字典"""
+    manual_dict: Dict[str, Set[str]] = {}
+    for word1, word2 in antonym_manual_pairs:
+        manual_dict.setdefault(word1, set()).add(word2)
+        manual_dict.setdefault(word2, set()).add(word1)
+    return {word: frozenset(antonyms) for word, antonyms in manual_dict.items()}
+
+
+# 模块导入时构建一次，所有生成器实例共享（只读）
+_FALSE_PREFIX_PAIRS = _build_false_prefix_pairs()
+_MANUAL_ANTONYMS = _build_manual_antonyms()
 
 
 class AntonymGenerator(BaseGenerator):
@@ -30,27 +48,15 @@ class AntonymGenerator(BaseGenerator):
         on_progress: Optional[Callable[[int, int, int], None]] = None,
         stop_event: Optional[Event] = None,
         on_save: Optional[Callable] = None,
+        worker_pool: Optional[WorkerPool] = None,
+        checkpoint_key: Optional[str] = None,
     ):
-        super().__init__(on_progress=on_progress, stop_event=stop_event, on_save=on_save)
-        self.manual_antonyms = self._build_manual_antonyms()
-        self.false_prefix_pairs = self._build_false_prefix_pairs()
-
-    def _build_false_prefix_pairs(self) -> Set[Tuple[str, str]]:
-        """构建不应该作为反义词的前缀词对"""
-        false_pairs = antonym_false_paris
-        return false_pairs | {(w2, w1) for w1, w2 in false_pairs}
-
-    def _build_manual_antonyms(self) -> Dict[str, Set[str]]:
-        """构建手工反义词字典"""
-        manual_dict = {}
-        for word1, word2 in antonym_manual_pairs:
-            if word1 not in manual_dict:
-                manual_dict[word1] = set()
-            if word2 not in manual_dict:
-                manual_dict[word2] = set()
-            manual_dict[word1].add(word2)
-            manual_dict[word2].add(word1)
-        return manual_dict
+        super().__init__(
+            on_progress=on_progress, stop_event=stop_event, on_save=on_save,
+            worker_pool=worker_pool, checkpoint_key=checkpoint_key,
+        )
+        self.manual_antonyms = _MANUAL_ANTONYMS
+        self.false_prefix_pairs = _FALSE_PREFIX_PAIRS
 
     def _get_wordnet_antonyms(self, word: str) -> Set[str]:
         """获取 WordNet 反义词"""
@@ -60,7 +66,7 @@ class AntonymGenerator(BaseGenerator):
         antonyms = set()
         word_lower = word.lower()
 
-        for synset in wordnet.synsets(word_lower):
+        for synset in get_synsets(word_lower):
             for lemma in synset.lemmas():
                 for antonym in lemma.antonyms():
                     ant_word = antonym.name().replace("_", " ").lower()
@@ -71,7 +77,7 @@ class AntonymGenerator(BaseGenerator):
 
     def _get_manual_antonyms(self, word: str) -> Set[str]:
         """获取手工定义的反义词"""
-        return self.manual_antonyms.get(word.lower(), set())
+        return self.manual_antonyms.get(word.lower(), frozenset())
 
     def _get_morphological_antonyms(self, word: str, word_index: Dict[str, int]) -> Set[str]:
         """通过词缀识别反义词"""
@@ -106,7 +112,7 @@ class AntonymGenerator(BaseGenerator):
         self,
         words: List[Dict],
         word_index: Dict[str, int],
-        existing_relations: Set[Tuple[int, int, str]],
+        existing_relations: RelationSet,
         processed_word_ids: Set[int]
     ) -> GenerationResult:
         """生成反义词关系"""
@@ -118,6 +124,15 @@ class AntonymGenerator(BaseGenerator):
 
         stats_by_source = {'wordnet': 0, 'manual': 0, 'morphological': 0}
         skipped_existing = 0
+        # 预编译词典命中的词直接查表，其余词走特征库 / 实时计算
+        lexicon = get_lexicon()
+        lexicon_entries = {
+            w['word'].lower(): lexicon.get(w['word'].lower()) if lexicon else None
+            for w in unprocessed
+        }
+        antonyms_view = feature_view(
+            "wordnet_antonyms", [w for w, entry in lexicon_entries.items() if entry is None]
+        )
 
         for i, word_data in enumerate(unprocessed):
             if self._is_stopped():
@@ -128,17 +143,24 @@ class AntonymGenerator(BaseGenerator):
             found_count = 0
 
             all_antonyms = {}
-
-            # 1. WordNet 反义词（最高优先级）
-            wordnet_antonyms = self._get_wordnet_antonyms(word)
-            for ant in wordnet_antonyms:
-                all_antonyms[ant] = "wordnet"
-
-            # 2. 手工反义词（第二优先级）
-            manual_antonyms = self._get_manual_antonyms(word)
-            for ant in manual_antonyms:
-                if ant not in all_antonyms:
-                    all_antonyms[ant] = "manual"
+            entry = lexicon_entries[word.lower()]
+
+            if entry is not None:
+                # 1 + 2. 词典已按 WordNet > 手工 的优先级合并
+                all_antonyms.update(entry.antonyms)
+            else:
+                # 1. WordNet 反义词（最高优先级）
+                wordnet_antonyms = antonyms_view.get(
+                    word.lower(), lambda w: sorted(self._get_wordnet_antonyms(w))
+                )
+                for ant in wordnet_antonyms:
+                    all_antonyms[ant] = "wordnet"
+
+                # 2. 手工反义词（第二优先级）
+                manual_antonyms = self._get_manual_antonyms(word)
+                for ant in manual_antonyms:
+                    if ant not in all_antonyms:
+                        all_antonyms[ant] = "manual"
 
             # 3. 形态学反义词（仅当前两种方法找不到时）
             if not all_antonyms:
@@ -162,6 +184,7 @@ class AntonymGenerator(BaseGenerator):
             self._flush()
             self._report_progress(i + 1, len(unprocessed), sum(stats_by_source.values()))
 
+        antonyms_view.save()
         total_found = sum(stats_by_source.values())
 
         return self._finalize({
@@ -3,14 +3,20 @@
 关系生成器基础模块 - 共享工具和类型定义
 
 服务模式：通过 on_progress 回调报告进度，通过 stop_event 支持中断，
-通过 on_save 回调增量保存结果（达到阈值自动刷入数据库）。
+通过 on_save 回调增量保存结果（达到阈值自动刷入数据库），
+通过 worker_pool 把 CPU 密集分片交给共享进程池，
+通过 checkpoint_key 为耗时阶段保存检查点（见 checkpoint.py）。
+已有关系与待写入关系使用 relation_store 中的紧凑结构（打包整数键 / 列式数组）。
 """
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Callable, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from threading import Event
 from abc import ABC, abstractmethod
 
+from .relation_store import POSSIBLE, PRESENT, RelationBuffer, RelationSet
+from .worker_pool import ShardContext, WorkerPool, run_shards
+
 
 @dataclass
 class GenerationResult:
@@ -30,15 +36,19 @@ class BaseGenerator(ABC):
         self,
         on_progress: Optional[Callable[[int, int, int], None]] = None,
         stop_event: Optional[Event] = None,
-        on_save: Optional[Callable[[List[Dict], List[Dict]], None]] = None,
+        on_save: Optional[Callable[[RelationBuffer, List[Dict]], None]] = None,
         flush_threshold: int = DEFAULT_FLUSH_THRESHOLD,
+        worker_pool: Optional[WorkerPool] = None,
+        checkpoint_key: Optional[str] = None,
     ):
         self.flush_threshold = flush_threshold
         self.processed_pairs: Set[Tuple[int, int]] = set()
         self._on_progress = on_progress  # (processed, total, found)
         self._stop_event = stop_event
         self._on_save = on_save          # (relations, logs) → save to DB
-        self._pending_relations: List[Dict] = []
+        self._worker_pool = worker_pool  # None → 分片在当前线程执行
+        self._checkpoint_key = checkpoint_key  # None → 不保存阶段检查点
+        self._pending_relations = RelationBuffer(self.relation_type)
         self._pending_logs: List[Dict] = []
 
     def _is_stopped(self) -> bool:
@@ -48,21 +58,30 @@ class BaseGenerator(ABC):
         if self._on_progress:
             self._on_progress(processed, total, found)
 
+    def _run_shards(
+        self,
+        fn: Callable[[ShardContext, Any], Any],
+        data: Any,
+        shards: Sequence[Any],
+    ) -> Iterator[Any]:
+        """按顺序产出各分片结果（fn 须为模块级函数）；停止后不再产出"""
+        return run_shards(self._worker_pool, fn, data, shards, self._stop_event)
+
     @abstractmethod
     def generate(
         self,
         words: List[Dict],
         word_index: Dict[str, int],
-        existing_relations: Set[Tuple[int, int, str]],
+        existing_relations: RelationSet,
         processed_word_ids: Set[int]
     ) -> GenerationResult:
         """
         生成关系
 
         参数:
-        - words: 单词列表 [{'id': int, 'word': str, 'definition': str}, ...]
+        - words: 单词列表 [{'id': int, 'word': str}, ...]
         - word_index: 单词索引 {word_lower: word_id}
-        - existing_relations: 已存在的关系 {(word_id, related_id, type), ...}
+        - existing_relations: 已存在的关系（新增关系会写回其中）
         - processed_word_ids: 已处理的单词ID集合
 
         返回:
@@ -70,53 +89,62 @@ class BaseGenerator(ABC):
         """
         pass
 
-    def _is_relation_exists(
+    def _relation_state(
         self,
         word_id: int,
         related_id: int,
-        existing_relations: Set[Tuple[int, int, str]]
-    ) -> bool:
-        """检查关系是否已存在（双向检查）"""
-        return (
-            (word_id, related_id, self.relation_type) in existing_relations or
-            (related_id, word_id, self.relation_type) in existing_relations
-        )
+        existing_relations: RelationSet
+    ) -> int:
+        """检查关系是否已存在（双向检查）：PRESENT / POSSIBLE / ABSENT"""
+        state = existing_relations.lookup(word_id, related_id, self.relation_type)
+        if state == PRESENT:
+            return state
+        return max(state, existing_relations.lookup(related_id, word_id, self.relation_type))
 
     def _add_relation(
         self,
         word_id: int,
         related_id: int,
         confidence: float,
-        existing_relations: Set[Tuple[int, int, str]]
+        existing_relations: RelationSet
     ) -> bool:
         """
         添加双向关系到缓冲区（如果不存在）
 
         返回: True 如果添加成功，False 如果已存在
+
+        过滤器模式下可能已存在（POSSIBLE）的关系先回库查实，返回值与计数始终准确；
+        候选词对较多时先调用 _settle_relations() 批量查实，避免逐条查询。
         """
-        if self._is_relation_exists(word_id, related_id, existing_relations):
+        state = self._relation_state(word_id, related_id, existing_relations)
+        if state == POSSIBLE:
+            self._settle_relations([(word_id, related_id)], existing_relations)
+            state = self._relation_state(word_id, related_id, existing_relations)
+        if state == PRESENT:
             return False
 
         # 添加双向关系到缓冲区
-        self._pending_relations.append({
-            'word_id': word_id,
-            'related_word_id': related_id,
-            'relation_type': self.relation_type,
-            'confidence': round(confidence, 2)
-        })
-        self._pending_relations.append({
-            'word_id': related_id,
-            'related_word_id': word_id,
-            'relation_type': self.relation_type,
-            'confidence': round(confidence, 2)
-        })
+        confidence = round(confidence, 2)
+        self._pending_relations.append(word_id, related_id, confidence)
+        self._pending_relations.append(related_id, word_id, confidence)
 
         # 标记为已存在
-        existing_relations.add((word_id, related_id, self.relation_type))
-        existing_relations.add((related_id, word_id, self.relation_type))
+        existing_relations.add(word_id, related_id, self.relation_type)
+        existing_relations.add(related_id, word_id, self.relation_type)
 
         return True
 
+    def _settle_relations(
+        self,
+        pairs: Iterable[Tuple[int, int]],
+        existing_relations: RelationSet
+    ):
+        """批量查实过滤器命中（POSSIBLE）的词对（双向）"""
+        existing_relations.settle(
+            self.relation_type,
+            [pair for a, b in pairs for pair in ((a, b), (b, a))],
+        )
+
     def _add_log(self, word_id: int, found_count: int):
         """添加处理日志到缓冲区"""
         self._pending_logs.append({
@@ -126,14 +154,18 @@ class BaseGenerator(ABC):
             'found_count': found_count
         })
 
+    def _flush_due(self) -> bool:
+        """缓冲区是否已达到阈值（下一次 _flush() 会写入数据库）"""
+        return bool(self._on_save) and len(self._pending_relations) >= self.flush_threshold
+
     def _flush(self, force: bool = False):
         """将缓冲区数据刷入数据库（达到阈值或 force=True 时执行）"""
         if not self._on_save:
             return
-        if force or len(self._pending_relations) >= self.flush_threshold:
+        if force or self._flush_due():
             if self._pending_relations or self._pending_logs:
                 self._on_save(self._pending_relations, self._pending_logs)
-                self._pending_relations = []
+                self._pending_relations = RelationBuffer(self.relation_type)
                 self._pending_logs = []
 
     def _finalize(self, stats: Dict) -> GenerationResult:
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+编辑距离候选索引 — 供易混淆词生成器在评分前筛出真正的近邻
+
+每次生成构建一次，三种结构互补：
+- 删除邻域（SymSpell）：每个词删除至多 max_distance 个字母得到的变体 → 词位置。
+  两词编辑距离 ≤ d 时必然共享某个「各删除不超过 d 个字母」的变体，因此按查询词的
+  删除变体取并集即可覆盖所有距离 ≤ d 的词（少量距离更大的词由评分阶段剔除）。
+- 长度分桶：过短的查询词删除后变体过于宽泛，直接扫描长度相差 ≤ d 的桶。
+- 字母签名：排序后字母相同的词（angel/angle），字母顺序差异的词对一并进入候选。
+"""
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, Set
+
+
+def _deletions(word: str, max_distance: int) -> Set[str]:
+    """删除至多 max_distance 个字母得到的全部变体（含原词）"""
+    variants = {word}
+    n = len(word)
+    for k in range(1, min(max_distance, n) + 1):
+        for positions in combinations(range(n), k):
+            chars = list(word)
+            for pos in reversed(positions):
+                del chars[pos]
+            variants.add("".join(chars))
+    return variants
+
+
+def letter_signature(word: str) -> str:
+    """字母签名：排序后的字母序列，异序词签名相同"""
+    return "".join(sorted(word))
+
+
+class EditDistanceIndex:
+    """编辑距离候选索引（按构建时的词序返回位置）"""
+
+    # 长度不超过此值的查询词走长度分桶扫描
+    SHORT_WORD_LEN = 4
+
+    def __init__(self, words: Iterable[str], max_distance: int = 2):
+        self.max_distance = max_distance
+        self._words: List[str] = [w.lower() for w in words]
+
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._by_length: Dict[int, List[int]] = defaultdict(list)
+        self._by_deletion: Dict[str, List[int]] = defaultdict(list)
+        self._by_signature: Dict[str, List[int]] = defaultdict(list)
+
+        for pos, word in enumerate(self._words):
+            self._exact[word].append(pos)
+            self._by_length[len(word)].append(pos)
+            self._by_signature[letter_signature(word)].append(pos)
+            for variant in _deletions(word, max_distance):
+                self._by_deletion[variant].append(pos)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def lookup(self, word: str) -> List[int]:
+        """完全相同的词的位置"""
+        return self._exact.get(word.lower(), [])
+
+    def anagrams(self, word: str) -> List[int]:
+        """字母签名相同的词的位置"""
+        return self._by_signature.get(letter_signature(word.lower()), [])
+
+    def neighbours(self, word: str) -> List[int]:
+        """
+        返回可能与 word 编辑距离 ≤ max_distance 的词位置（升序）。
+
+        结果是距离 ≤ max_distance 的全部词加上少量假阳性，调用方仍需精确校验距离。
+        异序词一并返回，便于字母顺序差异的判断。
+        """
+        word = word.lower()
+        found: Set[int] = set(self.anagrams(word))
+
+        if len(word) <= self.SHORT_WORD_LEN:
+            d = self.max_distance
+            for length in range(max(0, len(word) - d), len(word) + d + 1):
+                found.update(self._by_length.get(length, ()))
+        else:
+            for variant in _deletions(word, self.max_distance):
+                found.update(self._by_deletion.get(variant, ()))
+
+        return sorted(found)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+生成阶段检查点 — 中断的生成任务从阶段边界继续
+
+relation_generation_log 只记录逐词完成情况；TopicGenerator 的上位词分组、释义交叉引用，
+SynonymGenerator 的语义相似度词对，都在写入关系前整体算出，停止、崩溃或重新部署后只能重算。
+生成器在阶段完成时（相似度计算中另按间隔）把中间结果写入本地文件，
+同一任务再次启动且输入指纹一致时直接读回，跳过已完成的阶段。
+
+文件按任务（user_id + 关系类型）分目录，文件名含输入指纹
+（单词集合、生成参数、WordNet 版本与 CHECKPOINT_SCHEMA_VERSION 的哈希）：
+- 单词集合变化后旧检查点不再匹配，打开时清理；
+- 任务正常完成后删除该任务的全部检查点；
+- 超过 CHECKPOINT_MAX_AGE 未更新的任务目录在进程首次使用时清理。
+未配置、目录不可写或写入失败时退化为不保存检查点（enabled 为 False），
+生成器据此照常写入日志，不影响生成结果。
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Optional
+
+from .wordnet_utils import wordnet_version
+
+logger = logging.getLogger(__name__)
+
+# 空字符串表示禁用
+GENERATION_CHECKPOINT_DIR = os.environ.get(
+    "GENERATION_CHECKPOINT_DIR", "/opt/vocabulary_app/feature-store/checkpoints"
+)
+
+# 检查点内容或阶段划分变化时手动递增
+CHECKPOINT_SCHEMA_VERSION = "1"
+
+# 任务目录超过该秒数未更新即清理（用户未再启动的中断任务）
+CHECKPOINT_MAX_AGE = 7 * 24 * 3600
+
+_SUFFIX = ".json.gz"
+
+
+def input_fingerprint(*parts: Any) -> str:
+    """阶段输入的指纹（parts 需可 JSON 序列化）"""
+    digest = hashlib.sha256()
+    digest.update(CHECKPOINT_SCHEMA_VERSION.encode())
+    digest.update(wordnet_version().encode())
+    digest.update(json.dumps(parts, ensure_ascii=False, separators=(",", ":")).encode())
+    return digest.hexdigest()[:16]
+
+
+class PhaseCheckpoint:
+    """
+    一次生成中某个任务的阶段检查点
+
+    load() 读回同一指纹下已保存的阶段结果（没有时返回 None），save() 原子写入，
+    clear() 删除该任务的全部检查点。值需可 JSON 序列化（集合请转为排序后的列表）。
+    目录无法创建或某次写入失败后停用：enabled 为 False，之后的 save() 不再写入。
+    """
+
+    def __init__(self, directory: Optional[str], fingerprint: str):
+        self._directory = directory
+        self.fingerprint = fingerprint
+        if directory is not None:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Checkpoint directory unavailable ({directory}): {e}")
+                self._directory = None
+                return
+            self._remove_stale()
+
+    @property
+    def enabled(self) -> bool:
+        return self._directory is not None
+
+    def load(self, phase: str) -> Optional[Any]:
+        if self._directory is None:
+            return None
+        try:
+            with gzip.open(self._path(phase), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint read failed ({phase}): {e}")
+            return None
+
+    def save(self, phase: str, value: Any):
+        if self._directory is None:
+            return
+        path = self._path(phase)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            # 压缩级别取低值：检查点写在生成线程中，速度优先
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(value, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Checkpoint write failed ({phase}), checkpoints disabled: {e}")
+            self._directory = None
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        if self._directory is None:
+            return
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _path(self, phase: str) -> str:
+        return os.path.join(self._directory, f"{self.fingerprint}.{phase}{_SUFFIX}")
+
+    def _remove_stale(self):
+        """删除该任务目录中其他指纹的检查点（单词集合或参数已变化）"""
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.startswith(f"{self.fingerprint}."):
+                try:
+                    os.remove(os.path.join(self._directory, name))
+                except OSError:
+                    pass
+
+
+_pruned = False
+_prune_lock = threading.Lock()
+
+
+def _prune_expired(root: str):
+    """清理超过 CHECKPOINT_MAX_AGE 未更新的任务目录（每个进程一次）"""
+    global _pruned
+    if _pruned:
+        return
+    with _prune_lock:
+        if _pruned:
+            return
+        _pruned = True
+        cutoff = time.time() - CHECKPOINT_MAX_AGE
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+def phase_checkpoint(job_key: Optional[str], *parts: Any) -> PhaseCheckpoint:
+    """为任务 job_key（如 "<user_id>-topic"）按输入 parts 创建检查点；job_key 为空或未配置时禁用"""
+    fingerprint = input_fingerprint(*parts)
+    if not job_key or not GENERATION_CHECKPOINT_DIR:
+        return PhaseCheckpoint(None, fingerprint)
+    _prune_expired(GENERATION_CHECKPOINT_DIR)
+    return PhaseCheckpoint(os.path.join(GENERATION_CHECKPOINT_DIR, job_key), fingerprint)
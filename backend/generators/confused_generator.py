@@ -4,39 +4,26 @@
 
 识别形似义不同的词对（如 angel/angle, affect/effect）。
 """
-from difflib import SequenceMatcher
-from typing import Callable, Dict, Optional, Set, Tuple, List
+from typing import Callable, Dict, Optional, Sequence, Set, Tuple, List
 from threading import Event
 
 from .base import BaseGenerator, GenerationResult
+from .relation_store import RelationSet
+from .candidate_index import EditDistanceIndex
 from .data import confused_pairs
+from .similarity import batch_similarity, bounded_levenshtein, sequence_ratio
+from .wordnet_utils import NLTK_AVAILABLE, get_synsets, max_word_similarity
+from .worker_pool import ShardContext, WorkerPool, split_shards
 
-try:
-    from nltk.corpus import wordnet
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
 
-
-def levenshtein_distance(s1: str, s2: str) -> int:
-    """计算编辑距离（Levenshtein距离）"""
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-
-    if len(s2) == 0:
-        return len(s1)
-
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-
-    return previous_row[-1]
+def _score_shard(context: ShardContext, shard: Sequence[int]) -> List[List[Tuple[int, float, bool]]]:
+    """分片函数：对 shard 中每个词（候选下标）返回其易混淆伙伴 [(候选下标, 分数, 是否经典), ...]"""
+    data = context.data
+    scorer = context.derived("scorer", lambda d: ConfusedGenerator(min_length=d["min_length"]))
+    index = context.derived(
+        "index", lambda d: EditDistanceIndex(d["words"], max_distance=ConfusedGenerator.MAX_EDIT_DISTANCE)
+    )
+    return [scorer._find_confused(pos, data["words"], data["ids"], index) for pos in shard]
 
 
 class ConfusedGenerator(BaseGenerator):
@@ -44,16 +31,27 @@ class ConfusedGenerator(BaseGenerator):
 
     relation_type = "confused"
 
+    # 超过此编辑距离的非经典词对一律不算易混淆
+    MAX_EDIT_DISTANCE = 2
+    # 每个进程池分片包含的待处理词数
+    SHARD_SIZE = 100
+
     def __init__(
         self,
         on_progress: Optional[Callable[[int, int, int], None]] = None,
         stop_event: Optional[Event] = None,
         on_save: Optional[Callable] = None,
         min_length: int = 5,
+        worker_pool: Optional[WorkerPool] = None,
+        checkpoint_key: Optional[str] = None,
     ):
-        super().__init__(on_progress=on_progress, stop_event=stop_event, on_save=on_save)
+        super().__init__(
+            on_progress=on_progress, stop_event=stop_event, on_save=on_save,
+            worker_pool=worker_pool, checkpoint_key=checkpoint_key,
+        )
         self.min_length = min_length
         self.classic_confused_pairs = self._build_classic_pairs()
+        self.classic_partners = self._build_classic_partners()
 
     def _build_classic_pairs(self) -> Set[Tuple[str, str]]:
         """构建经典易混淆词对"""
@@ -63,28 +61,28 @@ class ConfusedGenerator(BaseGenerator):
             pair_set.add((w2.lower(), w1.lower()))
         return pair_set
 
+    def _build_classic_partners(self) -> Dict[str, Set[str]]:
+        """经典词对按单词索引：word → {partner, ...}（不受编辑距离限制，需单独并入候选）"""
+        partners: Dict[str, Set[str]] = {}
+        for w1, w2 in self.classic_confused_pairs:
+            partners.setdefault(w1, set()).add(w2)
+        return partners
+
     def are_semantically_different(self, word1: str, word2: str) -> bool:
         """检查两个词在语义上是否不同"""
         if not NLTK_AVAILABLE:
             return True
 
-        synsets1 = set(wordnet.synsets(word1.lower()))
-        synsets2 = set(wordnet.synsets(word2.lower()))
+        synsets1 = get_synsets(word1)
+        synsets2 = get_synsets(word2)
 
         if not synsets1 or not synsets2:
             return False
 
-        if synsets1 & synsets2:
+        if set(synsets1) & set(synsets2):
             return False
 
-        max_similarity = 0
-        for s1 in synsets1:
-            for s2 in synsets2:
-                sim = s1.path_similarity(s2)
-                if sim and sim > max_similarity:
-                    max_similarity = sim
-
-        return max_similarity < 0.25
+        return max_word_similarity(word1, word2) < 0.25
 
     def _is_letter_order_difference(self, w1: str, w2: str) -> bool:
         """检查是否是字母顺序差异（如 angel/angle）"""
@@ -97,12 +95,16 @@ class ConfusedGenerator(BaseGenerator):
         if (w1, w2) in self.classic_confused_pairs:
             return True, 0.95
 
-        edit_dist = levenshtein_distance(w1, w2)
-        if edit_dist > 2:
+        edit_dist = bounded_levenshtein(w1, w2, self.MAX_EDIT_DISTANCE)
+        if edit_dist > self.MAX_EDIT_DISTANCE:
             return False, 0.0
 
-        similarity = SequenceMatcher(None, w1, w2).ratio()
+        return self._score_similar_pair(w1, w2, edit_dist, sequence_ratio(w1, w2))
 
+    def _score_similar_pair(
+        self, w1: str, w2: str, edit_dist: int, similarity: float
+    ) -> Tuple[bool, float]:
+        """对编辑距离已在阈值内的非经典词对评分（w1/w2 为小写）"""
         if edit_dist == 1:
             min_similarity = 0.75
         elif edit_dist == 2:
@@ -127,60 +129,88 @@ class ConfusedGenerator(BaseGenerator):
 
         return True, min(1.0, base_score + bonus_score)
 
+    def _find_confused(
+        self, pos: int, words: Sequence[str], ids: Sequence[int], index: EditDistanceIndex
+    ) -> List[Tuple[int, float, bool]]:
+        """words[pos] 与 id 更大的候选词中的易混淆伙伴（words 为小写候选词，index 建于其上）"""
+        w1_lower, w1_id = words[pos], ids[pos]
+        positions = set(index.neighbours(w1_lower))
+        for partner in self.classic_partners.get(w1_lower, ()):
+            positions.update(index.lookup(partner))
+
+        neighbours = [p for p in sorted(positions) if ids[p] > w1_id]
+        metrics = batch_similarity(
+            w1_lower, [words[p] for p in neighbours], self.MAX_EDIT_DISTANCE
+        )
+
+        found = []
+        for p, (edit_dist, similarity) in zip(neighbours, metrics):
+            w2_lower = words[p]
+            if (w1_lower, w2_lower) in self.classic_confused_pairs:
+                found.append((p, 0.95, True))
+            elif edit_dist <= self.MAX_EDIT_DISTANCE:
+                is_confused, score = self._score_similar_pair(
+                    w1_lower, w2_lower, edit_dist, similarity
+                )
+                if is_confused:
+                    found.append((p, score, False))
+        return found
+
     def generate(
         self,
         words: List[Dict],
         word_index: Dict[str, int],
-        existing_relations: Set[Tuple[int, int, str]],
+        existing_relations: RelationSet,
         processed_word_ids: Set[int]
     ) -> GenerationResult:
         """生成易混淆词关系"""
 
-        unprocessed = [
-            w for w in words
-            if w['id'] not in processed_word_ids and len(w['word']) >= self.min_length
+        # 所有满足长度要求的词作为候选（含已处理），确保新词能和旧词比较
+        all_candidates = [w for w in words if len(w['word']) >= self.min_length]
+        unprocessed_positions = [
+            pos for pos, w in enumerate(all_candidates) if w['id'] not in processed_word_ids
         ]
 
-        if not unprocessed:
+        if not unprocessed_positions:
             return GenerationResult(stats={'skipped': True})
 
-        # 所有满足长度要求的词作为候选（含已处理），确保新词能和旧词比较
-        all_candidates = [w for w in words if len(w['word']) >= self.min_length]
+        # 候选索引（在分片上下文中构建）：只对编辑距离近邻和经典词对评分，避免全量两两比较
+        shard_data = {
+            'words': [w['word'].lower() for w in all_candidates],
+            'ids': [w['id'] for w in all_candidates],
+            'min_length': self.min_length,
+        }
+        shards = split_shards(unprocessed_positions, self.SHARD_SIZE)
 
         total_found = 0
         skipped_existing = 0
         stats_by_type = {'classic': 0, 'computed': 0}
-
-        for i, w1 in enumerate(unprocessed):
-            if self._is_stopped():
-                break
-
-            found_count = 0
-
-            for w2 in all_candidates:
-                if w1['id'] >= w2['id']:
-                    continue
-
-                is_confused, score = self.calculate_confusion_score(w1['word'], w2['word'])
-
-                if is_confused:
-                    if self._add_relation(w1['id'], w2['id'], score, existing_relations):
+        total = len(unprocessed_positions)
+        i = 0
+
+        for shard, shard_results in zip(shards, self._run_shards(_score_shard, shard_data, shards)):
+            for pos, found in zip(shard, shard_results):
+                if self._is_stopped():
+                    break
+
+                w1 = all_candidates[pos]
+                found_count = 0
+                for p, score, classic in found:
+                    if self._add_relation(w1['id'], all_candidates[p]['id'], score, existing_relations):
                         found_count += 1
                         total_found += 1
-                        if (w1['word'].lower(), w2['word'].lower()) in self.classic_confused_pairs:
-                            stats_by_type['classic'] += 1
-                        else:
-                            stats_by_type['computed'] += 1
+                        stats_by_type['classic' if classic else 'computed'] += 1
                     else:
                         skipped_existing += 1
 
-            self._add_log(w1['id'], found_count)
-            self._flush()
-            self._report_progress(i + 1, len(unprocessed), total_found)
+                i += 1
+                self._add_log(w1['id'], found_count)
+                self._flush()
+                self._report_progress(i, total, total_found)
 
         return self._finalize({
             'total_found': total_found,
             'skipped_existing': skipped_existing,
             'by_type': stats_by_type,
-            'processed_count': len(unprocessed),
+            'processed_count': total,
         })
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+语言特征持久化存储 — 跨任务、跨用户、跨进程复用
+
+词根、词干、WordNet 反义词/同义词、上位词祖先、释义分词等特征只取决于小写单词本身，
+按 (namespace, word, 数据版本) 存入本地 SQLite（WAL 模式，多 worker 可并发读写）。
+数据版本由计算特征值的函数源码与常量（_FEATURE_SOURCES 逐项列出）、NLTK 版本、
+WordNet 语料位置和 FEATURE_SCHEMA_VERSION 共同决定，任一变化后旧特征自动失效；
+生成器中与特征无关的改动（日志、打分、流程）不影响版本。
+旧版本的行不在打开时删除（新旧代码的进程可能同时运行），
+由部署时运行的 scripts/prune_feature_store.py 清理。
+
+生成器通过 feature_view() 使用：先批量读出已有特征，缺失的现算并在结束时批量写回。
+未配置或无法打开存储时退化为纯内存计算，不影响生成结果。
+"""
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .wordnet_utils import wordnet_version
+
+logger = logging.getLogger(__name__)
+
+# 空字符串表示禁用
+FEATURE_STORE_PATH = os.environ.get(
+    "FEATURE_STORE_PATH", "/opt/vocabulary_app/feature-store/features.sqlite3"
+)
+
+# 特征存储格式变化时手动递增（计算逻辑的变化由源码哈希覆盖）
+FEATURE_SCHEMA_VERSION = "1"
+
+# 特征值依赖的代码与常量（"模块" 或 "模块:限定名"，模块相对本包）：
+# 函数/类取源码，其余常量取规范化后的 repr。新增特征或修改其计算路径时同步更新此表
+_FEATURE_SOURCES: Tuple[str, ...] = (
+    "data",
+    "pattern_matcher:AhoCorasickMatcher",
+    "wordnet_utils:get_synsets",
+    "hypernym_closure:filtered_ancestors",
+    "hypernym_closure:HypernymClosure.ancestors",
+    # latin_greek_roots / stem
+    "root_generator:_PATTERN_ROOTS",
+    "root_generator:_ROOT_EXAMPLES",
+    "root_generator:RootGenerator.extract_latin_greek_roots",
+    "root_generator:RootGenerator._validate_root_match",
+    "root_generator:RootGenerator._has_other_root_after",
+    "root_generator:RootGenerator.get_stem",
+    # wordnet_antonyms
+    "antonym_generator:AntonymGenerator._get_wordnet_antonyms",
+    # wordnet_synonyms
+    "synonym_generator:SynonymGenerator._wordnet_synonym_confidences",
+    "synonym_generator:SynonymGenerator._calculate_confidence",
+    # topic_ancestors / definition_tokens
+    "topic_generator:_GENERIC_ANCESTORS",
+    "topic_generator:_get_ancestors",
+    "topic_generator:TopicGenerator._word_ancestors",
+    "topic_generator:_STOP_WORDS",
+    "topic_generator:_DEFN_TOKEN_RE",
+    "topic_generator:_tokenize_definition",
+    "topic_generator:TopicGenerator._word_definition_tokens",
+)
+
+# SQLite 单条语句参数上限保守取值
+_CHUNK_SIZE = 500
+
+
+def _canonical(value: Any) -> Any:
+    """与哈希种子无关的表示（集合排序）"""
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(v) for v in value), key=repr)
+    if isinstance(value, dict):
+        return [(k, _canonical(v)) for k, v in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def _source_of(spec: str) -> str:
+    """_FEATURE_SOURCES 中一项的源码或常量表示"""
+    module_name, _, qualname = spec.partition(":")
+    obj: Any = importlib.import_module(f"{__package__}.{module_name}")
+    for attr in filter(None, qualname.split(".")):
+        obj = getattr(obj, attr)
+    if inspect.ismodule(obj) or inspect.isclass(obj) or inspect.isroutine(obj):
+        return inspect.getsource(obj)
+    return repr(_canonical(obj))
+
+
+def data_version() -> str:
+    """特征数据版本哈希"""
+    digest = hashlib.sha256()
+    digest.update(FEATURE_SCHEMA_VERSION.encode())
+    for spec in _FEATURE_SOURCES:
+        digest.update(spec.encode())
+        digest.update(_source_of(spec).encode())
+    digest.update(wordnet_version().encode())
+    return digest.hexdigest()[:16]
+
+
+class FeatureStore:
+    """SQLite 特征库（线程安全，单连接 + 锁）"""
+
+    def __init__(self, path: str, version: str):
+        self.path = path
+        self.version = version
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS features ("
+            "namespace TEXT NOT NULL, word TEXT NOT NULL, version TEXT NOT NULL, "
+            "value TEXT NOT NULL, PRIMARY KEY (namespace, word, version)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, namespace: str, words: Iterable[str]) -> Dict[str, Any]:
+        """批量读取，返回 {word: value}（仅含已存在的词）"""
+        words = list(dict.fromkeys(words))
+        result: Dict[str, Any] = {}
+        with self._lock:
+            for offset in range(0, len(words), _CHUNK_SIZE):
+                chunk = words[offset:offset + _CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT word, value FROM features "
+                    f"WHERE namespace = ? AND version = ? AND word IN ({placeholders})",
+                    (namespace, self.version, *chunk),
+                ).fetchall()
+                for word, value in rows:
+                    result[word] = json.loads(value)
+        return result
+
+    def put_many(self, namespace: str, values: Dict[str, Any]):
+        """批量写入（已存在则覆盖）"""
+        if not values:
+            return
+        rows = [
+            (namespace, word, self.version, json.dumps(value, ensure_ascii=False))
+            for word, value in values.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO features (namespace, word, version, value) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def prune(self) -> int:
+        """删除其他版本的特征，返回删除的行数（确认旧版本进程已退出后调用）"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM features WHERE version != ?", (self.version,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FeatureView:
+    """
+    一次生成任务中某个特征命名空间的视图
+
+    构造时批量预读，get() 命中直接返回、未命中现算并记录，save() 批量写回新特征。
+    值需可 JSON 序列化（集合请转为排序后的列表）。
+    """
+
+    def __init__(self, store: Optional[FeatureStore], namespace: str, words: Iterable[str]):
+        self._store = store
+        self._namespace = namespace
+        self._values: Dict[str, Any] = store.get_many(namespace, words) if store else {}
+        self._new: Dict[str, Any] = {}
+        self.hits = len(self._values)
+
+    def get(self, word: str, compute: Callable[[str], Any]) -> Any:
+        if word in self._values:
+            return self._values[word]
+        value = compute(word)
+        self._values[word] = value
+        self._new[word] = value
+        return value
+
+    def save(self):
+        if self._store is None or not self._new:
+            return
+        try:
+            self._store.put_many(self._namespace, self._new)
+        except sqlite3.Error as e:
+            logger.warning(f"Feature store write failed ({self._namespace}): {e}")
+        self._new = {}
+
+
+_store: Optional[FeatureStore] = None
+_store_disabled = False
+_store_lock = threading.Lock()
+
+
+def get_feature_store() -> Optional[FeatureStore]:
+    """获取进程级特征库（double-checked locking；禁用或打开失败时返回 None）"""
+    global _store, _store_disabled
+    if _store is not None or _store_disabled:
+        return _store
+    with _store_lock:
+        if _store is not None or _store_disabled:
+            return _store
+        if not FEATURE_STORE_PATH:
+            _store_disabled = True
+            return None
+        try:
+            os.makedirs(os.path.dirname(FEATURE_STORE_PATH) or ".", exist_ok=True)
+            _store = FeatureStore(FEATURE_STORE_PATH, data_version())
+            logger.info(f"Feature store opened: {FEATURE_STORE_PATH} (version={_store.version})")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Feature store unavailable, computing features in memory: {e}")
+            _store_disabled = True
+        return _store
+
+
+def feature_view(namespace: str, words: Iterable[str]) -> FeatureView:
+    """为一批（小写）单词创建特征视图"""
+    store = get_feature_store()
+    try:
+        return FeatureView(store, namespace, words)
+    except sqlite3.Error as e:
+        logger.warning(f"Feature store read failed ({namespace}): {e}")
+        return FeatureView(None, namespace, ())
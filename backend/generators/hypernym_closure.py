@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+WordNet 上位词闭包表 — TopicGenerator Phase 1 的预计算索引
+
+对每个名词/动词义项预先算好「max_depth 层内、过滤后的有效祖先」和自身 min_depth，
+以紧凑整数数组写入单个文件，运行时 mmap 只读打开（多进程共享页缓存）：
+
+    header | keys[u64] | min_depth[u16] | anc_offsets[u32] | anc_ids[u32]
+           | name_offsets[u32] | names[utf-8]
+
+keys 为 (词性编码 << 32 | WordNet offset) 升序，二分查找得到义项下标 i，
+其祖先即 anc_ids[anc_offsets[i]:anc_offsets[i + 1]]，无需再遍历上位词图。
+
+文件按 (max_depth, min_ancestor_depth) 参数化，头部记录 WordNet 版本与排除集合的哈希，
+不匹配时视为不存在，调用方回退到 BFS。构建：scripts/build_hypernym_closure.py
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from .wordnet_utils import NLTK_AVAILABLE, wordnet, wordnet_version
+
+logger = logging.getLogger(__name__)
+
+HYPERNYM_CLOSURE_DIR = os.environ.get(
+    "HYPERNYM_CLOSURE_DIR", "/opt/vocabulary_app/feature-store"
+)
+
+_MAGIC = b"HYPCLOS1"
+# magic, 字节序标记, max_depth, min_ancestor_depth, 义项数, 祖先 id 总数, 名称字节数, 版本哈希
+_HEADER = struct.Struct("<8sIIIIII16s")
+_BYTE_ORDER_MARK = 0x01020304
+_POS_CODES = {"n": 1, "v": 2}
+
+# 闭包表缺失或不可用时，间隔该秒数后再检查文件（构建脚本可能在进程启动后才完成）
+CLOSURE_RECHECK_SECONDS = 30.0
+
+
+def filtered_ancestors(
+    synset, max_depth: int, min_ancestor_depth: int, excluded: FrozenSet[str]
+) -> Set[str]:
+    """
+    synset 上溯 max_depth 层内的有效祖先（BFS）
+
+    仅保留 min_depth >= min_ancestor_depth 且不在 excluded 中的祖先。
+    """
+    ancestors = set()
+    queue = deque([(synset, 0)])
+    visited = {synset.name()}
+
+    while queue:
+        current, depth = queue.popleft()
+        if depth >= max_depth:
+            continue
+        for hypernym in current.hypernyms():
+            hname = hypernym.name()
+            if hname not in visited:
+                visited.add(hname)
+                if hname not in excluded and hypernym.min_depth() >= min_ancestor_depth:
+                    ancestors.add(hname)
+                queue.append((hypernym, depth + 1))
+
+    return ancestors
+
+
+def _synset_key(pos: str, offset: int) -> int:
+    return (_POS_CODES[pos] << 32) | offset
+
+
+def _closure_version(excluded: Iterable[str]) -> bytes:
+    digest = hashlib.sha256(wordnet_version().encode())
+    digest.update("\n".join(sorted(excluded)).encode())
+    return digest.hexdigest()[:16].encode()
+
+
+def closure_path(max_depth: int, min_ancestor_depth: int) -> str:
+    return os.path.join(
+        HYPERNYM_CLOSURE_DIR, f"hypernym_closure_{max_depth}_{min_ancestor_depth}.bin"
+    )
+
+
+def _aligned(buffer: bytearray):
+    """填充到 8 字节对齐，保证后续数组可按原生类型切片"""
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+class HypernymClosure:
+    """mmap 只读闭包表（线程安全，可在进程间共享页缓存）"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._map_sections(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _map_sections(self, path: str):
+        (magic, bom, self.max_depth, self.min_ancestor_depth,
+         n, n_ids, n_name_bytes, self.version) = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or bom != _BYTE_ORDER_MARK:
+            raise ValueError(f"not a hypernym closure file: {path}")
+        # 先按头部校验文件长度，截断的文件在创建任何视图前拒绝
+        sections = (8 * n, 2 * n, 4 * (n + 1), 4 * n_ids, 4 * (n + 1))
+        expected = (
+            _HEADER.size + (-_HEADER.size % 8)
+            + sum(size + (-size % 8) for size in sections) + n_name_bytes
+        )
+        if len(self._mm) < expected:
+            raise ValueError(f"truncated hypernym closure file: {path}")
+
+        view = memoryview(self._mm)
+        pos = _HEADER.size + (-_HEADER.size % 8)
+
+        def take(fmt: str, count: int) -> memoryview:
+            nonlocal pos
+            size = struct.calcsize(fmt) * count
+            section = view[pos:pos + size].cast(fmt)
+            pos += size + (-size % 8)
+            return section
+
+        self._keys = take("Q", n)
+        self._min_depths = take("H", n)
+        self._anc_offsets = take("I", n + 1)
+        self._anc_ids = take("I", n_ids)
+        self._name_offsets = take("I", n + 1)
+        self._names = view[pos:pos + n_name_bytes]
+
+    def close(self):
+        """释放各段视图并关闭 mmap（仅用于未交给调用方的实例）"""
+        for attr in ("_keys", "_min_depths", "_anc_offsets", "_anc_ids", "_name_offsets", "_names"):
+            section = self.__dict__.pop(attr, None)
+            if section is not None:
+                section.release()
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def index_of(self, synset) -> Optional[int]:
+        """义项在表中的下标（形容词/副词等不在表中时为 None）"""
+        code = _POS_CODES.get(synset.pos())
+        if code is None:
+            return None
+        key = (code << 32) | synset.offset()
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def ancestor_ids(self, index: int) -> memoryview:
+        return self._anc_ids[self._anc_offsets[index]:self._anc_offsets[index + 1]]
+
+    def name(self, index: int) -> str:
+        return bytes(self._names[self._name_offsets[index]:self._name_offsets[index + 1]]).decode()
+
+    def min_depth(self, index: int) -> int:
+        return self._min_depths[index]
+
+    def ancestors(self, synset) -> Tuple[str, ...]:
+        """synset 的有效祖先名称（不在表中的义项没有上位词，返回空）"""
+        index = self.index_of(synset)
+        if index is None:
+            return ()
+        return tuple(self.name(a) for a in self.ancestor_ids(index))
+
+
+def build_closure(
+    path: str, max_depth: int, min_ancestor_depth: int, excluded: FrozenSet[str]
+) -> int:
+    """为全部名词/动词义项构建闭包表并原子写入 path，返回义项数"""
+    synsets = sorted(
+        (s for pos in _POS_CODES for s in wordnet.all_synsets(pos)),
+        key=lambda s: _synset_key(s.pos(), s.offset()),
+    )
+    index_by_name: Dict[str, int] = {s.name(): i for i, s in enumerate(synsets)}
+
+    keys = array("Q", (_synset_key(s.pos(), s.offset()) for s in synsets))
+    min_depths = array("H", (s.min_depth() for s in synsets))
+    anc_offsets = array("I", [0])
+    anc_ids = array("I")
+    name_offsets = array("I", [0])
+    names = bytearray()
+    for synset in synsets:
+        anc_ids.extend(sorted(
+            index_by_name[name]
+            for name in filtered_ancestors(synset, max_depth, min_ancestor_depth, excluded)
+        ))
+        anc_offsets.append(len(anc_ids))
+        names.extend(synset.name().encode())
+        name_offsets.append(len(names))
+
+    buffer = bytearray(_HEADER.pack(
+        _MAGIC, _BYTE_ORDER_MARK, max_depth, min_ancestor_depth,
+        len(synsets), len(anc_ids), len(names), _closure_version(excluded),
+    ))
+    for section in (keys, min_depths, anc_offsets, anc_ids, name_offsets):
+        _aligned(buffer)
+        buffer.extend(section.tobytes())
+    _aligned(buffer)
+    buffer.extend(names)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)
+    return len(synsets)
+
+
+# (max_depth, min_ancestor_depth) → 已打开的闭包表
+_closures: Dict[Tuple[int, int], HypernymClosure] = {}
+# 不可用的参数 → (下次检查时间, 上次检查时的文件状态)，文件状态未变时不重复打开
+_unavailable: Dict[Tuple[int, int], Tuple[float, Optional[Tuple[int, int]]]] = {}
+_closures_lock = threading.Lock()
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_closure(
+    max_depth: int, min_ancestor_depth: int, excluded: FrozenSet[str]
+) -> Optional[HypernymClosure]:
+    """
+    打开 (max_depth, min_ancestor_depth) 对应的闭包表（进程级缓存）
+
+    文件缺失、损坏或与当前 WordNet/排除集合不匹配时返回 None；
+    之后每隔 CLOSURE_RECHECK_SECONDS 检查一次文件，文件出现或被替换后重新打开。
+    """
+    params = (max_depth, min_ancestor_depth)
+    closure = _closures.get(params)
+    if closure is not None:
+        return closure
+    if not NLTK_AVAILABLE:
+        return None
+    unavailable = _unavailable.get(params)
+    if unavailable is not None and time.monotonic() < unavailable[0]:
+        return None
+    with _closures_lock:
+        closure = _closures.get(params)
+        if closure is not None:
+            return closure
+        unavailable = _unavailable.get(params)
+        if unavailable is not None and time.monotonic() < unavailable[0]:
+            return None
+        path = closure_path(max_depth, min_ancestor_depth)
+        state = _file_state(path)
+        if state is not None and (unavailable is None or unavailable[1] != state):
+            closure = _open_closure(path, excluded)
+        if closure is None:
+            _unavailable[params] = (time.monotonic() + CLOSURE_RECHECK_SECONDS, state)
+            return None
+        _unavailable.pop(params, None)
+        _closures[params] = closure
+        return closure
+
+
+def _open_closure(path: str, excluded: FrozenSet[str]) -> Optional[HypernymClosure]:
+    """打开并校验闭包表；不可用时返回 None（已打开的 mmap 随即关闭）"""
+    try:
+        closure = HypernymClosure(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Hypernym closure unavailable, falling back to BFS: {e}")
+        return None
+    if closure.version != _closure_version(excluded):
+        logger.warning(f"Hypernym closure is stale, falling back to BFS: {path}")
+        closure.close()
+        return None
+    return closure
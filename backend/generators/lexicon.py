@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+预编译同义/反义词典 — Synonym/Antonym 生成器 Phase 1 的只读查找表
+
+离线把 WordNet 全部词元（小写）及 data.py 手工反义词表中的词编译成单个文件，
+每个词条记录：
+- 同义词及置信度（未按 min_confidence 过滤，与 SynonymGenerator 计算一致）
+- 反义词及来源（wordnet 优先，其次 manual，与 AntonymGenerator 合并顺序一致）
+
+文件布局（运行时 mmap 只读打开，多进程共享页缓存）：
+
+    header | key_offsets[u32] | value_offsets[u32] | keys[utf-8] | values[json]
+
+keys 按 UTF-8 字节序升序，二分查找；词条 JSON 按需解码并缓存。
+头部记录 WordNet 版本、data.py 与 LEXICON_SCHEMA_VERSION 的哈希，不匹配时视为不存在，
+生成器回退到实时计算。不在词典中的词（如屈折变化形式）同样回退。
+构建：scripts/build_lexicon.py
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .wordnet_utils import NLTK_AVAILABLE, wordnet, wordnet_version
+
+logger = logging.getLogger(__name__)
+
+LEXICON_PATH = os.environ.get("LEXICON_PATH", "/opt/vocabulary_app/feature-store/lexicon.bin")
+
+# 词条计算逻辑变化（而 data.py / WordNet 未变）时手动递增
+LEXICON_SCHEMA_VERSION = "1"
+
+_MAGIC = b"LEXICON1"
+# magic, 字节序标记, 词条数, 键字节数, 值字节数, 版本哈希
+_HEADER = struct.Struct("<8sIIII16s")
+_BYTE_ORDER_MARK = 0x01020304
+
+
+class LexiconEntry(NamedTuple):
+    synonyms: Dict[str, float]           # 同义词 → 置信度
+    antonyms: List[Tuple[str, str]]      # [(反义词, 来源), ...]，来源为 wordnet / manual
+
+
+def _lexicon_version() -> bytes:
+    digest = hashlib.sha256(LEXICON_SCHEMA_VERSION.encode())
+    digest.update((Path(__file__).parent / "data.py").read_bytes())
+    digest.update(wordnet_version().encode())
+    return digest.hexdigest()[:16].encode()
+
+
+class Lexicon:
+    """mmap 只读词典（线程安全）"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, bom, n, n_key_bytes, n_value_bytes, self.version = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or bom != _BYTE_ORDER_MARK:
+            self._mm.close()
+            raise ValueError(f"not a lexicon file: {path}")
+
+        view = memoryview(self._mm)
+        pos = _HEADER.size
+        offsets_size = 4 * (n + 1)
+        self._key_offsets = view[pos:pos + offsets_size].cast("I")
+        pos += offsets_size
+        self._value_offsets = view[pos:pos + offsets_size].cast("I")
+        pos += offsets_size
+        self._keys = view[pos:pos + n_key_bytes]
+        pos += n_key_bytes
+        self._values = view[pos:pos + n_value_bytes]
+        self._size = n
+        # 每个实例独立的词条解码缓存
+        self.get = lru_cache(maxsize=50000)(self._get)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _key(self, index: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[index]:self._key_offsets[index + 1]])
+
+    def _get(self, word_lower: str) -> Optional[LexiconEntry]:
+        """词条（不在词典中时为 None）"""
+        target = word_lower.encode()
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._size or self._key(lo) != target:
+            return None
+
+        raw = bytes(self._values[self._value_offsets[lo]:self._value_offsets[lo + 1]])
+        if not raw:
+            return LexiconEntry({}, [])
+        value = json.loads(raw)
+        return LexiconEntry(value.get("s", {}), [tuple(a) for a in value.get("a", ())])
+
+
+def compile_lexicon(path: str) -> int:
+    """编译全部词条并原子写入 path，返回词条数"""
+    from .antonym_generator import AntonymGenerator
+    from .synonym_generator import SynonymGenerator
+
+    synonym_generator = SynonymGenerator()
+    antonym_generator = AntonymGenerator()
+    words = {name.lower() for name in wordnet.all_lemma_names()}
+    words.update(antonym_generator.manual_antonyms)
+
+    key_offsets = array("I", [0])
+    value_offsets = array("I", [0])
+    keys = bytearray()
+    values = bytearray()
+    for word in sorted(words, key=str.encode):
+        synonyms = synonym_generator._wordnet_synonym_confidences(word)
+        antonyms = [[ant, "wordnet"] for ant in sorted(antonym_generator._get_wordnet_antonyms(word))]
+        seen = {ant for ant, _ in antonyms}
+        antonyms += [
+            [ant, "manual"] for ant in sorted(antonym_generator._get_manual_antonyms(word))
+            if ant not in seen
+        ]
+
+        value = {}
+        if synonyms:
+            value["s"] = synonyms
+        if antonyms:
+            value["a"] = antonyms
+        keys.extend(word.encode())
+        key_offsets.append(len(keys))
+        if value:
+            values.extend(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode())
+        value_offsets.append(len(values))
+
+    buffer = bytearray(_HEADER.pack(
+        _MAGIC, _BYTE_ORDER_MARK, len(key_offsets) - 1, len(keys), len(values), _lexicon_version(),
+    ))
+    buffer.extend(key_offsets.tobytes())
+    buffer.extend(value_offsets.tobytes())
+    buffer.extend(keys)
+    buffer.extend(values)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)
+    return len(key_offsets) - 1
+
+
+_lexicon: Optional[Lexicon] = None
+_lexicon_loaded = False
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon() -> Optional[Lexicon]:
+    """
+    进程级词典（首次调用时打开）
+
+    文件缺失、损坏或版本不匹配时返回 None，生成器回退到实时计算。
+    """
+    global _lexicon, _lexicon_loaded
+    if _lexicon_loaded:
+        return _lexicon
+    with _lexicon_lock:
+        if _lexicon_loaded:
+            return _lexicon
+        if NLTK_AVAILABLE and LEXICON_PATH and os.path.exists(LEXICON_PATH):
+            try:
+                lexicon = Lexicon(LEXICON_PATH)
+                if lexicon.version == _lexicon_version():
+                    _lexicon = lexicon
+                    logger.info(f"Lexicon loaded: {LEXICON_PATH} ({len(lexicon)} entries)")
+                else:
+                    logger.warning(f"Lexicon is stale, computing from WordNet: {LEXICON_PATH}")
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Lexicon unavailable, computing from WordNet: {e}")
+        _lexicon_loaded = True
+        return _lexicon
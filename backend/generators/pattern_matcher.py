@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+多模式子串匹配（Aho-Corasick 自动机）
+
+模式集合构建一次，之后对任意文本一趟扫描即可找出所有模式的全部出现位置，
+耗时与文本长度 + 命中数成正比，与模式数量无关。
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class AhoCorasickMatcher:
+    """Aho-Corasick 自动机（只读，可在线程间共享）"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+
+        for pattern in dict.fromkeys(patterns):
+            if pattern:
+                self._insert(pattern)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._output[state] += (pattern,)
+
+    def _build_failure_links(self):
+        """BFS 计算失败链接，并沿失败链接合并输出（后缀模式一并报告）"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                # 根的子节点失败链接指向根
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """返回所有命中 [(起始位置, 模式), ...]，按结束位置升序"""
+        goto, fail, output = self._goto, self._fail, self._output
+        matches: List[Tuple[int, str]] = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in output[state]:
+                matches.append((i - len(pattern) + 1, pattern))
+        return matches
+
+    def occurrences(self, text: str) -> Dict[str, List[int]]:
+        """模式 → 在 text 中所有起始位置（升序）"""
+        positions: Dict[str, List[int]] = {}
+        for start, pattern in self.find_all(text):
+            positions.setdefault(pattern, []).append(start)
+        for starts in positions.values():
+            starts.sort()
+        return positions
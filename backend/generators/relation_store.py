@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑的关系存储 — 已有关系集合与待写入关系缓冲
+
+- RelationSet：按关系类型分组，每条有向关系打包为一个 64 位键 (word_id << 32 | related_id)。
+  从数据库加载的关系存放在升序 array('Q') 中（每行 8 字节，二分查找）；
+  任务中新增的关系数量有限，放在普通 int 集合中。
+- FilteredRelationSet：已有关系很多时的替代品，每种关系类型只加载一个 Bloom 过滤器
+  （约 1.25 字节/行，由数据库端聚合生成）。过滤器未命中即确定不存在；命中只表示可能存在，
+  由 settle() 按批回库查实后再决定是否写入、是否计数。
+- RelationBuffer：生成器待写入的关系按列存放（array），整批交给
+  backend.database.relation_writer 写库，无需逐行构造 dict。
+"""
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+# lookup() 结果
+ABSENT = 0      # 确定不存在
+POSSIBLE = 1    # 过滤器命中，可能存在
+PRESENT = 2     # 确定存在
+
+# Bloom 过滤器：每行 10 位、7 个哈希，误判率约 0.8%
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+
+# 双重哈希 h1 + i·h2 (mod m) 的系数；数据库端构建（generation_service）使用同一公式，
+# 各乘积小于 2^62，bigint 运算不会溢出
+BLOOM_MULTIPLIERS = (2147483629, 2147483587, 1234567891, 1987654321)
+
+_WORD_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def pack_pair(word_id: int, related_id: int) -> int:
+    return (word_id << 32) | related_id
+
+
+def _sorted_contains(keys: array, key: int) -> bool:
+    i = bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
+
+
+class RelationSet:
+    """已有关系（有向；双向关系在库中即两行）"""
+
+    def __init__(self):
+        self._loaded: Dict[str, array] = {}     # relation_type → 升序打包键
+        self._added: Dict[str, Set[int]] = {}   # relation_type → 本任务新增的打包键
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int, str]]) -> "RelationSet":
+        """
+        由 (word_id, related_id, relation_type) 行构建
+
+        行按 (relation_type, word_id, related_id) 排序时直接追加；否则最后再排序。
+        """
+        relation_set = cls()
+        last: Dict[str, int] = {}
+        unsorted: Set[str] = set()
+        for word_id, related_id, relation_type in rows:
+            key = pack_pair(word_id, related_id)
+            keys = relation_set._loaded.get(relation_type)
+            if keys is None:
+                keys = relation_set._loaded[relation_type] = array("Q")
+            elif key <= last[relation_type]:
+                unsorted.add(relation_type)
+            keys.append(key)
+            last[relation_type] = key
+        for relation_type in unsorted:
+            relation_set._loaded[relation_type] = array(
+                "Q", sorted(set(relation_set._loaded[relation_type]))
+            )
+        return relation_set
+
+    def lookup(self, word_id: int, related_id: int, relation_type: str) -> int:
+        """PRESENT / ABSENT（精确集合不会返回 POSSIBLE）"""
+        key = pack_pair(word_id, related_id)
+        added = self._added.get(relation_type)
+        if added is not None and key in added:
+            return PRESENT
+        keys = self._loaded.get(relation_type)
+        if keys is not None and _sorted_contains(keys, key):
+            return PRESENT
+        return ABSENT
+
+    def settle(self, relation_type: str, pairs: Iterable[Tuple[int, int]]):
+        """把 pairs 中 lookup() 为 POSSIBLE 的关系查实（精确集合无需处理）"""
+
+    def add(self, word_id: int, related_id: int, relation_type: str):
+        self._added.setdefault(relation_type, set()).add(pack_pair(word_id, related_id))
+
+    def degrees(self, relation_type: str) -> Dict[int, int]:
+        """某一关系类型每个 word_id 的已有关系数（返回新字典，调用方可修改）"""
+        counts: Dict[int, int] = {}
+        for source in (self._loaded.get(relation_type, ()), self._added.get(relation_type, ())):
+            for key in source:
+                word_id = key >> 32
+                counts[word_id] = counts.get(word_id, 0) + 1
+        return counts
+
+    def __len__(self) -> int:
+        return sum(map(len, self._loaded.values())) + sum(map(len, self._added.values()))
+
+
+class BloomFilter:
+    """(word_id, related_id) 的 Bloom 过滤器，位数组按 64 位一组存放"""
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.words = array("Q", bytes(bits // 8))
+
+    @staticmethod
+    def bits_for(count: int) -> int:
+        """容纳 count 行所需的位数（64 的倍数）"""
+        return max(64, -(-count * BLOOM_BITS_PER_KEY // 64) * 64)
+
+    @classmethod
+    def from_words(cls, bits: int, rows: Iterable[Tuple[int, int]]) -> "BloomFilter":
+        """由 (组下标, 64 位值) 行构建；值可能以有符号 bigint 形式返回"""
+        bloom = cls(bits)
+        for slot, value in rows:
+            bloom.words[slot] = value & _WORD_MASK
+        return bloom
+
+    def _positions(self, word_id: int, related_id: int) -> Iterator[int]:
+        a, b, c, d = BLOOM_MULTIPLIERS
+        m = self.bits
+        h1 = (word_id * a + related_id * b) % m
+        h2 = (word_id * c + related_id * d) % (m - 1) + 1
+        for i in range(BLOOM_HASHES):
+            yield (h1 + i * h2) % m
+
+    def add(self, word_id: int, related_id: int):
+        for bit in self._positions(word_id, related_id):
+            self.words[bit >> 6] |= 1 << (bit & 63)
+
+    def might_contain(self, word_id: int, related_id: int) -> bool:
+        words = self.words
+        for bit in self._positions(word_id, related_id):
+            if not (words[bit >> 6] >> (bit & 63)) & 1:
+                return False
+        return True
+
+
+class FilteredRelationSet(RelationSet):
+    """
+    以 Bloom 过滤器代替已加载关系的 RelationSet
+
+    本任务新增的关系仍精确记录；过滤器命中返回 POSSIBLE，settle() 通过 pair_loader
+    （返回给定词对中库里实际存在的）批量查实后，lookup() 对这些词对返回 PRESENT / ABSENT。
+    degrees() 通过 degree_loader 读取数据库中的计数，应在写入该类型关系之前调用。
+    """
+
+    def __init__(
+        self,
+        filters: Dict[str, BloomFilter],
+        counts: Dict[str, int],
+        degree_loader: Callable[[str], Dict[int, int]],
+        pair_loader: Callable[[str, List[Tuple[int, int]]], Iterable[Tuple[int, int]]],
+    ):
+        super().__init__()
+        self._filters = filters
+        self._counts = counts
+        self._degree_loader = degree_loader
+        self._pair_loader = pair_loader
+        self._settled: Dict[str, Dict[int, bool]] = {}   # relation_type → 打包键 → 库中是否存在
+
+    def lookup(self, word_id: int, related_id: int, relation_type: str) -> int:
+        key = pack_pair(word_id, related_id)
+        added = self._added.get(relation_type)
+        if added is not None and key in added:
+            return PRESENT
+        settled = self._settled.get(relation_type)
+        if settled is not None and key in settled:
+            return PRESENT if settled[key] else ABSENT
+        bloom = self._filters.get(relation_type)
+        if bloom is not None and bloom.might_contain(word_id, related_id):
+            return POSSIBLE
+        return ABSENT
+
+    def settle(self, relation_type: str, pairs: Iterable[Tuple[int, int]]):
+        pending: Dict[int, Tuple[int, int]] = {}
+        for word_id, related_id in pairs:
+            if self.lookup(word_id, related_id, relation_type) == POSSIBLE:
+                pending[pack_pair(word_id, related_id)] = (word_id, related_id)
+        if not pending:
+            return
+        found = {
+            pack_pair(word_id, related_id)
+            for word_id, related_id in self._pair_loader(relation_type, list(pending.values()))
+        }
+        settled = self._settled.setdefault(relation_type, {})
+        for key in pending:
+            settled[key] = key in found
+
+    def degrees(self, relation_type: str) -> Dict[int, int]:
+        counts = dict(self._degree_loader(relation_type))
+        for key in self._added.get(relation_type, ()):
+            word_id = key >> 32
+            counts[word_id] = counts.get(word_id, 0) + 1
+        return counts
+
+    def __len__(self) -> int:
+        return sum(self._counts.values()) + sum(map(len, self._added.values()))
+
+
+class RelationBuffer:
+    """待写入关系的列式缓冲（单一关系类型）"""
+
+    __slots__ = ("relation_type", "word_ids", "related_word_ids", "confidences")
+
+    def __init__(self, relation_type: str):
+        self.relation_type = relation_type
+        self.word_ids = array("i")
+        self.related_word_ids = array("i")
+        # 双精度：置信度已按两位小数取整，单精度会写出 0.850000023841858 之类的值
+        self.confidences = array("d")
+
+    def append(self, word_id: int, related_id: int, confidence: float):
+        self.word_ids.append(word_id)
+        self.related_word_ids.append(related_id)
+        self.confidences.append(confidence)
+
+    def rows(self) -> Iterator[Tuple[int, int, str, float]]:
+        """逐行 (word_id, related_word_id, relation_type, confidence)"""
+        for word_id, related_id, confidence in zip(
+            self.word_ids, self.related_word_ids, self.confidences
+        ):
+            yield word_id, related_id, self.relation_type, confidence
+
+    def __len__(self) -> int:
+        return len(self.word_ids)
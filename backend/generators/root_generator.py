@@ -4,12 +4,17 @@
 
 基于拉丁/希腊词根和词干分析识别同源词。
 """
+from collections import defaultdict
 from typing import Callable, Optional, Tuple, Set, Dict, List
 from threading import Event
 import re
 
 from .base import BaseGenerator, GenerationResult
+from .relation_store import RelationSet
 from .data import COMMON_PREFIXES, LATIN_GREEK_ROOTS, ROOT_BLACKLIST
+from .feature_store import feature_view
+from .pattern_matcher import AhoCorasickMatcher
+from .worker_pool import WorkerPool
 
 try:
     from nltk.stem import PorterStemmer
@@ -20,11 +25,33 @@ except ImportError:
     NLTK_AVAILABLE = False
 
 
+def _build_root_patterns() -> Dict[str, List[str]]:
+    """词根及其变体 → 所属词根列表（同一字符串可能是多个词根的变体）"""
+    pattern_roots: Dict[str, List[str]] = defaultdict(list)
+    for root, root_info in LATIN_GREEK_ROOTS.items():
+        for pattern in [root, *root_info.get("variants", [])]:
+            if root not in pattern_roots[pattern]:
+                pattern_roots[pattern].append(root)
+    return dict(pattern_roots)
+
+
+# 模块导入时编译一次：所有词根 + 变体的多模式自动机，一趟扫描找出全部出现位置
+_PATTERN_ROOTS = _build_root_patterns()
+_ROOT_MATCHER = AhoCorasickMatcher(_PATTERN_ROOTS)
+_ROOT_EXAMPLES: Dict[str, frozenset] = {
+    root: frozenset(ex.lower() for ex in root_info["examples"])
+    for root, root_info in LATIN_GREEK_ROOTS.items()
+}
+
+
 class RootGenerator(BaseGenerator):
     """词根关系生成器"""
 
     relation_type = "root"
 
+    # 词干匹配要求的最短词干长度（与 are_same_root 保持一致）
+    MIN_STEM_LENGTH = 5
+
     # 预编译词形派生模式（避免 O(n²) 循环中重复编译）
     _DERIVATION_PATTERNS = [
         (re.compile(r"(.+)ly$"), re.compile(r"(.+)$")),
@@ -45,54 +72,53 @@ class RootGenerator(BaseGenerator):
         stop_event: Optional[Event] = None,
         on_save: Optional[Callable] = None,
         min_confidence: float = 0.75,
+        worker_pool: Optional[WorkerPool] = None,
+        checkpoint_key: Optional[str] = None,
     ):
-        super().__init__(on_progress=on_progress, stop_event=stop_event, on_save=on_save)
+        super().__init__(
+            on_progress=on_progress, stop_event=stop_event, on_save=on_save,
+            worker_pool=worker_pool, checkpoint_key=checkpoint_key,
+        )
         self.min_confidence = min_confidence
         self._stem_cache: Dict[str, str] = {}
         self._latin_root_cache: Dict[str, Set[str]] = {}
 
-    def _remove_prefixes(self, word: str) -> str:
-        """移除常见前缀"""
-        for prefix in sorted(COMMON_PREFIXES.keys(), key=len, reverse=True):
-            if word.startswith(prefix) and len(word) > len(prefix) + 2:
-                return word[len(prefix):]
-        return word
-
-    def _has_other_root_after(self, word: str, current_root: str) -> bool:
-        """检查词根后面是否还有另一个词根"""
-        root_pos = word.find(current_root)
-        if root_pos == -1:
+    def _has_other_root_after(
+        self, word: str, current_root: str, root_pos: int,
+        occurrences: Dict[str, List[int]]
+    ) -> bool:
+        """检查词根后面是否还有另一个词根（基于自动机给出的出现位置）"""
+        after_start = root_pos + len(current_root)
+        if len(word) - after_start < 3:
             return False
 
-        after_root = word[root_pos + len(current_root):]
-        if len(after_root) < 3:
-            return False
-
-        for other_root in LATIN_GREEK_ROOTS.keys():
+        for other_root, starts in occurrences.items():
             if other_root == current_root or len(other_root) < 4:
                 continue
-            if other_root in after_root:
+            if other_root in LATIN_GREEK_ROOTS and starts[-1] >= after_start:
                 return True
 
         return False
 
-    def _validate_root_match(self, word: str, root: str, root_info: dict) -> bool:
-        """验证词根匹配的有效性"""
+    def _validate_root_match(
+        self, word: str, root: str, examples: frozenset,
+        occurrences: Dict[str, List[int]]
+    ) -> bool:
+        """验证词根匹配的有效性（root 必须出现在 occurrences 中，取首次出现位置）"""
         if root in ROOT_BLACKLIST and word in ROOT_BLACKLIST[root]:
             return False
 
-        examples = [ex.lower() for ex in root_info["examples"]]
         if word in examples:
             return True
 
-        root_pos = word.find(root)
-        if root_pos == -1 or len(root) < 4:
+        if len(root) < 4:
             return False
+        root_pos = occurrences[root][0]
 
         if root_pos == 0:
             after_root = word[len(root):]
             if len(after_root) >= 2:
-                if self._has_other_root_after(word, root):
+                if self._has_other_root_after(word, root, root_pos, occurrences):
                     return False
                 return True
             return False
@@ -112,27 +138,21 @@ class RootGenerator(BaseGenerator):
         return False
 
     def extract_latin_greek_roots(self, word: str) -> Set[str]:
-        """提取单词中的拉丁/希腊词根"""
+        """提取单词中的拉丁/希腊词根：词根本身或任一变体出现且通过验证即计入"""
         word_lower = word.lower()
 
         if word_lower in self._latin_root_cache:
             return self._latin_root_cache[word_lower]
 
         found_roots = set()
-        word_without_prefix = self._remove_prefixes(word_lower)
+        occurrences = _ROOT_MATCHER.occurrences(word_lower)
 
-        for root, root_info in LATIN_GREEK_ROOTS.items():
-            if root in word_without_prefix or root in word_lower:
-                if self._validate_root_match(word_lower, root, root_info):
-                    found_roots.add(root)
+        for pattern in occurrences:
+            for root in _PATTERN_ROOTS[pattern]:
+                if root in found_roots:
                     continue
-
-            variants = root_info.get("variants", [])
-            for variant in variants:
-                if variant in word_without_prefix or variant in word_lower:
-                    if self._validate_root_match(word_lower, variant, root_info):
-                        found_roots.add(root)
-                        break
+                if self._validate_root_match(word_lower, pattern, _ROOT_EXAMPLES[root], occurrences):
+                    found_roots.add(root)
 
         self._latin_root_cache[word_lower] = found_roots
         return found_roots
@@ -208,7 +228,7 @@ class RootGenerator(BaseGenerator):
             return True, min(1.0, confidence)
 
         stem1, stem2 = self.get_stem(w1_lower), self.get_stem(w2_lower)
-        if stem1 == stem2 and len(stem1) >= 5:
+        if stem1 == stem2 and len(stem1) >= self.MIN_STEM_LENGTH:
             if self._is_derivational_pair(w1_lower, w2_lower):
                 return True, 0.80
 
@@ -218,7 +238,7 @@ class RootGenerator(BaseGenerator):
         self,
         words: List[Dict],
         word_index: Dict[str, int],
-        existing_relations: Set[Tuple[int, int, str]],
+        existing_relations: RelationSet,
         processed_word_ids: Set[int]
     ) -> GenerationResult:
         """生成词根关系"""
@@ -232,23 +252,43 @@ class RootGenerator(BaseGenerator):
         skipped_existing = 0
         stats_by_method = {'latin_greek': 0, 'stem': 0}
 
-        # Phase 1: 预计算词根缓存
-        for idx, word in enumerate(words):
+        # Phase 1: 预计算词根/词干缓存（优先读特征库），同时建立倒排表（词根/词干 → words 下标）
+        words_lower = [w["word"].lower() for w in words]
+        roots_view = feature_view("latin_greek_roots", words_lower)
+        stems_view = feature_view("stem", words_lower)
+        root_postings: Dict[str, List[int]] = defaultdict(list)
+        stem_postings: Dict[str, List[int]] = defaultdict(list)
+        for idx, word_lower in enumerate(words_lower):
             if self._is_stopped():
                 break
-            self.extract_latin_greek_roots(word["word"])
-            self.get_stem(word["word"])
+            roots = set(roots_view.get(
+                word_lower, lambda w: sorted(self.extract_latin_greek_roots(w))
+            ))
+            self._latin_root_cache[word_lower] = roots
+            for root in roots:
+                root_postings[root].append(idx)
+            stem = self._stem_cache[word_lower] = stems_view.get(word_lower, self.get_stem)
+            if len(stem) >= self.MIN_STEM_LENGTH:
+                stem_postings[stem].append(idx)
             if (idx + 1) % 100 == 0 or idx == len(words) - 1:
                 self._report_progress(0, len(unprocessed), 0)
+        roots_view.save()
+        stems_view.save()
 
-        # Phase 2: 比较词对
+        # Phase 2: 只比较共享词根或词干的词对（倒排表取并集，按 words 顺序遍历）
         for i, w1 in enumerate(unprocessed):
             if self._is_stopped():
                 break
 
             found_count = 0
 
-            for w2 in words:
+            candidates: Set[int] = set()
+            for root in self.extract_latin_greek_roots(w1["word"]):
+                candidates.update(root_postings.get(root, ()))
+            candidates.update(stem_postings.get(self.get_stem(w1["word"]), ()))
+
+            for idx in sorted(candidates):
+                w2 = words[idx]
                 if w1['id'] >= w2['id']:
                     continue
 
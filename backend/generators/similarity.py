@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+带阈值的字符串相似度内核 — 易混淆词评分的最内层循环
+
+- bounded_levenshtein: 只在 |i - j| ≤ max_distance 的对角带内做 DP，
+  整行都超过阈值时提前退出；超过阈值统一返回 max_distance + 1。
+- sequence_ratio: 与 difflib.SequenceMatcher(None, a, b).ratio() 结果完全一致，
+  省去对象构造、junk 处理和匹配块合并；候选词的字符位置表跨调用缓存。
+- batch_similarity: 一个词对一批候选词，一次调用返回 (编辑距离, ratio)。
+"""
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# SequenceMatcher 在 len(b) >= 200 时启用 autojunk 启发式，超过此长度回退到 difflib
+_AUTOJUNK_MIN_LEN = 200
+
+
+def bounded_levenshtein(s1: str, s2: str, max_distance: int) -> int:
+    """
+    编辑距离（带上界）
+
+    返回值 ≤ max_distance 时为精确距离；否则返回 max_distance + 1。
+    """
+    if s1 == s2:
+        return 0
+
+    over = max_distance + 1
+    if abs(len(s1) - len(s2)) > max_distance:
+        return over
+
+    # 去掉公共前后缀，不影响距离
+    start = 0
+    end1, end2 = len(s1), len(s2)
+    while start < end1 and start < end2 and s1[start] == s2[start]:
+        start += 1
+    while end1 > start and end2 > start and s1[end1 - 1] == s2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+    s1, s2 = s1[start:end1], s2[start:end2]
+
+    n1, n2 = len(s1), len(s2)
+    if n1 == 0 or n2 == 0:
+        dist = n1 + n2
+        return dist if dist <= max_distance else over
+
+    # 带外单元视为无穷大（over）
+    previous_row = [j if j <= max_distance else over for j in range(n2 + 1)]
+    for i in range(1, n1 + 1):
+        c1 = s1[i - 1]
+        lo = max(1, i - max_distance)
+        hi = min(n2, i + max_distance)
+
+        current_row = [over] * (n2 + 1)
+        current_row[0] = i if i <= max_distance else over
+        row_min = current_row[0] if lo == 1 else over
+
+        for j in range(lo, hi + 1):
+            value = previous_row[j - 1] + (c1 != s2[j - 1])
+            insertion = previous_row[j] + 1
+            if insertion < value:
+                value = insertion
+            deletion = current_row[j - 1] + 1
+            if deletion < value:
+                value = deletion
+            if value > over:
+                value = over
+            current_row[j] = value
+            if value < row_min:
+                row_min = value
+
+        # 任何到达终点的路径都经过本行，本行全部超限即可提前结束
+        if row_min > max_distance:
+            return over
+        previous_row = current_row
+
+    dist = previous_row[n2]
+    return dist if dist <= max_distance else over
+
+
+@lru_cache(maxsize=50000)
+def _char_positions(s: str) -> Dict[str, Tuple[int, ...]]:
+    """字符 → 在 s 中出现的位置（升序），即 SequenceMatcher 的 b2j"""
+    positions: Dict[str, List[int]] = {}
+    for j, ch in enumerate(s):
+        positions.setdefault(ch, []).append(j)
+    return {ch: tuple(js) for ch, js in positions.items()}
+
+
+def _matching_characters(a: str, b: str) -> int:
+    """
+    SequenceMatcher.get_matching_blocks 的匹配字符总数
+
+    与 difflib 相同：在子区间中取最长公共子串（i 最小、其次 j 最小），
+    再对左右两侧递归。b 较短时无 junk / popular 元素，无需扩展步骤。
+    """
+    b2j = _char_positions(b)
+    total = 0
+    queue = [(0, len(a), 0, len(b))]
+    while queue:
+        alo, ahi, blo, bhi = queue.pop()
+        besti, bestj, bestsize = alo, blo, 0
+        j2len: Dict[int, int] = {}
+        for i in range(alo, ahi):
+            j2lenget = j2len.get
+            newj2len: Dict[int, int] = {}
+            for j in b2j.get(a[i], ()):
+                if j < blo:
+                    continue
+                if j >= bhi:
+                    break
+                k = newj2len[j] = j2lenget(j - 1, 0) + 1
+                if k > bestsize:
+                    besti, bestj, bestsize = i - k + 1, j - k + 1, k
+            j2len = newj2len
+
+        if bestsize:
+            total += bestsize
+            if alo < besti and blo < bestj:
+                queue.append((alo, besti, blo, bestj))
+            if besti + bestsize < ahi and bestj + bestsize < bhi:
+                queue.append((besti + bestsize, ahi, bestj + bestsize, bhi))
+    return total
+
+
+def sequence_ratio(a: str, b: str) -> float:
+    """等价于 SequenceMatcher(None, a, b).ratio()"""
+    length = len(a) + len(b)
+    if not length:
+        return 1.0
+    if len(b) >= _AUTOJUNK_MIN_LEN:
+        return SequenceMatcher(None, a, b).ratio()
+    return 2.0 * _matching_characters(a, b) / length
+
+
+def batch_similarity(
+    word: str,
+    candidates: Sequence[str],
+    max_distance: int,
+) -> List[Tuple[int, Optional[float]]]:
+    """
+    一个词对一批候选词打分
+
+    返回与 candidates 对齐的 [(编辑距离, ratio), ...]；
+    距离超过 max_distance 的候选 ratio 为 None（不再计算）。
+    """
+    results: List[Tuple[int, Optional[float]]] = []
+    for candidate in candidates:
+        dist = bounded_levenshtein(word, candidate, max_distance)
+        if dist > max_distance:
+            results.append((dist, None))
+        else:
+            results.append((dist, sequence_ratio(word, candidate)))
+    return results
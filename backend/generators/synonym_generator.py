@@ -3,53 +3,121 @@
 同义词关系生成器
 
 使用 WordNet 直接同义词 + 语义相似度两种方法找同义词。
+
+语义相似度按分片计算，已完成的分片前缀保存为检查点；相似度计算中停止或中断时
+不写入该阶段的关系与日志，重新启动后从中断的分片继续（见 checkpoint.py）。
+检查点不可用时，停止后照常写入已得到的关系与日志。
 """
-from typing import Callable, Dict, List, Optional, Set, Tuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
 from threading import Event
+import math
 import os
+import time
 
 from .base import BaseGenerator, GenerationResult
-from .wordnet_utils import get_synsets, NLTK_AVAILABLE
+from .checkpoint import PhaseCheckpoint, phase_checkpoint
+from .relation_store import RelationSet
+from .feature_store import feature_view
+from .lexicon import get_lexicon
+from .wordnet_utils import (
+    NLTK_AVAILABLE,
+    get_synsets,
+    hypernym_distances,
+    max_path_hops,
+    synset_similarity,
+)
+from .worker_pool import ShardContext, WorkerPool, split_shards
+
+# 语义相似度阈值（path_similarity），可通过环境变量调整
+DEFAULT_SEMANTIC_THRESHOLD = float(os.environ.get("SYNONYM_SEMANTIC_THRESHOLD", "0.8"))
+
+# 每个词参与语义相似度比较的义项数
+SEMANTIC_SYNSETS_PER_WORD = 2
 
-try:
-    from nltk.corpus import wordnet
-except ImportError:
-    pass
+# 每个进程池分片包含的候选词对数
+SEMANTIC_SHARD_SIZE = 2000
 
+# 语义相似度检查点的保存间隔（秒；停止和完成时总会保存）
+SEMANTIC_CHECKPOINT_INTERVAL = 30.0
 
-def _compute_similarity_batch(args):
+
+def _pair_similarity(synsets1: Sequence, synsets2: Sequence, threshold: float) -> float:
     """
-    计算一批词对的语义相似度（用于并行处理）
+    两组义项的语义相似度
 
-    为了支持多进程，传递 word 字符串而非 synset 对象
+    按义项顺序遇到第一个 ≥ threshold 的 path_similarity 即返回；都不达标时返回最大值。
     """
-    batch_indices, words_data, threshold = args
-    batch_results = {}
-
-    for i in batch_indices:
-        w1 = words_data[i]
-        w1_synsets = wordnet.synsets(w1['word'].lower())[:2]
-
-        for j in range(i + 1, len(words_data)):
-            w2 = words_data[j]
-            w2_synsets = wordnet.synsets(w2['word'].lower())[:2]
-
-            max_similarity = 0
-            for s1 in w1_synsets:
-                for s2 in w2_synsets:
-                    sim = s1.path_similarity(s2)
-                    if sim and sim > max_similarity:
-                        max_similarity = sim
-                        if sim >= threshold:
-                            break
-                if max_similarity >= threshold:
+    max_similarity = 0
+    for s1 in synsets1:
+        for s2 in synsets2:
+            sim = synset_similarity(s1, s2)
+            if sim and sim > max_similarity:
+                max_similarity = sim
+                if sim >= threshold:
                     break
+        if max_similarity >= threshold:
+            break
+    return max_similarity
+
+
+def _score_pairs_shard(
+    context: ShardContext, shard: Sequence[Tuple[int, int]]
+) -> List[Tuple[int, int, float]]:
+    """分片函数：对候选下标对精确计算相似度，返回达标的 [(i, j, 相似度), ...]"""
+    words, threshold = context.data["words"], context.data["threshold"]
+    passed = []
+    for i, j in shard:
+        similarity = _pair_similarity(
+            get_synsets(words[i])[:SEMANTIC_SYNSETS_PER_WORD],
+            get_synsets(words[j])[:SEMANTIC_SYNSETS_PER_WORD],
+            threshold,
+        )
+        if similarity >= threshold:
+            passed.append((i, j, similarity))
+    return passed
+
+
+def _candidate_pairs(synset_lists: List[Sequence], threshold: float) -> List[Tuple[int, int]]:
+    """
+    阈值约束下可能达标的下标对 (i, j)，i < j，升序
 
-            if max_similarity >= threshold:
-                batch_results[(w1['id'], w2['id'])] = max_similarity
+    path_similarity ≥ threshold ⇔ 路径边数 ≤ k = floor(1/threshold − 1)。
+    以 k 步内的祖先为键做等值连接：两词共享某祖先且两侧距离之和 ≤ k 才成为候选，
+    k = 0（默认阈值 0.8）时即「共享同一义项」。候选是达标词对的超集，最终仍精确计算。
+    """
+    n = len(synset_lists)
+    max_hops = max_path_hops(threshold)
+    if max_hops < 0:
+        return []
+    if math.isinf(max_hops):
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+    # 祖先 → [(该词到祖先的最短距离, 词下标), ...]
+    buckets: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    for i, synsets in enumerate(synset_lists):
+        nearest: Dict[str, int] = {}
+        for synset in synsets:
+            for ancestor, dist in hypernym_distances(synset, max_hops).items():
+                if dist < nearest.get(ancestor, max_hops + 1):
+                    nearest[ancestor] = dist
+        for ancestor, dist in nearest.items():
+            buckets[ancestor].append((dist, i))
+
+    pairs: Set[Tuple[int, int]] = set()
+    for entries in buckets.values():
+        if len(entries) < 2:
+            continue
+        entries.sort()
+        for a, (d1, i) in enumerate(entries):
+            if 2 * d1 > max_hops:
+                break
+            for d2, j in entries[a + 1:]:
+                if d1 + d2 > max_hops:
+                    break
+                pairs.add((i, j) if i < j else (j, i))
 
-    return batch_results
+    return sorted(pairs)
 
 
 class SynonymGenerator(BaseGenerator):
@@ -63,11 +131,18 @@ class SynonymGenerator(BaseGenerator):
         stop_event: Optional[Event] = None,
         on_save: Optional[Callable] = None,
         min_confidence: float = 0.6,
-        semantic_threshold: float = 0.8,
+        semantic_threshold: Optional[float] = None,
+        worker_pool: Optional[WorkerPool] = None,
+        checkpoint_key: Optional[str] = None,
     ):
-        super().__init__(on_progress=on_progress, stop_event=stop_event, on_save=on_save)
+        super().__init__(
+            on_progress=on_progress, stop_event=stop_event, on_save=on_save,
+            worker_pool=worker_pool, checkpoint_key=checkpoint_key,
+        )
         self.min_confidence = min_confidence
-        self.semantic_threshold = semantic_threshold
+        self.semantic_threshold = (
+            DEFAULT_SEMANTIC_THRESHOLD if semantic_threshold is None else semantic_threshold
+        )
 
     def _calculate_confidence(self, synset, lemma) -> float:
         """计算 WordNet 同义词的置信度"""
@@ -85,8 +160,12 @@ class SynonymGenerator(BaseGenerator):
 
     def _get_wordnet_synonyms(self, word: str) -> Dict[str, float]:
         """获取 WordNet 直接同义词"""
+        synonyms = self._wordnet_synonym_confidences(word.lower())
+        return {k: v for k, v in synonyms.items() if v >= self.min_confidence}
+
+    def _wordnet_synonym_confidences(self, word_lower: str) -> Dict[str, float]:
+        """WordNet 同义词及其最高置信度（未按 min_confidence 过滤，可持久化复用）"""
         synonyms = {}
-        word_lower = word.lower()
 
         synsets = get_synsets(word_lower)
         if not synsets:
@@ -102,46 +181,67 @@ class SynonymGenerator(BaseGenerator):
                     else:
                         synonyms[syn_word] = confidence
 
-        return {k: v for k, v in synonyms.items() if v >= self.min_confidence}
+        return synonyms
 
     def _compute_semantic_similarities(
         self,
         words: List[Dict],
-    ) -> Dict[Tuple[int, int], float]:
-        """使用并行计算语义相似度"""
+        checkpoint: PhaseCheckpoint,
+    ) -> Tuple[Dict[Tuple[int, int], float], bool]:
+        """
+        按阈值约束的义项邻域连接出候选词对，只对候选计算语义相似度
+
+        分片顺序固定，检查点记录已完成的分片数及其达标词对，读回后跳过这些分片。
+        返回 (达标词对, 是否算完全部分片)；停止时只含已完成分片的结果。
+        """
         words_with_synsets = [w for w in words if get_synsets(w['word'])]
-        total = len(words_with_synsets)
-
-        if total == 0:
-            return {}
-
-        similar_pairs = {}
-
-        n_workers = min(os.cpu_count() or 4, 8)
-        batch_size = 100
-        batches = []
+        if not words_with_synsets:
+            return {}, True
 
-        for i in range(0, total, batch_size):
-            batch_indices = list(range(i, min(i + batch_size, total)))
-            batches.append((batch_indices, words_with_synsets, self.semantic_threshold))
+        threshold = self.semantic_threshold
+        synset_lists = [
+            get_synsets(w['word'])[:SEMANTIC_SYNSETS_PER_WORD] for w in words_with_synsets
+        ]
 
-        with ProcessPoolExecutor(max_workers=n_workers) as executor:
-            futures = [executor.submit(_compute_similarity_batch, b) for b in batches]
+        shards = split_shards(_candidate_pairs(synset_lists, threshold), SEMANTIC_SHARD_SIZE)
+        shard_data = {
+            'words': [w['word'] for w in words_with_synsets],
+            'threshold': threshold,
+        }
 
-            for future in as_completed(futures):
-                if self._is_stopped():
-                    for f in futures:
-                        f.cancel()
-                    break
-                similar_pairs.update(future.result())
-
-        return similar_pairs
+        similar_pairs = {}
+        done = 0
+        saved = checkpoint.load("semantic_pairs")
+        if saved is not None:
+            done = saved["shards"]
+            for w1_id, w2_id, similarity in saved["pairs"]:
+                similar_pairs[(w1_id, w2_id)] = similarity
+
+        def save():
+            checkpoint.save("semantic_pairs", {
+                "shards": done,
+                "pairs": [[w1_id, w2_id, sim] for (w1_id, w2_id), sim in similar_pairs.items()],
+            })
+
+        resumed = done
+        saved_at = time.monotonic()
+        for passed in self._run_shards(_score_pairs_shard, shard_data, shards[done:]):
+            for i, j, similarity in passed:
+                similar_pairs[(words_with_synsets[i]['id'], words_with_synsets[j]['id'])] = similarity
+            done += 1
+            if checkpoint.enabled and time.monotonic() - saved_at >= SEMANTIC_CHECKPOINT_INTERVAL:
+                save()
+                saved_at = time.monotonic()
+
+        if done > resumed:
+            save()
+        return similar_pairs, done == len(shards)
 
     def generate(
         self,
         words: List[Dict],
         word_index: Dict[str, int],
-        existing_relations: Set[Tuple[int, int, str]],
+        existing_relations: RelationSet,
         processed_word_ids: Set[int]
     ) -> GenerationResult:
         """生成同义词关系"""
@@ -157,6 +257,26 @@ class SynonymGenerator(BaseGenerator):
         total_found = 0
         skipped_existing = 0
         phase1_found_counts: Dict[int, int] = {}
+        checkpoint = phase_checkpoint(
+            self._checkpoint_key, self.relation_type,
+            self.min_confidence, self.semantic_threshold,
+            SEMANTIC_SYNSETS_PER_WORD, SEMANTIC_SHARD_SIZE,
+            [[w['id'], w['word']] for w in unprocessed],
+        )
+        # 中断前已写入的 Phase 1 关系在重新运行时视为已存在，发现数沿用检查点中的记录
+        resumed_counts = dict(checkpoint.load("phase1_counts") or [])
+        # 没有检查点时 Phase 1 逐词记录日志；有检查点时日志在 Phase 2 后按两阶段合计记录，
+        # Phase 1 关系每次写入前先保存计数，中断后重新运行时据此补记
+        logs_per_word = not checkpoint.enabled
+        # 预编译词典命中的词直接查表，其余词走特征库 / 实时计算
+        lexicon = get_lexicon()
+        lexicon_entries = {
+            w['word'].lower(): lexicon.get(w['word'].lower()) if lexicon else None
+            for w in unprocessed
+        }
+        synonyms_view = feature_view(
+            "wordnet_synonyms", [w for w, entry in lexicon_entries.items() if entry is None]
+        )
 
         # Phase 1: WordNet 直接同义词
         for i, word_data in enumerate(unprocessed):
@@ -167,9 +287,15 @@ class SynonymGenerator(BaseGenerator):
             word_id = word_data['id']
             found_count = 0
 
-            synonyms = self._get_wordnet_synonyms(word)
+            entry = lexicon_entries[word.lower()]
+            if entry is not None:
+                synonyms = entry.synonyms
+            else:
+                synonyms = synonyms_view.get(word.lower(), self._wordnet_synonym_confidences)
 
             for syn_word, confidence in synonyms.items():
+                if confidence < self.min_confidence:
+                    continue
                 if syn_word in word_index:
                     related_id = word_index[syn_word]
                     if self._add_relation(word_id, related_id, confidence, existing_relations):
@@ -178,16 +304,42 @@ class SynonymGenerator(BaseGenerator):
                     else:
                         skipped_existing += 1
 
-            phase1_found_counts[word_id] = found_count
-            self._add_log(word_id, found_count)
+            phase1_found_counts[word_id] = max(found_count, resumed_counts.get(word_id, 0))
+            if logs_per_word:
+                self._add_log(word_id, phase1_found_counts[word_id])
+            elif self._flush_due():
+                checkpoint.save("phase1_counts", list(phase1_found_counts.items()))
+                if not checkpoint.enabled:
+                    # 检查点写入失败：已处理的词随这批关系一起记录日志，之后逐词记录
+                    logs_per_word = True
+                    for wid, count in phase1_found_counts.items():
+                        self._add_log(wid, count)
             self._flush()
             self._report_progress(i + 1, len(unprocessed), total_found)
 
-        # Phase 2: 语义相似度（如果未停止）
-        semantic_found = 0
-        if not self._is_stopped():
-            semantic_pairs = self._compute_semantic_similarities(unprocessed)
+        synonyms_view.save()
 
+        # 只检查一次停止状态：Phase 1 中停止时已处理的词照常记录日志，跳过 Phase 2
+        semantic_found = 0
+        if self._is_stopped():
+            if not logs_per_word:
+                for word_id, found_count in phase1_found_counts.items():
+                    self._add_log(word_id, found_count)
+        else:
+            # Phase 2: 语义相似度
+            if not logs_per_word:
+                checkpoint.save("phase1_counts", list(phase1_found_counts.items()))
+            semantic_pairs, complete = self._compute_semantic_similarities(unprocessed, checkpoint)
+
+            # 检查点在 Phase 1 计数与相似度分片写入后仍可用，才能推迟到重新启动时写入
+            deferred = not complete and checkpoint.enabled
+            if deferred:
+                # 相似度计算中停止：已算出的词对留在检查点中，不写入关系和日志，
+                # 未处理单词不变，重新启动时从中断的分片继续
+                semantic_pairs = {}
+                phase1_found_counts = {}
+
+            self._settle_relations(semantic_pairs, existing_relations)
             semantic_counts: Dict[int, int] = {}
             for (w1_id, w2_id), confidence in semantic_pairs.items():
                 if self._add_relation(w1_id, w2_id, confidence, existing_relations):
@@ -198,13 +350,16 @@ class SynonymGenerator(BaseGenerator):
                 else:
                     skipped_existing += 1
 
-            # 更新有语义新增关系的词的 log found_count
-            for wid, sem_count in semantic_counts.items():
-                self._add_log(wid, phase1_found_counts.get(wid, 0) + sem_count)
+            # 两阶段合计的 log found_count（Phase 1 已逐词记录时只更新有语义新增关系的词）
+            for wid in semantic_counts if logs_per_word else phase1_found_counts:
+                self._add_log(wid, phase1_found_counts.get(wid, 0) + semantic_counts.get(wid, 0))
 
             self._flush()
             self._report_progress(len(unprocessed), len(unprocessed), total_found)
 
+            if not deferred:
+                checkpoint.clear()
+
         return self._finalize({
             'total_found': total_found,
             'skipped_existing': skipped_existing,
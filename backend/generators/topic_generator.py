@@ -7,6 +7,9 @@
 双阶段策略：
   Phase 1 — 上位词聚类：共享同一语义祖先的词汇（如 salmon ↔ trout 共享 fish）
   Phase 2 — 释义交叉引用：释义中互相提及的词汇（如 surgeon 的释义提到 surgery）
+
+两阶段的结果只取决于单词集合，完成后保存检查点；任务中断后重新启动时直接读回，
+从写入阶段继续（见 checkpoint.py）。
 """
 from collections import defaultdict
 from typing import Callable, Dict, List, Optional, Set, Tuple
@@ -15,12 +18,12 @@ from threading import Event
 import re
 
 from .base import BaseGenerator, GenerationResult
-from .wordnet_utils import get_synsets, NLTK_AVAILABLE
-
-try:
-    from nltk.corpus import wordnet
-except ImportError:
-    pass
+from .checkpoint import phase_checkpoint
+from .relation_store import RelationSet
+from .feature_store import feature_view
+from .hypernym_closure import filtered_ancestors, load_closure
+from .wordnet_utils import get_synsets, wordnet, NLTK_AVAILABLE
+from .worker_pool import WorkerPool
 
 # ─── 常量 ──────────────────────────────────────────────────────────
 
@@ -67,7 +70,7 @@ _STOP_WORDS = frozenset({
 @lru_cache(maxsize=50000)
 def _get_ancestors(synset_name: str, max_depth: int, min_ancestor_depth: int):
     """
-    获取 synset 的有效祖先节点（BFS，缓存结果）
+    获取 synset 的有效祖先节点（BFS，缓存结果；闭包表不可用时的回退路径）
 
     仅返回 min_depth >= min_ancestor_depth 且不在黑名单中的祖先。
     """
@@ -76,23 +79,9 @@ def _get_ancestors(synset_name: str, max_depth: int, min_ancestor_depth: int):
     except Exception:
         return frozenset()
 
-    ancestors = set()
-    queue = [(synset, 0)]
-    visited = {synset_name}
-
-    while queue:
-        current, depth = queue.pop(0)
-        if depth >= max_depth:
-            continue
-        for hypernym in current.hypernyms():
-            hname = hypernym.name()
-            if hname not in visited:
-                visited.add(hname)
-                if hname not in _GENERIC_ANCESTORS and hypernym.min_depth() >= min_ancestor_depth:
-                    ancestors.add(hname)
-                queue.append((hypernym, depth + 1))
-
-    return frozenset(ancestors)
+    return frozenset(
+        filtered_ancestors(synset, max_depth, min_ancestor_depth, _GENERIC_ANCESTORS)
+    )
 
 
 _DEFN_TOKEN_RE = re.compile(r'[a-z]+')
@@ -142,8 +131,35 @@ class TopicGenerator(BaseGenerator):
         on_progress: Optional[Callable[[int, int, int], None]] = None,
         stop_event: Optional[Event] = None,
         on_save: Optional[Callable] = None,
+        worker_pool: Optional[WorkerPool] = None,
+        checkpoint_key: Optional[str] = None,
     ):
-        super().__init__(on_progress=on_progress, stop_event=stop_event, on_save=on_save)
+        super().__init__(
+            on_progress=on_progress, stop_event=stop_event, on_save=on_save,
+            worker_pool=worker_pool, checkpoint_key=checkpoint_key,
+        )
+
+    def _word_ancestors(self, word_lower: str) -> List[str]:
+        """单词首个义项的有效祖先（排序后便于持久化；优先查预计算闭包表）"""
+        closure = load_closure(
+            self.MAX_HYPERNYM_DEPTH, self.MIN_ANCESTOR_DEPTH, _GENERIC_ANCESTORS
+        )
+        ancestors: Set[str] = set()
+        for synset in get_synsets(word_lower)[:1]:
+            if closure is not None:
+                ancestors.update(closure.ancestors(synset))
+            else:
+                ancestors |= _get_ancestors(
+                    synset.name(), self.MAX_HYPERNYM_DEPTH, self.MIN_ANCESTOR_DEPTH
+                )
+        return sorted(ancestors)
+
+    def _word_definition_tokens(self, word_lower: str) -> List[str]:
+        """单词首个义项释义中的内容词（排序后便于持久化）"""
+        tokens: Set[str] = set()
+        for synset in get_synsets(word_lower)[:1]:
+            tokens |= _tokenize_definition(synset.definition())
+        return sorted(tokens)
 
     def _scaled_progress(self, phase_frac: float, phase_offset: float,
                          total: int) -> int:
@@ -154,7 +170,7 @@ class TopicGenerator(BaseGenerator):
         self,
         words: List[Dict],
         word_index: Dict[str, int],
-        existing_relations: Set[Tuple[int, int, str]],
+        existing_relations: RelationSet,
         processed_word_ids: Set[int]
     ) -> GenerationResult:
         """生成主题关系（双阶段）"""
@@ -176,27 +192,54 @@ class TopicGenerator(BaseGenerator):
         # 进度总量 = len(unprocessed)，与其他生成器一致
         progress_total = len(unprocessed)
         n_words = len(words)
+        words_lower = [w['word'].lower() for w in words]
+
+        # 两阶段的检查点（按全部单词而非未处理单词计算指纹：中断时已写入的词不影响复用）
+        checkpoint = phase_checkpoint(
+            self._checkpoint_key, self.relation_type,
+            self.MAX_HYPERNYM_DEPTH, self.MIN_ANCESTOR_DEPTH,
+            self.MAX_GROUP_SIZE, self.MIN_GROUP_SIZE, sorted(_GENERIC_ANCESTORS),
+            [[w['id'], word] for w, word in zip(words, words_lower)],
+        )
+        resumed_phases = []
 
         # ═══ Phase 1: 上位词聚类 (0% ~ 40%) ═══
         ancestor_groups: Dict[str, Set[int]] = defaultdict(set)
+        saved_groups = checkpoint.load("ancestor_groups")
+        if saved_groups is not None:
+            for anc_name, wids in saved_groups.items():
+                ancestor_groups[anc_name] = set(wids)
+            resumed_phases.append("ancestor_groups")
+            self._report_progress(
+                self._scaled_progress(self._PHASE1_RATIO, 0, progress_total),
+                progress_total, total_found
+            )
+        else:
+            ancestors_view = feature_view(
+                f"topic_ancestors:{self.MAX_HYPERNYM_DEPTH}:{self.MIN_ANCESTOR_DEPTH}",
+                words_lower
+            )
 
-        for idx, w in enumerate(words):
-            if self._is_stopped():
-                break
-            synsets = get_synsets(w['word'])[:1]
-            for synset in synsets:
-                ancestors = _get_ancestors(
-                    synset.name(), self.MAX_HYPERNYM_DEPTH, self.MIN_ANCESTOR_DEPTH
-                )
-                for anc_name in ancestors:
+            for idx, w in enumerate(words):
+                if self._is_stopped():
+                    break
+                for anc_name in ancestors_view.get(words_lower[idx], self._word_ancestors):
                     ancestor_groups[anc_name].add(w['id'])
 
-            if (idx + 1) % 50 == 0 or idx == n_words - 1:
-                frac = self._PHASE1_RATIO * (idx + 1) / n_words
-                self._report_progress(
-                    self._scaled_progress(frac, 0, progress_total),
-                    progress_total, total_found
-                )
+                if (idx + 1) % 50 == 0 or idx == n_words - 1:
+                    frac = self._PHASE1_RATIO * (idx + 1) / n_words
+                    self._report_progress(
+                        self._scaled_progress(frac, 0, progress_total),
+                        progress_total, total_found
+                    )
+
+            ancestors_view.save()
+            if not self._is_stopped():
+                # 只保存规模在范围内的组（其余组不参与配对）
+                checkpoint.save("ancestor_groups", {
+                    anc_name: sorted(wids) for anc_name, wids in ancestor_groups.items()
+                    if self.MIN_GROUP_SIZE <= len(wids) <= self.MAX_GROUP_SIZE
+                })
 
         # 从有效组中提取词对
         hypernym_groups_count = 0
@@ -230,26 +273,43 @@ class TopicGenerator(BaseGenerator):
 
             # 构建每个词的释义内容词集合：word_id → {definition content words}
             word_defn_words: Dict[int, Set[str]] = {}
+            saved_refs = checkpoint.load("definition_refs")
+            if saved_refs is not None:
+                for wid, content_words in saved_refs:
+                    word_defn_words[wid] = set(content_words)
+                resumed_phases.append("definition_refs")
+                self._report_progress(
+                    self._scaled_progress(self._PHASE2_RATIO, self._PHASE1_RATIO, progress_total),
+                    progress_total, total_found
+                )
+            else:
+                tokens_view = feature_view("definition_tokens", words_lower)
 
-            for idx, w in enumerate(words):
-                if self._is_stopped():
-                    break
-                synsets = get_synsets(w['word'])[:1]
-                content_words: Set[str] = set()
-                for synset in synsets:
-                    content_words |= _tokenize_definition(synset.definition())
-                # 只保留用户词表中的词，排除自身
-                content_words &= user_word_set
-                content_words.discard(w['word'].lower())
-                if content_words:
-                    word_defn_words[w['id']] = content_words
-
-                if (idx + 1) % 50 == 0 or idx == n_words - 1:
-                    frac = self._PHASE2_RATIO * (idx + 1) / n_words
-                    self._report_progress(
-                        self._scaled_progress(frac, self._PHASE1_RATIO, progress_total),
-                        progress_total, total_found
+                for idx, w in enumerate(words):
+                    if self._is_stopped():
+                        break
+                    content_words = set(
+                        tokens_view.get(words_lower[idx], self._word_definition_tokens)
                     )
+                    # 只保留用户词表中的词，排除自身
+                    content_words &= user_word_set
+                    content_words.discard(w['word'].lower())
+                    if content_words:
+                        word_defn_words[w['id']] = content_words
+
+                    if (idx + 1) % 50 == 0 or idx == n_words - 1:
+                        frac = self._PHASE2_RATIO * (idx + 1) / n_words
+                        self._report_progress(
+                            self._scaled_progress(frac, self._PHASE1_RATIO, progress_total),
+                            progress_total, total_found
+                        )
+
+                tokens_view.save()
+                if not self._is_stopped():
+                    checkpoint.save("definition_refs", [
+                        [wid, sorted(content_words)]
+                        for wid, content_words in word_defn_words.items()
+                    ])
 
             # 双向检查：A 的释义提到 B 且 B 的释义提到 A
             word_to_str = {w['id']: w['word'].lower() for w in words}
@@ -277,10 +337,8 @@ class TopicGenerator(BaseGenerator):
         total_pairs = len(sorted_pairs)
 
         # 每词关联计数（含已有关系，确保跨次运行不突破上限）
-        word_relation_counts: Dict[int, int] = {}
-        for (w1, _, rtype) in existing_relations:
-            if rtype == self.relation_type:
-                word_relation_counts[w1] = word_relation_counts.get(w1, 0) + 1
+        word_relation_counts = existing_relations.degrees(self.relation_type)
+        self._settle_relations((pair for pair, _ in sorted_pairs), existing_relations)
 
         for pair_idx, ((w1, w2), conf) in enumerate(sorted_pairs):
             if self._is_stopped():
@@ -314,7 +372,8 @@ class TopicGenerator(BaseGenerator):
 
         # ═══ 日志 ═══
         if self._is_stopped():
-            # 停止时只为实际写入了关系的词记录日志，避免未处理的词被错误标记
+            # 停止时只为实际写入了关系的词记录日志，避免未处理的词被错误标记；
+            # 检查点保留，重新启动时跳过已完成的阶段
             for w in unprocessed:
                 wid = w['id']
                 if wid in word_found_counts:
@@ -322,6 +381,7 @@ class TopicGenerator(BaseGenerator):
         else:
             for w in unprocessed:
                 self._add_log(w['id'], word_found_counts.get(w['id'], 0))
+            checkpoint.clear()
 
         return self._finalize({
             'total_found': total_found,
@@ -330,5 +390,6 @@ class TopicGenerator(BaseGenerator):
             'hypernym_groups': hypernym_groups_count,
             'phase1_pairs': phase1_pairs,
             'definition_pairs': defn_pairs_added,
+            'resumed_phases': resumed_phases,
             'processed_count': len(unprocessed),
         })
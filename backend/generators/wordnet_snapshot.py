@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+WordNet 索引快照 — 让新进程在毫秒级内可用 WordNet
+
+NLTK 首次访问 wordnet 时要逐行解析 index.* / data.adj / *.exc，并构建跨版本义项映射，
+每个 gunicorn worker 和进程池 worker 都要付出数秒。快照把这些索引离线序列化为单个文件，
+运行时 mmap 只读打开（多进程共享页缓存）：
+
+    header | key_offsets[u32] | value_offsets[u32] | keys[utf-8] | values[u32]
+           | satellites[u32] | exceptions[json]
+
+- 词元索引：keys 按 UTF-8 字节序升序，二分查找；每个词元的值为 (词性编码, 义项数, offset...) 分组序列
+- 形容词卫星义项 offset 集合、词形变化例外表
+- 跨版本义项映射（仅多语言查询使用）改为首次使用时才计算
+
+SnapshotWordNetCorpusReader 继承 NLTK 的 WordNetCorpusReader，只替换上述加载步骤；
+义项记录仍按 offset 从 data.* 文件读取，返回的 Synset 与 NLTK 原生完全相同。
+快照与当前 WordNet 版本不匹配时视为不存在，回退到 NLTK 默认加载。
+所覆盖的是 NLTK 的内部方法：reader_supported() 检查其签名，构造后再确认各加载步骤确实
+被替换（_LOAD_HOOKS），任一不符（NLTK 升级改了内部实现）时同样回退到默认加载。
+构建：scripts/build_wordnet_snapshot.py
+"""
+import hashlib
+import inspect
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+from nltk.corpus.reader.wordnet import ADJ, ADJ_SAT, WordNetCorpusReader
+
+logger = logging.getLogger(__name__)
+
+WORDNET_SNAPSHOT_PATH = os.environ.get(
+    "WORDNET_SNAPSHOT_PATH", "/opt/vocabulary_app/feature-store/wordnet.snapshot"
+)
+
+# 快照格式变化时手动递增
+WORDNET_SNAPSHOT_SCHEMA_VERSION = "1"
+
+_MAGIC = b"WNSNAP01"
+# magic, 字节序标记, 词元数, 键字节数, 值个数, 卫星义项数, 例外表字节数, 版本哈希
+_HEADER = struct.Struct("<8sIIIIII16s")
+_BYTE_ORDER_MARK = 0x01020304
+_POS_CODES = {"n": 1, "v": 2, "a": 3, "r": 4, "s": 5}
+_POS_BY_CODE = {code: pos for pos, code in _POS_CODES.items()}
+
+# SnapshotWordNetCorpusReader 覆盖的 WordNetCorpusReader 内部方法 → 参数名（NLTK 3.8.1 ~ 3.10）
+_OVERRIDDEN_METHODS = {
+    "_scan_satellites": ["self"],
+    "_load_lemma_pos_offset_map": ["self"],
+    "_load_exception_map": ["self"],
+    "map_wn": ["self", "version"],
+}
+
+# WordNetCorpusReader.__init__ 必须调用的加载步骤
+_LOAD_HOOKS = frozenset({"_scan_satellites", "_load_lemma_pos_offset_map", "_load_exception_map"})
+
+
+def snapshot_version(wordnet_version: str) -> bytes:
+    digest = hashlib.sha256(WORDNET_SNAPSHOT_SCHEMA_VERSION.encode())
+    digest.update(wordnet_version.encode())
+    return digest.hexdigest()[:16].encode()
+
+
+class WordNetSnapshot:
+    """mmap 只读快照"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, bom, n, n_key_bytes, n_values, n_satellites,
+         n_exception_bytes, self.version) = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or bom != _BYTE_ORDER_MARK:
+            self._mm.close()
+            raise ValueError(f"not a WordNet snapshot: {path}")
+
+        view = memoryview(self._mm)
+        pos = _HEADER.size
+
+        def take(size: int) -> memoryview:
+            nonlocal pos
+            section = view[pos:pos + size]
+            pos += size + (-size % 4)
+            return section
+
+        self._key_offsets = take(4 * (n + 1)).cast("I")
+        self._value_offsets = take(4 * (n + 1)).cast("I")
+        self._keys = take(n_key_bytes)
+        self._values = take(4 * n_values).cast("I")
+        self._satellites = take(4 * n_satellites).cast("I")
+        self._exceptions = take(n_exception_bytes)
+        self.size = n
+
+    def key(self, index: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[index]:self._key_offsets[index + 1]])
+
+    def find(self, lemma: str) -> int:
+        """词元下标（不存在时为 -1）"""
+        target = lemma.encode()
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and self.key(lo) == target:
+            return lo
+        return -1
+
+    def pos_offsets(self, index: int) -> Dict[str, List[int]]:
+        """词元的 {词性: [synset offset, ...]}"""
+        values = self._values[self._value_offsets[index]:self._value_offsets[index + 1]]
+        result: Dict[str, List[int]] = {}
+        i = 0
+        while i < len(values):
+            count = values[i + 1]
+            result[_POS_BY_CODE[values[i]]] = list(values[i + 2:i + 2 + count])
+            i += 2 + count
+        return result
+
+    def satellite_offsets(self) -> set:
+        return set(self._satellites)
+
+    def exception_map(self) -> Dict[str, Dict[str, List[str]]]:
+        exceptions = json.loads(bytes(self._exceptions))
+        exceptions[ADJ_SAT] = exceptions[ADJ]
+        return exceptions
+
+
+class _LemmaIndex(Mapping):
+    """替代 WordNetCorpusReader._lemma_pos_offset_map 的只读映射（解码结果按需缓存）"""
+
+    def __init__(self, snapshot: WordNetSnapshot):
+        self._snapshot = snapshot
+        self._cache: Dict[str, Dict[str, List[int]]] = {}
+
+    def __getitem__(self, lemma: str) -> Dict[str, List[int]]:
+        entry = self._cache.get(lemma)
+        if entry is None:
+            index = self._snapshot.find(lemma)
+            if index < 0:
+                raise KeyError(lemma)
+            entry = self._cache[lemma] = self._snapshot.pos_offsets(index)
+        return entry
+
+    def __contains__(self, lemma) -> bool:
+        return lemma in self._cache or self._snapshot.find(lemma) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._snapshot.size):
+            yield self._snapshot.key(index).decode()
+
+    def __len__(self) -> int:
+        return self._snapshot.size
+
+
+class _LazyMapping(Mapping):
+    """首次访问时才计算的映射（用于仅多语言查询需要的跨版本义项映射）"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+
+    def _get(self):
+        if not self._loaded:
+            self._value = self._factory() or {}
+            self._loaded = True
+        return self._value
+
+    def __bool__(self) -> bool:
+        return bool(self._get())
+
+    def __getitem__(self, key):
+        return self._get()[key]
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self) -> int:
+        return len(self._get())
+
+
+def reader_supported() -> bool:
+    """当前 NLTK 的 WordNetCorpusReader 是否有签名一致的、可覆盖的内部方法"""
+    for name, params in _OVERRIDDEN_METHODS.items():
+        method = getattr(WordNetCorpusReader, name, None)
+        if method is None:
+            return False
+        try:
+            if list(inspect.signature(method).parameters) != params:
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+class SnapshotWordNetCorpusReader(WordNetCorpusReader):
+    """从快照加载索引的 WordNetCorpusReader（构造后 uses_snapshot() 为 False 时不应使用）"""
+
+    def __init__(self, root, omw_reader, snapshot: WordNetSnapshot):
+        self._snapshot = snapshot
+        self._hooks_called = set()
+        super().__init__(root, omw_reader)
+
+    def uses_snapshot(self) -> bool:
+        """NLTK 的构造过程是否调用了全部被替换的加载步骤"""
+        return self._hooks_called >= _LOAD_HOOKS
+
+    def _scan_satellites(self):
+        self._hooks_called.add("_scan_satellites")
+        self.satellite_offsets = self._snapshot.satellite_offsets()
+
+    def _load_lemma_pos_offset_map(self):
+        self._hooks_called.add("_load_lemma_pos_offset_map")
+        self._lemma_pos_offset_map = _LemmaIndex(self._snapshot)
+
+    def _load_exception_map(self):
+        self._hooks_called.add("_load_exception_map")
+        self._exception_map = self._snapshot.exception_map()
+
+    def map_wn(self, version="wordnet"):
+        return _LazyMapping(lambda: WordNetCorpusReader.map_wn(self, version))
+
+
+def build_snapshot(reader: WordNetCorpusReader, path: str, wordnet_version: str) -> int:
+    """从已加载的 NLTK reader 导出快照并原子写入 path，返回词元数"""
+    lemma_map = reader._lemma_pos_offset_map
+    lemmas = sorted(lemma_map, key=str.encode)
+
+    key_offsets = array("I", [0])
+    value_offsets = array("I", [0])
+    keys = bytearray()
+    values = array("I")
+    for lemma in lemmas:
+        keys.extend(lemma.encode())
+        key_offsets.append(len(keys))
+        for pos, offsets in lemma_map[lemma].items():
+            values.extend((_POS_CODES[pos], len(offsets), *offsets))
+        value_offsets.append(len(values))
+
+    satellites = array("I", sorted(reader.satellite_offsets))
+    exceptions = json.dumps(
+        {pos: table for pos, table in reader._exception_map.items() if pos != ADJ_SAT},
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode()
+
+    buffer = bytearray(_HEADER.pack(
+        _MAGIC, _BYTE_ORDER_MARK, len(lemmas), len(keys), len(values),
+        len(satellites), len(exceptions), snapshot_version(wordnet_version),
+    ))
+    for section in (key_offsets.tobytes(), value_offsets.tobytes(), bytes(keys),
+                    values.tobytes(), satellites.tobytes(), exceptions):
+        buffer.extend(section)
+        buffer.extend(b"\0" * (-len(section) % 4))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)
+    return len(lemmas)
+
+
+def open_snapshot(path: str, wordnet_version: str) -> Optional[WordNetSnapshot]:
+    """打开与当前 WordNet 版本匹配的快照；缺失、损坏或过期时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = WordNetSnapshot(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"WordNet snapshot unavailable, loading corpus directly: {e}")
+        return None
+    if snapshot.version != snapshot_version(wordnet_version):
+        logger.warning(f"WordNet snapshot is stale, loading corpus directly: {path}")
+        return None
+    return snapshot
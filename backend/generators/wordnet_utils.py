@@ -1,15 +1,115 @@
 # -*- coding: utf-8 -*-
 """
-WordNet 共享工具 — 统一缓存，供 synonym/topic 等生成器复用
+WordNet 共享工具 — 统一缓存，供 synonym/topic/confused 等生成器复用
+
+所有缓存均为进程级有界 LRU，跨词对、跨任务复用；cache_stats() 汇报命中情况，
+便于根据实际负载调整 maxsize。
+
+WordNet reader 由 get_wordnet() 提供：优先从预构建快照加载（见 wordnet_snapshot），
+否则使用 NLTK 默认加载。模块级 wordnet 对象转发到该 reader，其余模块统一从这里导入。
 """
+import logging
+import math
+import os
+import threading
+from collections import deque
 from functools import lru_cache
+from typing import Dict, Optional
 
 try:
-    from nltk.corpus import wordnet
+    import nltk
+    from nltk.corpus import wordnet as _nltk_wordnet
     NLTK_AVAILABLE = True
 except ImportError:
     NLTK_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def wordnet_version() -> str:
+    """WordNet 数据版本标识（NLTK 版本 + 语料位置 + 修改时间），供持久化缓存判断失效"""
+    if not NLTK_AVAILABLE:
+        return "no-nltk"
+    try:
+        corpus_path = str(nltk.data.find("corpora/wordnet"))
+    except LookupError:
+        corpus_path = ""
+    mtime = os.path.getmtime(corpus_path) if corpus_path and os.path.exists(corpus_path) else ""
+    return f"{nltk.__version__}|{corpus_path}|{mtime}"
+
+
+def _corpus_root():
+    """WordNet 语料目录（与 NLTK LazyCorpusLoader 相同：目录或 zip 包）"""
+    try:
+        return nltk.data.find("corpora/wordnet")
+    except LookupError:
+        return nltk.data.find("corpora/wordnet.zip/wordnet/")
+
+
+_MISSING = object()
+
+
+def _omw_reader():
+    """
+    NLTK 为 wordnet 配置的多语言（OMW）reader（LazyCorpusLoader 的内部属性）
+
+    已加载时取 reader 上的 _omw_reader；两者都取不到（NLTK 内部实现变化）时返回 _MISSING。
+    """
+    args = getattr(_nltk_wordnet, "_LazyCorpusLoader__args", None)
+    if args:
+        return args[0]
+    return getattr(_nltk_wordnet, "_omw_reader", _MISSING)
+
+
+def _load_snapshot_reader():
+    from .wordnet_snapshot import (
+        WORDNET_SNAPSHOT_PATH, SnapshotWordNetCorpusReader, open_snapshot, reader_supported,
+    )
+    snapshot = open_snapshot(WORDNET_SNAPSHOT_PATH, wordnet_version())
+    if snapshot is None:
+        return None
+    omw_reader = _omw_reader()
+    if omw_reader is _MISSING or not reader_supported():
+        logger.warning(
+            f"WordNet snapshot not supported by NLTK {nltk.__version__}, loading corpus directly"
+        )
+        return None
+    try:
+        reader = SnapshotWordNetCorpusReader(_corpus_root(), omw_reader, snapshot)
+    except (LookupError, OSError) as e:
+        logger.warning(f"WordNet snapshot reader failed, loading corpus directly: {e}")
+        return None
+    if not reader.uses_snapshot():
+        logger.warning(
+            f"NLTK {nltk.__version__} skipped the snapshot loaders, loading corpus directly"
+        )
+        return None
+    logger.info(f"WordNet loaded from snapshot: {WORDNET_SNAPSHOT_PATH}")
+    return reader
+
+
+def get_wordnet():
+    """进程级 WordNet reader（快照优先；double-checked locking）"""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                _reader = _load_snapshot_reader() or _nltk_wordnet
+    return _reader
+
+
+class _WordNetProxy:
+    """转发到 get_wordnet()，保持 wordnet.synsets(...) 等原有写法"""
+
+    def __getattr__(self, name):
+        return getattr(get_wordnet(), name)
+
+
+wordnet = _WordNetProxy()
+
 
 @lru_cache(maxsize=10000)
 def get_synsets(word: str):
@@ -21,4 +121,104 @@ def get_synsets(word: str):
     """
     if not NLTK_AVAILABLE:
         return ()
-    return tuple(wordnet.synsets(word.lower()))
+    return tuple(get_wordnet().synsets(word.lower()))
+
+
+@lru_cache(maxsize=200000)
+def _synset_pair_similarity(synset1, synset2) -> Optional[float]:
+    return synset1.path_similarity(synset2)
+
+
+def synset_similarity(synset1, synset2) -> Optional[float]:
+    """
+    缓存的 path_similarity（无连接路径时为 None）
+
+    path_similarity 对称，键按 synset 名称规范化，(a, b) 与 (b, a) 共享同一条缓存。
+    """
+    if synset2.name() < synset1.name():
+        synset1, synset2 = synset2, synset1
+    return _synset_pair_similarity(synset1, synset2)
+
+
+@lru_cache(maxsize=100000)
+def _max_word_similarity(word1: str, word2: str) -> float:
+    max_similarity = 0
+    for s1 in get_synsets(word1):
+        for s2 in get_synsets(word2):
+            sim = synset_similarity(s1, s2)
+            if sim and sim > max_similarity:
+                max_similarity = sim
+    return max_similarity
+
+
+def max_word_similarity(word1: str, word2: str) -> float:
+    """两个词所有义项两两之间的最大 path_similarity（无义项或无连接时为 0）"""
+    w1, w2 = word1.lower(), word2.lower()
+    if w2 < w1:
+        w1, w2 = w2, w1
+    return _max_word_similarity(w1, w2)
+
+
+def max_path_hops(threshold: float) -> float:
+    """
+    path_similarity ≥ threshold 时两义项间允许的最大路径边数
+
+    path_similarity = 1 / (d + 1)，故 d ≤ floor(1/threshold − 1)；threshold ≤ 0 时无上界。
+    加极小量抵消浮点误差，宁可多放候选也不漏。
+    """
+    if threshold <= 0:
+        return math.inf
+    return math.floor(1.0 / threshold - 1.0 + 1e-9)
+
+
+# hypernym_distances 中模拟根节点的名称（与 NLTK 一致）
+_SIMULATED_ROOT = "*ROOT*"
+
+
+@lru_cache(maxsize=50000)
+def hypernym_distances(synset, max_hops: int) -> Dict[str, int]:
+    """
+    上溯 max_hops 步内的祖先（含自身）→ 最短距离
+
+    与 path_similarity 的内部计算一致：同时沿 hypernyms 与 instance_hypernyms 上溯，
+    并包含模拟根节点 *ROOT*（动词等无公共根的义项经由它相连）。
+    两个义项的路径距离 = 公共祖先上两侧距离之和的最小值，因此两侧各取 ≤ max_hops 的祖先
+    即可找出所有距离 ≤ max_hops 的义项对。
+
+    只用公开接口做 BFS（结果与 NLTK 私有的 _shortest_hypernym_paths(simulate_root=True)
+    一致）：模拟根节点距离为最远祖先距离 + 1，因此需遍历全部祖先后再按 max_hops 过滤。
+    """
+    distances: Dict[str, int] = {}
+    queue = deque([(synset, 0)])
+    while queue:
+        current, dist = queue.popleft()
+        name = current.name()
+        if name in distances:
+            continue
+        distances[name] = dist
+        for hypernym in current.hypernyms():
+            queue.append((hypernym, dist + 1))
+        for hypernym in current.instance_hypernyms():
+            queue.append((hypernym, dist + 1))
+    distances[_SIMULATED_ROOT] = max(distances.values()) + 1
+    return {name: dist for name, dist in distances.items() if dist <= max_hops}
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """各级缓存的命中/未命中/容量统计"""
+    caches = {
+        'synsets': get_synsets,
+        'synset_pairs': _synset_pair_similarity,
+        'word_pairs': _max_word_similarity,
+        'hypernym_distances': hypernym_distances,
+    }
+    stats = {}
+    for name, cached in caches.items():
+        info = cached.cache_info()
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+        }
+    return stats
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+生成器共享进程池 — CPU 密集分片的统一出口
+
+进程池由 GenerationService 持有，首次使用时才启动，之后跨任务、跨用户复用：
+- worker 由预先导入生成器模块的 forkserver fork 出来，初始化器再加载一次 WordNet
+  （词根自动机等），进程内的 LRU 缓存随 worker 存活持续复用；
+- 每个任务的只读数据经 publish() 序列化后写入一块共享内存，分片只携带段名，
+  worker 首次遇到该段时反序列化一次并缓存，同一任务的后续分片直接复用；
+- 分片函数签名为 fn(context, shard)，必须是模块级函数（可 pickle）。
+  context.data 为任务数据，context.derived() 可缓存由其派生的结构（如候选索引）。
+
+未配置进程池（GENERATION_WORKERS=0）或任务太小时，分片在当前线程顺序执行，结果一致。
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from threading import Event
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def _default_workers() -> int:
+    """默认 worker 数：可用 CPU 数 − 1（留一个核给 Web 进程），最多 4；单核时不启用进程池"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(0, min(4, cpus - 1))
+
+
+# worker 进程数；0 表示不使用进程池
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", str(_default_workers())))
+
+# 每个 worker 缓存的任务数据份数（按段名 LRU）
+_WORKER_PAYLOAD_SLOTS = 4
+
+
+class ShardContext:
+    """分片函数看到的任务上下文：只读数据 + 派生结构缓存"""
+
+    def __init__(self, data: Any):
+        self.data = data
+        self._derived: Dict[str, Any] = {}
+
+    def derived(self, key: str, factory: Callable[[Any], Any]) -> Any:
+        """按 key 缓存由 data 派生的结构，同一 worker 内每个任务只构建一次"""
+        if key not in self._derived:
+            self._derived[key] = factory(self.data)
+        return self._derived[key]
+
+
+class SharedPayload:
+    """
+    一个任务的只读数据（父进程侧）
+
+    with 块结束或 close() 时释放共享内存；未启用进程池时只保存本地上下文。
+    """
+
+    def __init__(self, data: Any, use_shared_memory: bool):
+        self.context = ShardContext(data)
+        self.name: Optional[str] = None
+        self.size = 0
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        if use_shared_memory:
+            blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, len(blob)))
+            self._shm.buf[:len(blob)] = blob
+            self.name = self._shm.name
+            self.size = len(blob)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+    def __enter__(self) -> "SharedPayload":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# worker 侧
+# ═══════════════════════════════════════════════════════════════════════
+
+_worker_contexts: "OrderedDict[str, ShardContext]" = OrderedDict()
+
+
+def _init_worker():
+    """worker 初始化：停止信号由父进程统一处理；预加载 WordNet 与生成器模块"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from . import confused_generator, root_generator, synonym_generator, topic_generator  # noqa: F401
+    from .wordnet_utils import NLTK_AVAILABLE, get_synsets
+    if NLTK_AVAILABLE:
+        get_synsets("entity")
+
+
+def _worker_context(name: str, size: int) -> ShardContext:
+    context = _worker_contexts.get(name)
+    if context is not None:
+        _worker_contexts.move_to_end(name)
+        return context
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = pickle.loads(bytes(shm.buf[:size]))
+    finally:
+        shm.close()
+    context = _worker_contexts[name] = ShardContext(data)
+    while len(_worker_contexts) > _WORKER_PAYLOAD_SLOTS:
+        _worker_contexts.popitem(last=False)
+    return context
+
+
+def _run_shard(fn: Callable[[ShardContext, Any], Any], name: str, size: int, shard: Any) -> Any:
+    return fn(_worker_context(name, size), shard)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# 父进程侧
+# ═══════════════════════════════════════════════════════════════════════
+
+# forkserver 预先导入的模块（worker 从中 fork，共享模块代码与 data.py 词表页面）
+_PRELOAD_MODULES = [
+    "backend.generators.confused_generator",
+    "backend.generators.root_generator",
+    "backend.generators.synonym_generator",
+    "backend.generators.topic_generator",
+]
+
+
+def mp_context():
+    """
+    worker 启动方式
+
+    服务进程是多线程的，不能直接 fork（会继承锁状态）。优先 forkserver：
+    单线程的 fork server 预先导入生成器模块，新 worker 由它 fork，无需各自重新导入；
+    不支持 forkserver 的平台退回 spawn。生成进程（services/job_runner.py）同样由此启动。
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(_PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class WorkerPool:
+    """长生命周期进程池（线程安全，延迟启动）"""
+
+    def __init__(self, max_workers: int = GENERATION_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0 and not self._closed
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=mp_context(),
+                    initializer=_init_worker,
+                )
+                logger.info(f"Generation worker pool started ({self.max_workers} workers)")
+            return self._executor
+
+    def publish(self, data: Any) -> SharedPayload:
+        """发布一个任务的只读数据（进程池未启用时不占用共享内存）"""
+        return SharedPayload(data, use_shared_memory=self.enabled)
+
+    def imap_shards(
+        self,
+        fn: Callable[[ShardContext, Any], Any],
+        payload: SharedPayload,
+        shards: Sequence[Any],
+        stop_event: Optional[Event] = None,
+    ) -> Iterator[Any]:
+        """
+        按分片顺序产出 fn(context, shard) 的结果
+
+        stop_event 置位后取消尚未开始的分片并结束迭代。
+        """
+        if not self.enabled or payload.name is None:
+            for shard in shards:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                yield fn(payload.context, shard)
+            return
+
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_run_shard, fn, payload.name, payload.size, shard)
+            for shard in shards
+        ]
+        try:
+            for future in futures:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_shards(
+    pool: Optional[WorkerPool],
+    fn: Callable[[ShardContext, Any], Any],
+    data: Any,
+    shards: Sequence[Any],
+    stop_event: Optional[Event] = None,
+) -> Iterator[Any]:
+    """
+    在进程池（或当前线程）上按顺序执行分片，供生成器直接使用
+
+    data 只发布一次，迭代结束后释放共享内存；不足两个分片时直接在当前线程执行。
+    """
+    if pool is None or len(shards) < 2:
+        pool = _LOCAL_POOL
+    with pool.publish(data) as payload:
+        yield from pool.imap_shards(fn, payload, shards, stop_event)
+
+
+def split_shards(items: Sequence[Any], shard_size: int) -> list:
+    """按固定大小切分分片"""
+    return [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+
+
+# 无进程池时的顺序执行器
+_LOCAL_POOL = WorkerPool(max_workers=0)
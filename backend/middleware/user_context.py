@@ -44,18 +44,22 @@ def _get_jwks_client() -> Optional[PyJWKClient]:
 
 
 def _extract_user_id() -> Optional[str]:
+    """从 Flask 请求中提取用户 UUID"""
+    return decode_user_id(request.headers.get("Authorization", ""), request.args.get("token"))
+
+
+def decode_user_id(auth_header: str, query_token: Optional[str]) -> Optional[str]:
     """
-    从请求中提取用户 UUID。
+    从请求凭据中提取用户 UUID（不依赖 Flask，ASGI 端点同样使用）。
     优先级：Authorization header > ?token query param（SSE fallback）
     支持 ECC (P-256) 和 HS256 两种签名算法
     """
     # 1. Authorization: Bearer {token}
-    auth_header = request.headers.get("Authorization", "")
     token = auth_header[7:] if auth_header.startswith("Bearer ") else None
 
     # 2. SSE fallback: ?token={token}
     if not token:
-        token = request.args.get("token")
+        token = query_token
 
     if not token:
         return None
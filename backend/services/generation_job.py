@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+"""
+单个生成任务的执行逻辑（与运行位置无关）
+
+run_generation() 读取数据库、依次运行生成器，结果经 WriteBehindSaver 异步落库，
+状态写入 GenerationTask。它由 job_runner.py 的运行器调用：默认在独立的生成进程中
+（状态回传 Web 进程），GENERATION_RUNNER=thread 时在 Web 进程的线程中。
+
+生成器（连同 NLTK、data.py 词表）在首个生成任务或 warmup() 时才导入。
+
+组合任务（relation_type="all"）只加载一次词表与已有关系，按 PIPELINE_ORDER
+依次运行五个生成器：各阶段共享同一份数据、同一条保存路径和一个总体进度。
+
+已有关系达到 RELATION_FILTER_MIN_ROWS 行时不再逐行加载，改为数据库端聚合出
+每种关系类型的 Bloom 过滤器（见 relation_store.FilteredRelationSet）。
+"""
+import importlib
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from threading import Event, Lock
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+
+from backend.database.relation_writer import insert_relations, upsert_generation_logs
+from backend.extensions import get_session
+from backend.generators.relation_store import (
+    BLOOM_HASHES,
+    BLOOM_MULTIPLIERS,
+    BloomFilter,
+    FilteredRelationSet,
+    RelationBuffer,
+    RelationSet,
+)
+from backend.generators.worker_pool import WorkerPool
+from backend.services.write_behind import WriteBehindSaver
+
+logger = logging.getLogger(__name__)
+
+# relation_type → 生成器类名（backend.generators 导出，按需导入）
+GENERATOR_MAP = {
+    "synonym": "SynonymGenerator",
+    "antonym": "AntonymGenerator",
+    "root": "RootGenerator",
+    "confused": "ConfusedGenerator",
+    "topic": "TopicGenerator",
+}
+
+# 加载数据时服务端游标每批读取的行数
+LOAD_BATCH_SIZE = 5000
+
+# 已有关系行数达到该值时加载 Bloom 过滤器代替完整关系集合（未设置则始终完整加载）
+_filter_min_rows = os.environ.get("RELATION_FILTER_MIN_ROWS", "")
+RELATION_FILTER_MIN_ROWS: Optional[int] = int(_filter_min_rows) if _filter_min_rows else None
+
+# 数据库端构建 Bloom 过滤器：每行关系展开为 k 个位下标，按 64 位一组 bit_or 聚合，
+# 只返回非空的组（哈希公式与 BloomFilter._positions 一致）
+_BLOOM_WORDS = text(
+    "SELECT bit / 64 AS slot, bit_or(CAST(1 AS bigint) << CAST(bit % 64 AS integer)) "
+    "FROM ("
+    "SELECT (h.h1 + i * h.h2) % :bits AS bit FROM ("
+    f"SELECT (CAST(word_id AS bigint) * {BLOOM_MULTIPLIERS[0]} "
+    f"+ CAST(related_word_id AS bigint) * {BLOOM_MULTIPLIERS[1]}) % :bits AS h1, "
+    f"(CAST(word_id AS bigint) * {BLOOM_MULTIPLIERS[2]} "
+    f"+ CAST(related_word_id AS bigint) * {BLOOM_MULTIPLIERS[3]}) % (:bits - 1) + 1 AS h2 "
+    "FROM words_relations WHERE user_id = :uid "
+    "AND relation_type = CAST(:rt AS relation_type_enum)"
+    ") h CROSS JOIN generate_series(0, :hashes - 1) AS i"
+    ") b GROUP BY slot"
+)
+
+# 组合任务的 relation_type
+ALL_RELATION_TYPES = "all"
+
+# 组合任务的阶段顺序：同义/反义共享预编译词典条目，主题复用前面加载的 WordNet 义项缓存
+PIPELINE_ORDER = ("synonym", "antonym", "topic", "root", "confused")
+
+
+def get_generator_class(relation_type: str):
+    """按需导入并返回生成器类"""
+    return getattr(importlib.import_module("backend.generators"), GENERATOR_MAP[relation_type])
+
+
+@dataclass
+class GenerationTask:
+    """单个生成任务的状态（线程安全；每次变化调用 on_change）"""
+    user_id: str
+    relation_type: str
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    future: Optional[Future] = None
+    stop_event: Event = field(default_factory=Event)
+    on_change: Optional[Callable[[], None]] = field(default=None, repr=False)
+    _lock: Lock = field(default_factory=Lock)
+    status: str = "running"     # running | completed | stopped | error
+    processed: int = 0
+    total: int = 0
+    found: int = 0
+    saved: int = 0              # 已成功写入数据库的关系对数
+    skipped: int = 0            # 因已生成过该类型关系而跳过的单词数
+    save_errors: int = 0        # 保存失败的批次数
+    error: Optional[str] = None
+    stage: Optional[str] = None  # 组合任务当前执行的关系类型
+    started_at: datetime = field(default_factory=datetime.now)
+    # 调度状态（见 scheduler.py；时间均为 time.time()）
+    queue_position: Optional[int] = None       # 排队位次（从 1 开始），执行后为 None
+    expected_start: Optional[float] = None     # 排队任务的预计开始时间
+    expected_duration: Optional[float] = None  # 同类任务的历史执行耗时（秒）
+    run_started: Optional[float] = None        # 开始执行的时间
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def update(self, **fields):
+        """线程安全地更新状态字段"""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+        self._changed()
+
+    def update_progress(self, processed: int, total: int, found: int):
+        """线程安全地更新进度"""
+        with self._lock:
+            self.processed = processed
+            self.total = total
+            self.found = found
+        self._changed()
+
+    def add_saved(self, count: int):
+        """线程安全地累加已保存数"""
+        with self._lock:
+            self.saved += count
+        self._changed()
+
+    def add_save_error(self):
+        """线程安全地累加保存失败计数"""
+        with self._lock:
+            self.save_errors += 1
+        self._changed()
+
+    def progress(self) -> dict:
+        """线程安全地获取执行进度（生成进程回传的字段）"""
+        with self._lock:
+            return self._progress()
+
+    def snapshot(self) -> dict:
+        """线程安全地获取状态快照（执行进度 + 排队位次与预计剩余秒数）"""
+        with self._lock:
+            snapshot = self._progress()
+            snapshot["queue_position"] = self.queue_position
+            remaining = self._remaining(time.time())
+            snapshot["eta"] = round(remaining) if remaining is not None else None
+            return snapshot
+
+    def remaining(self) -> Optional[float]:
+        """预计剩余秒数（排队任务含等待时间；无法估计时为 None）"""
+        with self._lock:
+            return self._remaining(time.time())
+
+    def _progress(self) -> dict:
+        return {
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "found": self.found,
+            "saved": self.saved,
+            "skipped": self.skipped,
+            "save_errors": self.save_errors,
+            "error": self.error,
+            "stage": self.stage,
+        }
+
+    def _remaining(self, now: float) -> Optional[float]:
+        if self.status != "running":
+            return None
+        if self.queue_position is not None:
+            if self.expected_start is None or self.expected_duration is None:
+                return None
+            return max(0.0, self.expected_start - now) + self.expected_duration
+        if self.run_started is None:
+            return None
+        elapsed = now - self.run_started
+        if self.processed and self.total:
+            # 按已处理比例外推（加载数据的时间计入已用时间）
+            return elapsed * (self.total - self.processed) / self.processed
+        if self.expected_duration is not None:
+            return max(0.0, self.expected_duration - elapsed)
+        return None
+
+
+def warmup():
+    """
+    预加载生成器、NLTK WordNet 及预编译词典/闭包表
+
+    使首个生成任务无需等待导入；失败只记录日志。
+    """
+    started = time.monotonic()
+    try:
+        for relation_type in GENERATOR_MAP:
+            get_generator_class(relation_type)
+
+        from backend.generators.hypernym_closure import load_closure
+        from backend.generators.lexicon import get_lexicon
+        from backend.generators.topic_generator import TopicGenerator, _GENERIC_ANCESTORS
+        from backend.generators.wordnet_utils import NLTK_AVAILABLE, get_synsets
+
+        get_lexicon()
+        load_closure(
+            TopicGenerator.MAX_HYPERNYM_DEPTH, TopicGenerator.MIN_ANCESTOR_DEPTH,
+            _GENERIC_ANCESTORS,
+        )
+        if NLTK_AVAILABLE:
+            get_synsets("entity")
+        logger.info(f"Generation warmup finished in {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        logger.warning(f"Generation warmup failed: {e}")
+
+
+def run_generation(task: GenerationTask, worker_pool: Optional[WorkerPool]):
+    """执行完整的生成流程（运行器线程的目标函数，异常记录到 task 中）"""
+    relation_type = task.relation_type
+    user_id = task.user_id
+    stop_event = task.stop_event
+    if relation_type == ALL_RELATION_TYPES:
+        stages = list(PIPELINE_ORDER)
+    else:
+        stages = [relation_type]
+
+    try:
+        # 1. 读取数据库（组合任务也只读一次）
+        words, word_index, existing_relations, processed_ids = _load_data(stages, user_id)
+
+        # 计算跳过数（已在 log 中的单词，取交集防止残留数据）
+        word_ids = {w['id'] for w in words}
+        skipped = {rt: len(processed_ids[rt] & word_ids) for rt in stages}
+        task.update(
+            skipped=sum(skipped.values()),
+            total=sum(len(words) - skipped[rt] for rt in stages),
+        )
+
+        # 2. 各阶段共用一个异步写入器：生成线程只入队，写线程合并批次落库
+        saver = WriteBehindSaver(
+            lambda relations, logs: _save_batch(relations, logs, user_id),
+            on_saved=lambda count: task.add_saved(count // 2),
+            on_error=task.add_save_error,
+        )
+        try:
+            # 3. 依次执行各阶段（结果通过 on_save 增量保存）
+            done = 0    # 已完成阶段的单词数
+            found = 0   # 已完成阶段的关系数
+            for rt in stages:
+                if stop_event.is_set():
+                    break
+                stage_size = len(words) - skipped[rt]
+                task.update(stage=rt if len(stages) > 1 else None)
+
+                if len(stages) == 1:
+                    on_progress = task.update_progress
+                else:
+                    # 阶段内进度按比例折算到总体进度
+                    def on_progress(processed: int, total: int, stage_found: int,
+                                    _done=done, _size=stage_size, _found=found):
+                        frac = processed / total if total else 0.0
+                        task.update_progress(
+                            _done + int(_size * frac), task.total, _found + stage_found
+                        )
+
+                generator_cls = get_generator_class(rt)
+                generator = generator_cls(
+                    on_progress=on_progress,
+                    stop_event=stop_event,
+                    on_save=saver.submit,
+                    worker_pool=worker_pool,
+                    checkpoint_key=f"{user_id}-{rt}",
+                )
+                result = generator.generate(
+                    words, word_index, existing_relations, processed_ids[rt]
+                )
+
+                done += stage_size
+                found += result.stats.get("total_found", 0)
+                if len(stages) > 1 and not stop_event.is_set():
+                    task.update_progress(done, task.total, found)
+        finally:
+            # 写完已入队的批次（停止、出错时同样不丢弃）
+            saver.close()
+
+        # 4. 更新最终状态
+        task.update(
+            found=found,
+            stage=None,
+            status="stopped" if stop_event.is_set() else "completed",
+        )
+
+        from backend.generators.wordnet_utils import cache_stats as wordnet_cache_stats
+        logger.info(f"WordNet cache stats after {relation_type}: {wordnet_cache_stats()}")
+
+    except (KeyboardInterrupt, SystemExit):
+        task.update(status="stopped")
+        raise
+    except Exception as e:
+        logger.exception(f"Generation failed for {relation_type}: {e}")
+        task.update(status="error", error=str(e))
+
+
+def _load_data(
+    relation_types: Sequence[str], user_id: str
+) -> Tuple[List[Dict], Dict[str, int], RelationSet, Dict[str, Set[int]]]:
+    """
+    从数据库加载生成所需的数据
+
+    只取生成器用到的列、只取所需关系类型；结果经服务端游标分批流式读入，
+    不先物化整张结果表。已有关系以打包整数存入 RelationSet，
+    已处理单词 ID 按关系类型分组返回。
+    """
+    with get_session() as session:
+        # 加载用户的所有单词（不取 definition：生成器不使用，且可能很大）
+        rows = session.execute(
+            text("SELECT id, word FROM words WHERE user_id = :uid ORDER BY id")
+            .execution_options(yield_per=LOAD_BATCH_SIZE),
+            {"uid": user_id},
+        )
+        words = [{"id": word_id, "word": word} for word_id, word in rows]
+        word_index = {w["word"].lower(): w["id"] for w in words}
+
+        # 加载已有关系（仅所需关系类型，去重只需比对同类型）
+        existing_relations = _load_existing_relations(session, relation_types, user_id)
+
+        # 加载已处理的单词 ID（仅所需关系类型）
+        log_rows = session.execute(
+            text(
+                "SELECT word_id, relation_type FROM relation_generation_log "
+                "WHERE user_id = :uid "
+                "AND relation_type = ANY(CAST(:rts AS relation_type_enum[]))"
+            ).execution_options(yield_per=LOAD_BATCH_SIZE),
+            {"uid": user_id, "rts": list(relation_types)},
+        )
+        processed_ids: Dict[str, Set[int]] = {rt: set() for rt in relation_types}
+        for word_id, rt in log_rows:
+            processed_ids[rt].add(word_id)
+
+    return words, word_index, existing_relations, processed_ids
+
+
+def _load_existing_relations(
+    session, relation_types: Sequence[str], user_id: str
+) -> RelationSet:
+    """已有关系：行数未达阈值时精确加载，否则加载 Bloom 过滤器"""
+    params = {"uid": user_id, "rts": list(relation_types)}
+
+    if RELATION_FILTER_MIN_ROWS is not None:
+        counts: Dict[str, int] = dict(session.execute(
+            text(
+                "SELECT relation_type, count(*) FROM words_relations "
+                "WHERE user_id = :uid "
+                "AND relation_type = ANY(CAST(:rts AS relation_type_enum[])) "
+                "GROUP BY relation_type"
+            ),
+            params,
+        ).all())
+        if sum(counts.values()) >= RELATION_FILTER_MIN_ROWS:
+            filters = {}
+            for rt, count in counts.items():
+                bits = BloomFilter.bits_for(count)
+                rows = session.execute(
+                    _BLOOM_WORDS,
+                    {"uid": user_id, "rt": rt, "bits": bits, "hashes": BLOOM_HASHES},
+                )
+                filters[rt] = BloomFilter.from_words(bits, rows)
+            logger.info(
+                f"Loaded relation filters for {sum(counts.values())} relations "
+                f"({sum(len(f.words) * 8 for f in filters.values())} bytes)"
+            )
+            return FilteredRelationSet(
+                filters,
+                counts,
+                lambda rt: _load_degrees(rt, user_id),
+                lambda rt, pairs: _load_existing_pairs(rt, pairs, user_id),
+            )
+
+    # 按打包键顺序返回，可直接追加为有序数组
+    rel_rows = session.execute(
+        text(
+            "SELECT word_id, related_word_id, relation_type "
+            "FROM words_relations WHERE user_id = :uid "
+            "AND relation_type = ANY(CAST(:rts AS relation_type_enum[])) "
+            "ORDER BY relation_type, word_id, related_word_id"
+        ).execution_options(yield_per=LOAD_BATCH_SIZE),
+        params,
+    )
+    return RelationSet.from_rows(rel_rows)
+
+
+def _load_degrees(relation_type: str, user_id: str) -> Dict[int, int]:
+    """每个单词某一类型的已有关系数（过滤器模式下按需查询）"""
+    with get_session() as session:
+        rows = session.execute(
+            text(
+                "SELECT word_id, count(*) FROM words_relations "
+                "WHERE user_id = :uid AND relation_type = CAST(:rt AS relation_type_enum) "
+                "GROUP BY word_id"
+            ),
+            {"uid": user_id, "rt": relation_type},
+        )
+        return dict(rows.all())
+
+
+def _load_existing_pairs(
+    relation_type: str, pairs: List[Tuple[int, int]], user_id: str
+) -> List[Tuple[int, int]]:
+    """pairs 中库里实际存在的 (word_id, related_word_id)（过滤器命中时按批查询）"""
+    found: List[Tuple[int, int]] = []
+    with get_session() as session:
+        for start in range(0, len(pairs), LOAD_BATCH_SIZE):
+            batch = pairs[start:start + LOAD_BATCH_SIZE]
+            rows = session.execute(
+                text(
+                    "SELECT r.word_id, r.related_word_id "
+                    "FROM unnest(CAST(:wids AS integer[]), CAST(:rids AS integer[])) "
+                    "AS p(word_id, related_word_id) "
+                    "JOIN words_relations r ON r.word_id = p.word_id "
+                    "AND r.related_word_id = p.related_word_id "
+                    "AND r.relation_type = CAST(:rt AS relation_type_enum) "
+                    "WHERE r.user_id = :uid"
+                ),
+                {
+                    "uid": user_id,
+                    "rt": relation_type,
+                    "wids": [word_id for word_id, _ in batch],
+                    "rids": [related_id for _, related_id in batch],
+                },
+            )
+            found.extend(rows.all())
+    return found
+
+
+def _save_batch(relations: List[RelationBuffer], logs: List[Dict], user_id: str) -> int:
+    """增量保存一批关系和日志到数据库（独立事务），返回插入的关系行数"""
+    with get_session() as session:
+        try:
+            inserted = insert_relations(session, user_id, relations)
+            upsert_generation_logs(session, user_id, logs)
+            session.commit()
+            logger.info(
+                f"Batch saved: {inserted}/{sum(map(len, relations))} relations, "
+                f"{len(logs)} logs"
+            )
+            return inserted
+
+        except Exception:
+            session.rollback()
+            raise
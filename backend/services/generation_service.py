@@ -2,87 +2,117 @@
 """
 关系生成任务管理服务
 
-管理生成器的线程生命周期、进度追踪和数据库读写。
+管理任务的启动、停止与进度追踪。任务本身（读库、运行生成器、落库，
+见 generation_job.py）由运行器执行：默认在独立的生成进程中，
+Web 进程只保存各任务的状态副本，不运行生成器、不导入生成器模块（见 job_runner.py）。
+
+任务状态每次变化都会递增所属用户的变更版本号并唤醒等待者；
+进度 SSE 通过 wait_for_change()（ASGI 协程用 wait_for_change_async()）等待，
+无变化时不轮询、不取快照。
+
+提交的任务先经 JobScheduler 排队（见 scheduler.py）：同时执行的任务数不超过 CPU 预算，
+用户间轮转准入，排队任务的快照带 queue_position 与 eta。
+
+配置了任务注册表（见 task_registry.py）时，多个 worker 进程共享任务状态：
+启动前在注册表中原子占用任务，后台同步线程发布本进程任务的快照（兼作心跳）、
+响应其他进程发来的停止请求，并在其他进程的任务变化时唤醒本进程的进度 SSE；
+CPU 预算与排队顺序也经注册表在所有进程间共享。
 """
+import asyncio
 import atexit
 import logging
+import os
+import socket
+import sqlite3
+import threading
 import time
-from concurrent.futures import Future, ThreadPoolExecutor
-from dataclasses import dataclass, field
-from datetime import datetime
-from threading import Event, Lock
-from typing import Dict, List, Optional, Set, Tuple
-
-from sqlalchemy import text
-
-from backend.extensions import get_session
-from backend.generators import (
-    AntonymGenerator,
-    ConfusedGenerator,
-    RootGenerator,
-    SynonymGenerator,
-    TopicGenerator,
-)
+import uuid
+from threading import Condition, Event, Lock
+from typing import Dict, Optional, Set, Tuple
+
+from backend.services.generation_job import ALL_RELATION_TYPES, GENERATOR_MAP, GenerationTask
+from backend.services.job_runner import create_job_runner
+from backend.services.scheduler import JobScheduler
+from backend.services.task_registry import RegisteredTask, TaskRegistry, get_task_registry
 
 logger = logging.getLogger(__name__)
 
-GENERATOR_MAP = {
-    "synonym": SynonymGenerator,
-    "antonym": AntonymGenerator,
-    "root": RootGenerator,
-    "confused": ConfusedGenerator,
-    "topic": TopicGenerator,
-}
-
-
-@dataclass
-class GenerationTask:
-    """单个生成任务的状态（线程安全）"""
-    user_id: str
-    relation_type: str
-    future: Optional[Future] = None
-    stop_event: Event = field(default_factory=Event)
-    _lock: Lock = field(default_factory=Lock)
-    status: str = "running"     # running | completed | stopped | error
-    processed: int = 0
-    total: int = 0
-    found: int = 0
-    saved: int = 0              # 已成功写入数据库的关系对数
-    skipped: int = 0            # 因已生成过该类型关系而跳过的单词数
-    save_errors: int = 0        # 保存失败的批次数
-    error: Optional[str] = None
-    started_at: datetime = field(default_factory=datetime.now)
-
-    def update_progress(self, processed: int, total: int, found: int):
-        """线程安全地更新进度"""
-        with self._lock:
-            self.processed = processed
-            self.total = total
-            self.found = found
+# 注册表同步间隔（秒）：发布快照、响应停止请求、转发其他进程的状态变化
+REGISTRY_SYNC_INTERVAL = 0.5
 
-    def add_saved(self, count: int):
-        """线程安全地累加已保存数"""
-        with self._lock:
-            self.saved += count
+# 快照未变化时的心跳间隔（秒，须远小于 task_registry.STALE_AFTER）
+REGISTRY_HEARTBEAT_INTERVAL = 5.0
 
-    def add_save_error(self):
-        """线程安全地累加保存失败计数"""
-        with self._lock:
-            self.save_errors += 1
+# 最近一次等待结束后仍视为有 SSE 在关注的时间（秒，覆盖两次等待之间的推送间隙）
+WATCH_GRACE = 2.0
+
+# 用户的变更通知无人等待、无运行中任务且未被访问超过该时间（秒）后释放
+FEED_IDLE_SECONDS = 300.0
 
-    def snapshot(self) -> dict:
-        """线程安全地获取状态快照"""
-        with self._lock:
-            return {
-                "status": self.status,
-                "processed": self.processed,
-                "total": self.total,
-                "found": self.found,
-                "saved": self.saved,
-                "skipped": self.skipped,
-                "save_errors": self.save_errors,
-                "error": self.error,
-            }
+
+class _ChangeFeed:
+    """单个用户的任务变更通知：版本号 + 条件变量（线程）/ asyncio.Event（协程）"""
+
+    def __init__(self):
+        self.version = 0
+        self._condition = Condition()
+        self._watchers = 0
+        self._watched_at = 0.0
+        self.used_at = time.monotonic()
+        self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+        # 通知来自运行器/同步线程，需切回各协程所在的事件循环
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass    # 事件循环已关闭
+
+    def watched(self) -> bool:
+        """是否有等待者（或刚结束等待）"""
+        with self._condition:
+            return self._watchers > 0 or time.monotonic() - self._watched_at < WATCH_GRACE
+
+    def idle(self, now: float) -> bool:
+        """无等待者且超过 FEED_IDLE_SECONDS 未被访问（可以释放）"""
+        with self._condition:
+            last_used = max(self.used_at, self._watched_at)
+            return self._watchers == 0 and now - last_used >= FEED_IDLE_SECONDS
+
+    def wait(self, version: int, timeout: Optional[float]) -> int:
+        """等待版本号不同于 version（或超时），返回当前版本号"""
+        with self._condition:
+            self._watchers += 1
+            try:
+                self._condition.wait_for(lambda: self.version != version, timeout)
+            finally:
+                self._watchers -= 1
+                self._watched_at = time.monotonic()
+            return self.version
+
+    async def wait_async(self, version: int, timeout: Optional[float]) -> int:
+        """wait() 的协程版本，等待期间不占用线程"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            if self.version != version:
+                return self.version
+            self._async_waiters.add(waiter)
+            self._watchers += 1
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+                self._watchers -= 1
+                self._watched_at = time.monotonic()
+        return self.version
 
 
 class GenerationService:
@@ -92,71 +122,149 @@ class GenerationService:
         # key: (user_id, relation_type) 元组，支持多用户同时生成
         self._tasks: Dict[Tuple[str, str], GenerationTask] = {}
         self._lock = Lock()
-        self._executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="gen")
+        # key: user_id，任务状态变更通知
+        self._feeds: Dict[str, _ChangeFeed] = {}
+        self._feeds_lock = Lock()
+        self._feeds_pruned_at = time.monotonic()
+        self._runner = JobScheduler(create_job_runner())
+        # 跨进程任务注册表：首次使用时（worker 进程内）打开并启动同步线程
+        self._registry: Optional[TaskRegistry] = None
+        self._registry_checked = False
+        self._registry_lock = Lock()
+        self._owner = ""
+        # key: run_id，本进程占用、尚未发布终态的任务 → (任务, 上次发布的快照, 发布时间)
+        self._published: Dict[str, Tuple[GenerationTask, Optional[dict], float]] = {}
+        # key: user_id，同步线程已转发的注册表变更序号
+        self._remote_versions: Dict[str, int] = {}
+        self._sync_stop = Event()
+        self._sync_thread: Optional[threading.Thread] = None
 
     def start(self, relation_type: str, user_id: str) -> bool:
-        """启动生成任务。返回 True 表示成功启动，False 表示已在运行。"""
-        if relation_type not in GENERATOR_MAP:
+        """
+        启动生成任务。返回 True 表示成功启动，False 表示已在运行。
+
+        组合任务与同一用户的单类型任务互斥（会生成相同的关系）；
+        配置了注册表时，其他进程中运行的任务同样视为冲突。
+        """
+        if relation_type not in GENERATOR_MAP and relation_type != ALL_RELATION_TYPES:
             raise ValueError(f"Unknown relation type: {relation_type}")
 
         task_key = (user_id, relation_type)
+        if relation_type == ALL_RELATION_TYPES:
+            conflicting = list(GENERATOR_MAP)
+        else:
+            conflicting = [ALL_RELATION_TYPES]
 
         with self._lock:
             task = self._tasks.get(task_key)
             if task and task.status == "running":
                 return False
+            for rt in conflicting:
+                other = self._tasks.get((user_id, rt))
+                if other and other.status == "running":
+                    return False
 
             # 清理同 key 的已完成任务
             if task and task.status != "running":
                 del self._tasks[task_key]
 
+            feed = self._feed(user_id)
             new_task = GenerationTask(
                 user_id=user_id,
                 relation_type=relation_type,
+                on_change=feed.notify,
             )
-            self._tasks[task_key] = new_task
 
-            new_task.future = self._executor.submit(
-                self._run_generation, new_task
-            )
-            return True
+            registry = self._task_registry()
+            if registry is not None:
+                if not registry.claim(
+                    user_id, relation_type, conflicting,
+                    self._owner, new_task.run_id, new_task.snapshot(),
+                ):
+                    return False
+                self._published[new_task.run_id] = (new_task, None, 0.0)
+
+            self._tasks[task_key] = new_task
+            self._runner.submit(new_task)
+        feed.notify()
+        self._prune_feeds()
+        return True
 
     def stop(self, relation_type: str, user_id: str) -> bool:
         """请求停止生成任务。返回 True 表示已发送停止信号。"""
         task_key = (user_id, relation_type)
         with self._lock:
             task = self._tasks.get(task_key)
-            if not task or task.status != "running":
-                return False
-            task.stop_event.set()
-            return True
+            if task and task.status == "running":
+                self._runner.stop(task)
+                return True
+
+        # 可能运行在其他进程中：由其所在进程的同步线程响应
+        registry = self._task_registry()
+        if registry is not None:
+            return registry.request_stop(user_id, relation_type)
+        return False
 
     def get_status_for_user(self, user_id: str) -> Dict[str, dict]:
         """获取指定用户的所有任务状态"""
         with self._lock:
             tasks_snapshot = {
                 rt: self._tasks.get((user_id, rt))
-                for rt in GENERATOR_MAP
+                for rt in (*GENERATOR_MAP, ALL_RELATION_TYPES)
             }
+        registered = self._registered_tasks(user_id)
         result = {}
         for rt, task in tasks_snapshot.items():
-            result[rt] = task.snapshot() if task else {"status": "idle"}
+            entry = registered.get(rt)
+            # 注册表中是另一次运行（其他进程占用的）时以注册表为准，本进程的任务取实时快照
+            if entry is not None and (task is None or entry.run_id != task.run_id):
+                result[rt] = entry.snapshot
+            else:
+                result[rt] = task.snapshot() if task else {"status": "idle"}
         return result
 
+    def change_version(self, user_id: str) -> int:
+        """指定用户任务状态的当前版本号（应先于 get_status_for_user 读取）"""
+        self._task_registry()    # 确保同步线程在转发其他进程的变化
+        self._prune_feeds()
+        return self._feed(user_id).version
+
+    def wait_for_change(self, user_id: str, version: int, timeout: Optional[float] = None) -> int:
+        """阻塞直到该用户的任务状态版本号不同于 version 或超时，返回当前版本号"""
+        return self._feed(user_id).wait(version, timeout)
+
+    async def wait_for_change_async(
+        self, user_id: str, version: int, timeout: Optional[float] = None
+    ) -> int:
+        """wait_for_change() 的协程版本"""
+        return await self._feed(user_id).wait_async(version, timeout)
+
     def has_active_tasks_for_user(self, user_id: str) -> bool:
-        """指定用户是否有正在运行的任务"""
-        with self._lock:
-            for rt in GENERATOR_MAP:
-                task = self._tasks.get((user_id, rt))
-                if task and task.status == "running":
-                    return True
-        return False
+        """指定用户是否有正在运行的任务（含其他进程中的任务）"""
+        return any(
+            status["status"] == "running"
+            for status in self.get_status_for_user(user_id).values()
+        )
 
     def active_task_count(self) -> int:
-        """返回所有用户中正在运行的任务数"""
+        """返回所有用户中正在运行的任务数（配置了注册表时为所有进程合计）"""
+        registry = self._task_registry()
+        if registry is not None:
+            try:
+                return registry.active_count()
+            except sqlite3.Error as e:
+                logger.warning(f"Task registry read failed: {e}")
         with self._lock:
             return sum(1 for t in self._tasks.values() if t.status == "running")
 
+    def warmup(self):
+        """
+        预热关系生成（生成进程模式下启动生成进程并在其中预热，立即返回）
+
+        可在部署后由后台线程调用，使首个生成任务无需等待导入；失败只记录日志。
+        """
+        self._runner.warmup()
+
     def shutdown(self):
         """优雅关闭：停止所有运行中的任务并等待线程结束"""
         with self._lock:
@@ -165,12 +273,14 @@ class GenerationService:
             ]
 
         if not running:
+            self._stop_registry_sync()
+            self._runner.shutdown()
             return
 
         logger.info(f"Shutting down {len(running)} running generation tasks...")
 
         for task in running:
-            task.stop_event.set()
+            self._runner.stop(task)
 
         for task in running:
             if task.future:
@@ -183,191 +293,143 @@ class GenerationService:
                             f"(user={task.user_id}) did not stop within 10s"
                         )
 
-        self._executor.shutdown(wait=False)
+        self._stop_registry_sync()
+        self._runner.shutdown()
         logger.info("Generation service shutdown complete")
 
     # ═══════════════════════════════════════════════════════════════════════
     # 内部方法
     # ═══════════════════════════════════════════════════════════════════════
 
-    def _run_generation(self, task: GenerationTask):
-        """线程目标函数：执行完整的生成流程"""
-        relation_type = task.relation_type
-        user_id = task.user_id
-        stop_event = task.stop_event
-
-        try:
-            # 1. 读取数据库
-            words, word_index, existing_relations, processed_ids = self._load_data(
-                relation_type, user_id
-            )
-
-            # 计算跳过数（已在 log 中的单词，取交集防止残留数据）
-            word_ids = {w['id'] for w in words}
-            with task._lock:
-                task.skipped = len(processed_ids & word_ids)
-                task.total = len(words) - task.skipped
-
-            # 2. 创建回调（使用线程安全方法）
-            def on_progress(processed: int, total: int, found: int):
-                task.update_progress(processed, total, found)
-
-            def on_save(relations: List[Dict], logs: List[Dict]):
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        self._save_batch(relations, logs, user_id)
-                        task.add_saved(len(relations) // 2)
-                        return
-                    except Exception as e:
-                        if attempt < max_retries - 1:
-                            wait = 2 ** attempt
-                            logger.warning(
-                                f"Save batch failed (attempt {attempt + 1}/{max_retries}), "
-                                f"retrying in {wait}s: {e}"
-                            )
-                            time.sleep(wait)
-                        else:
-                            logger.error(
-                                f"Save batch failed after {max_retries} attempts, "
-                                f"skipping {len(relations)} relations: {e}"
-                            )
-                            task.add_save_error()
-
-            # 3. 创建生成器
-            generator_cls = GENERATOR_MAP[relation_type]
-            generator = generator_cls(
-                on_progress=on_progress,
-                stop_event=stop_event,
-                on_save=on_save,
-            )
-
-            # 4. 执行生成（结果通过 on_save 增量保存）
-            result = generator.generate(words, word_index, existing_relations, processed_ids)
-
-            # 5. 更新最终状态
-            with task._lock:
-                task.found = result.stats.get("total_found", 0)
-                task.status = "stopped" if stop_event.is_set() else "completed"
-
-        except (KeyboardInterrupt, SystemExit):
-            with task._lock:
-                task.status = "stopped"
-            raise
-        except Exception as e:
-            logger.exception(f"Generation failed for {relation_type}: {e}")
-            with task._lock:
-                task.status = "error"
-                task.error = str(e)
-
-    def _load_data(
-        self, relation_type: str, user_id: str
-    ) -> Tuple[List[Dict], Dict[str, int], Set[Tuple[int, int, str]], Set[int]]:
-        """从数据库加载生成所需的全部数据"""
-        with get_session() as session:
-            # 加载用户的所有单词
-            rows = session.execute(
-                text("SELECT id, word, definition FROM words WHERE user_id = :uid ORDER BY id"),
-                {"uid": user_id},
-            ).fetchall()
-
-            words = [{"id": r[0], "word": r[1], "definition": r[2] or ""} for r in rows]
-            word_index = {w["word"].lower(): w["id"] for w in words}
-
-            # 加载已有关系
-            rel_rows = session.execute(
-                text(
-                    "SELECT word_id, related_word_id, relation_type "
-                    "FROM words_relations WHERE user_id = :uid"
-                ),
-                {"uid": user_id},
-            ).fetchall()
-
-            existing_relations: Set[Tuple[int, int, str]] = {
-                (r[0], r[1], r[2]) for r in rel_rows
+    def _feed(self, user_id: str) -> _ChangeFeed:
+        with self._feeds_lock:
+            feed = self._feeds.get(user_id)
+            if feed is None:
+                feed = self._feeds[user_id] = _ChangeFeed()
+            feed.used_at = time.monotonic()
+            return feed
+
+    def _prune_feeds(self):
+        """释放闲置用户的变更通知（每 FEED_IDLE_SECONDS 至多扫描一次；调用方不得持有锁）
+
+        有运行中任务的用户保留（任务的 on_change 指向该通知）；
+        刚取得通知、尚未开始等待的调用方已刷新 used_at，不会被释放。
+        """
+        now = time.monotonic()
+        if now - self._feeds_pruned_at < FEED_IDLE_SECONDS:
+            return
+        self._feeds_pruned_at = now
+        with self._lock:
+            busy = {
+                user_id for (user_id, _), task in self._tasks.items() if task.status == "running"
             }
+            with self._feeds_lock:
+                released = [
+                    user_id for user_id, feed in self._feeds.items()
+                    if user_id not in busy and feed.idle(now)
+                ]
+                for user_id in released:
+                    del self._feeds[user_id]
+        if released:
+            logger.debug(f"Released {len(released)} idle change feeds")
+
+    # ───────────────────────────────────────────────────────────────────────
+    # 跨进程任务注册表
+    # ───────────────────────────────────────────────────────────────────────
+
+    def _task_registry(self) -> Optional[TaskRegistry]:
+        """打开注册表并启动同步线程（double-checked；未配置时返回 None）"""
+        if self._registry_checked:
+            return self._registry
+        with self._registry_lock:
+            if self._registry_checked:
+                return self._registry
+            registry = get_task_registry()
+            if registry is not None:
+                self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+                self._runner.attach_registry(registry, self._owner)
+                self._sync_thread = threading.Thread(
+                    target=self._sync_registry_loop, name="gen-registry", daemon=True
+                )
+                self._sync_thread.start()
+            self._registry = registry
+            self._registry_checked = True
+            return registry
+
+    def _registered_tasks(self, user_id: str) -> Dict[str, RegisteredTask]:
+        registry = self._task_registry()
+        if registry is None:
+            return {}
+        try:
+            return registry.snapshots(user_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Task registry read failed: {e}")
+            return {}
 
-            # 加载已处理的单词 ID（仅当前关系类型）
-            log_rows = session.execute(
-                text(
-                    "SELECT word_id FROM relation_generation_log "
-                    "WHERE user_id = :uid AND relation_type = :rt"
-                ),
-                {"uid": user_id, "rt": relation_type},
-            ).fetchall()
-
-            processed_ids: Set[int] = {r[0] for r in log_rows}
-
-        return words, word_index, existing_relations, processed_ids
-
-    def _save_batch(self, relations: List[Dict], logs: List[Dict], user_id: str):
-        """增量保存一批关系和日志到数据库（独立事务）"""
-        BATCH_SIZE = 500
-
-        with get_session() as session:
+    def _sync_registry_loop(self):
+        while not self._sync_stop.wait(REGISTRY_SYNC_INTERVAL):
             try:
-                # 批量插入关系
-                if relations:
-                    for offset in range(0, len(relations), BATCH_SIZE):
-                        batch = relations[offset:offset + BATCH_SIZE]
-                        values_parts = []
-                        params: dict = {}
-                        for i, rel in enumerate(batch):
-                            values_parts.append(
-                                f"(:u{i}, :w{i}, :r{i}, :t{i}, :c{i})"
-                            )
-                            params[f"u{i}"] = user_id
-                            params[f"w{i}"] = rel["word_id"]
-                            params[f"r{i}"] = rel["related_word_id"]
-                            params[f"t{i}"] = rel["relation_type"]
-                            params[f"c{i}"] = rel["confidence"]
-
-                        session.execute(
-                            text(
-                                "INSERT INTO words_relations "
-                                "(user_id, word_id, related_word_id, relation_type, confidence) "
-                                f"VALUES {', '.join(values_parts)} "
-                                "ON CONFLICT (word_id, related_word_id, relation_type) DO NOTHING"
-                            ),
-                            params,
-                        )
+                self._sync_registry()
+            except Exception as e:
+                logger.warning(f"Task registry sync failed: {e}")
 
-                # 批量 upsert 生成日志
-                if logs:
-                    for offset in range(0, len(logs), BATCH_SIZE):
-                        batch = logs[offset:offset + BATCH_SIZE]
-                        values_parts = []
-                        params = {}
-                        for i, log_entry in enumerate(batch):
-                            values_parts.append(
-                                f"(:u{i}, :w{i}, :t{i}, :p{i}, :f{i})"
-                            )
-                            params[f"u{i}"] = user_id
-                            params[f"w{i}"] = log_entry["word_id"]
-                            params[f"t{i}"] = log_entry["relation_type"]
-                            params[f"p{i}"] = log_entry["processed_at"]
-                            params[f"f{i}"] = log_entry["found_count"]
-
-                        session.execute(
-                            text(
-                                "INSERT INTO relation_generation_log "
-                                "(user_id, word_id, relation_type, processed_at, found_count) "
-                                f"VALUES {', '.join(values_parts)} "
-                                "ON CONFLICT (word_id, relation_type) "
-                                "DO UPDATE SET processed_at = EXCLUDED.processed_at, "
-                                "found_count = EXCLUDED.found_count"
-                            ),
-                            params,
-                        )
-
-                session.commit()
-                logger.info(
-                    f"Batch saved: {len(relations)} relations, {len(logs)} logs"
-                )
+    def _sync_registry(self):
+        """发布本进程任务的快照，响应停止请求，准入排队任务，转发其他进程的状态变化"""
+        registry = self._registry
+        now = time.monotonic()
 
-            except Exception:
-                session.rollback()
-                raise
+        # 1. 快照有变化或到达心跳间隔的任务；终态发布后不再跟踪
+        with self._lock:
+            tracked = list(self._published.items())
+        pending: Dict[str, dict] = {}
+        for run_id, (task, last, published_at) in tracked:
+            current = task.snapshot()
+            if current != last or now - published_at >= REGISTRY_HEARTBEAT_INTERVAL:
+                pending[run_id] = current
+        if pending:
+            registry.publish(pending)
+            with self._lock:
+                for run_id, current in pending.items():
+                    if current["status"] == "running":
+                        self._published[run_id] = (self._published[run_id][0], current, now)
+                    else:
+                        del self._published[run_id]
+
+        # 2. 其他进程发来的停止请求
+        stop_ids = registry.stop_requests(self._owner)
+        if stop_ids:
+            with self._lock:
+                stopping = [self._published[r][0] for r in stop_ids if r in self._published]
+            for task in stopping:
+                self._runner.stop(task)
+
+        # 3. 已结束任务空出的名额（含其他进程的）：准入排队任务
+        self._runner.dispatch()
+
+        # 4. 有 SSE 等待的用户：注册表序号变化时唤醒（未关注用户的序号随之丢弃）
+        self._prune_feeds()
+        with self._feeds_lock:
+            watched = {user_id: feed for user_id, feed in self._feeds.items() if feed.watched()}
+        versions = registry.versions(watched)
+        for user_id, feed in watched.items():
+            version = versions.get(user_id)
+            if version is not None and version != self._remote_versions.get(user_id):
+                self._remote_versions[user_id] = version
+                feed.notify()
+        for user_id in list(self._remote_versions):
+            if user_id not in watched:
+                del self._remote_versions[user_id]
+
+    def _stop_registry_sync(self):
+        """发布剩余的终态快照后结束同步线程"""
+        if self._sync_thread is None:
+            return
+        self._sync_stop.set()
+        self._sync_thread.join(timeout=5)
+        try:
+            self._sync_registry()
+        except Exception as e:
+            logger.warning(f"Task registry final sync failed: {e}")
 
 
 # 单例
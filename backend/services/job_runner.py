@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+生成任务运行器 — 决定 generation_job.run_generation() 在哪里执行
+
+生成器的纯 Python 循环长时间持有 GIL，在 Web 进程的线程中运行时，
+同一进程内 /api/ai/*、/api/tts/* 等请求的延迟随之抖动。
+默认（GENERATION_RUNNER=process）交给独立的生成进程执行：
+- Web 进程只经管道发送任务描述（run_id、user_id、relation_type）与停止请求；
+- 生成进程在自己的线程中运行任务，持有分片进程池，自行读写数据库；
+- 任务状态变化后，生成进程每 REPORT_INTERVAL 秒合并回传一次执行进度，
+  Web 进程据此更新本地 GenerationTask（进度 SSE、任务注册表照常工作）；
+- 生成进程在首次提交任务或 warmup() 时经 forkserver 启动；异常退出时，
+  运行中的任务标记为 error，下次提交时重新启动；
+  Web 进程退出（管道关闭）时，生成进程停止全部任务后退出。
+
+GENERATION_RUNNER=thread 时在 Web 进程的线程池中运行（单核机器、调试）。
+"""
+import logging
+import os
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Set
+
+from backend.generators.worker_pool import WorkerPool, mp_context
+from backend.services.generation_job import GenerationTask, run_generation, warmup
+
+logger = logging.getLogger(__name__)
+
+# process：独立生成进程（默认）；thread：Web 进程内线程
+GENERATION_RUNNER = os.environ.get("GENERATION_RUNNER", "process")
+
+# 同时运行的生成任务数上限
+MAX_CONCURRENT_JOBS = 10
+
+# 生成进程回传状态快照的间隔（秒）
+REPORT_INTERVAL = 0.2
+
+# 生成进程停止任务时等待的秒数
+STOP_TIMEOUT = 10
+
+RUNNER_LOST_ERROR = "生成进程异常退出"
+
+
+class ThreadJobRunner:
+    """在当前进程的线程池中运行任务"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="gen"
+        )
+        # 进程池延迟启动，首个需要分片的任务才会拉起 worker
+        self._worker_pool = WorkerPool()
+
+    def submit(self, task: GenerationTask):
+        task.future = self._executor.submit(run_generation, task, self._worker_pool)
+
+    def stop(self, task: GenerationTask):
+        task.stop_event.set()
+
+    def warmup(self):
+        warmup()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self._worker_pool.shutdown()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# 生成进程侧
+# ═══════════════════════════════════════════════════════════════════════
+
+class _RunnerProcess:
+    """生成进程主体：接收命令、运行任务、合并回传状态"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, GenerationTask] = {}
+        self._dirty: Set[str] = set()
+        self._closing = threading.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="gen"
+        )
+        self._worker_pool = WorkerPool()
+
+    def serve(self):
+        reporter = threading.Thread(target=self._report_loop, name="gen-reporter", daemon=True)
+        reporter.start()
+        try:
+            while True:
+                try:
+                    message = self._conn.recv()
+                except (EOFError, OSError):
+                    logger.warning("Generation runner lost its parent, stopping tasks")
+                    break
+                kind = message[0]
+                if kind == "start":
+                    self._start(*message[1:])
+                elif kind == "stop":
+                    with self._lock:
+                        task = self._tasks.get(message[1])
+                    if task is not None:
+                        task.stop_event.set()
+                elif kind == "warmup":
+                    self._executor.submit(warmup)
+                elif kind == "shutdown":
+                    break
+        finally:
+            self._shutdown()
+            self._closing.set()
+            reporter.join()
+            self._report()
+
+    def _start(self, run_id: str, user_id: str, relation_type: str):
+        task = GenerationTask(
+            user_id=user_id,
+            relation_type=relation_type,
+            run_id=run_id,
+            on_change=lambda: self._mark(run_id),
+        )
+        with self._lock:
+            self._tasks[run_id] = task
+        task.future = self._executor.submit(run_generation, task, self._worker_pool)
+
+    def _mark(self, run_id: str):
+        with self._lock:
+            self._dirty.add(run_id)
+
+    def _report_loop(self):
+        while not self._closing.wait(REPORT_INTERVAL):
+            self._report()
+
+    def _report(self):
+        """回传有变化的任务快照；终态回传后不再跟踪"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            tasks = [self._tasks[run_id] for run_id in dirty if run_id in self._tasks]
+        for task in tasks:
+            progress = task.progress()
+            if progress["status"] != "running":
+                with self._lock:
+                    del self._tasks[task.run_id]
+            self._send(("state", task.run_id, progress))
+
+    def _send(self, message):
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except (OSError, ValueError):
+                pass    # Web 进程已退出
+
+    def _shutdown(self):
+        with self._lock:
+            running = list(self._tasks.values())
+        for task in running:
+            task.stop_event.set()
+        for task in running:
+            try:
+                task.future.result(timeout=STOP_TIMEOUT)
+            except Exception:
+                if not task.future.done():
+                    logger.warning(
+                        f"Generation thread for {task.relation_type} "
+                        f"(user={task.user_id}) did not stop within {STOP_TIMEOUT}s"
+                    )
+        self._executor.shutdown(wait=False)
+        self._worker_pool.shutdown()
+
+
+def _runner_main(conn):
+    """生成进程入口：停止信号由 Web 进程经管道发送"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    _RunnerProcess(conn).serve()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Web 进程侧
+# ═══════════════════════════════════════════════════════════════════════
+
+class ProcessJobRunner:
+    """把任务交给独立的生成进程（线程安全，延迟启动）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        self._closed = False
+        # key: run_id，已提交、尚未收到终态的任务
+        self._tasks: Dict[str, GenerationTask] = {}
+
+    def submit(self, task: GenerationTask):
+        task.future = Future()
+        with self._lock:
+            self._ensure_process()
+            self._tasks[task.run_id] = task
+            self._send(("start", task.run_id, task.user_id, task.relation_type))
+
+    def stop(self, task: GenerationTask):
+        task.stop_event.set()
+        with self._lock:
+            if task.run_id in self._tasks:
+                self._send(("stop", task.run_id))
+
+    def warmup(self):
+        with self._lock:
+            self._ensure_process()
+            self._send(("warmup",))
+
+    def shutdown(self, timeout: float = STOP_TIMEOUT + 5):
+        with self._lock:
+            process = self._process
+            if process is None or self._closed:
+                return
+            self._closed = True
+            self._send(("shutdown",))
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning(f"Generation runner did not exit within {timeout}s, terminating")
+            process.terminate()
+            process.join(5)
+
+    def _ensure_process(self):
+        """启动生成进程（调用方持有 self._lock）"""
+        if self._process is not None:
+            return
+        context = mp_context()
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_runner_main, args=(child_conn,), name="gen-runner")
+        process.start()
+        child_conn.close()
+        self._process, self._conn = process, conn
+        threading.Thread(
+            target=self._read_loop, args=(conn, process), name="gen-runner-reader", daemon=True
+        ).start()
+        logger.info(f"Generation runner started (pid={process.pid})")
+
+    def _send(self, message):
+        """发送命令（调用方持有 self._lock）；失败时由读线程处理进程退出"""
+        try:
+            self._conn.send(message)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Generation runner unreachable: {e}")
+
+    def _read_loop(self, conn, process):
+        """接收执行进度，更新本地任务；生成进程退出后标记剩余任务失败"""
+        while True:
+            try:
+                _, run_id, progress = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                task = self._tasks.get(run_id)
+                if task is not None and progress["status"] != "running":
+                    del self._tasks[run_id]
+            if task is None:
+                continue
+            task.update(**progress)
+            if progress["status"] != "running":
+                task.future.set_result(None)
+
+        process.join(5)
+        with self._lock:
+            lost = list(self._tasks.values())
+            self._tasks.clear()
+            if self._conn is conn:
+                self._process = self._conn = None
+        conn.close()
+        if lost:
+            logger.error(
+                f"Generation runner exited (code={process.exitcode}), "
+                f"{len(lost)} tasks lost"
+            )
+        for task in lost:
+            task.update(status="error", error=RUNNER_LOST_ERROR, stage=None)
+            task.future.set_result(None)
+
+
+def create_job_runner():
+    """按 GENERATION_RUNNER 创建运行器"""
+    if GENERATION_RUNNER == "thread":
+        return ThreadJobRunner()
+    return ProcessJobRunner()
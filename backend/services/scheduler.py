@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+生成任务调度 — CPU 预算、用户间公平与排队位次
+
+执行中的任务合计占用的核数不超过 GENERATION_CPU_BUDGET（默认可用 CPU 数），其余任务排队。
+每个任务的生成器主循环按一个核计算；分片交给所在进程的共享进程池，
+每个有任务执行的进程（worker 进程或其生成进程）另按池大小 GENERATION_WORKERS 计算，
+同一进程内的后续任务共用该池，只再占一个核。准入按排队顺序进行，
+队首任务超出预算即停止（不让后面的小任务插队）；没有任务执行时队首任务总能准入：
+- 排队顺序按用户轮转：执行中和已排在前面的任务越少的用户越优先，
+  其次是最久没有任务被准入的用户，同一用户内按提交先后；
+  一个用户同时提交多种关系类型不会挤占其他用户；
+- 排队任务的快照带 queue_position（从 1 开始）与 eta（预计剩余秒数，含排队时间）：
+  由执行中任务的剩余时间和同类任务的历史耗时模拟各空位的释放时间得出
+  （空位数按单个进程池估计，见 job_slots），没有历史耗时时为 None。
+
+配置了任务注册表时，预算与排队在所有 worker 进程间共享：
+占用任务即写入排队记录，准入在注册表事务中按同一顺序判定（见 TaskRegistry.admit）。
+未配置时只在本进程内调度。
+
+JobScheduler 包装运行器（见 job_runner.py），对 GenerationService 提供相同的接口。
+"""
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+from backend.generators.worker_pool import GENERATION_WORKERS
+from backend.services.generation_job import GenerationTask
+
+logger = logging.getLogger(__name__)
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# 生成任务可占用的核数（含分片进程池；配置了注册表时为所有 worker 进程合计）
+GENERATION_CPU_BUDGET = max(1, int(os.environ.get("GENERATION_CPU_BUDGET", "") or _cpu_count()))
+
+# 同类任务历史耗时的指数平滑系数
+DURATION_SMOOTHING = 0.3
+
+# 排队任务的预计开始时间变化超过该秒数才更新（避免每次调度都推送）
+ETA_REFRESH_SECONDS = 5.0
+
+
+class QueuedJob(NamedTuple):
+    """排队中的任务"""
+    run_id: str
+    user_id: str
+    relation_type: str
+    queued_at: float
+    owner: str = ""
+
+
+class RunningJob(NamedTuple):
+    """执行中的任务"""
+    run_id: str
+    user_id: str
+    remaining: Optional[float]    # 预计剩余秒数，未知为 None
+    owner: str = ""
+
+
+class QueueState(NamedTuple):
+    """调度所需的全局状态"""
+    running: List[RunningJob]
+    queued: List[QueuedJob]
+    served: Dict[str, float]    # user_id → 最近一次准入时间
+
+
+def fair_order(
+    queued: Sequence[QueuedJob],
+    running: Sequence[RunningJob],
+    served: Mapping[str, float] = {},
+) -> List[QueuedJob]:
+    """
+    排队任务的执行顺序（按用户轮转）
+
+    执行中/已排在前面的任务越少的用户越优先，其次是最近准入时间越早的用户，
+    再次按入队时间；在本轮中已排过的用户视为刚被准入。
+    """
+    per_user: Dict[str, Deque[QueuedJob]] = {}
+    for job in sorted(queued, key=lambda j: j.queued_at):
+        per_user.setdefault(job.user_id, deque()).append(job)
+
+    load = Counter(job.user_id for job in running)
+    heap = [
+        (load[user_id], served.get(user_id, 0.0), jobs[0].queued_at, user_id)
+        for user_id, jobs in per_user.items()
+    ]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        count, _, _, user_id = heapq.heappop(heap)
+        jobs = per_user[user_id]
+        order.append(jobs.popleft())
+        if jobs:
+            heapq.heappush(heap, (count + 1, math.inf, jobs[0].queued_at, user_id))
+    return order
+
+
+def admit_within_budget(
+    order: Sequence[QueuedJob],
+    running: Sequence[RunningJob],
+    budget: int,
+    pool_size: int,
+) -> List[QueuedJob]:
+    """
+    按 order 顺序可准入的任务
+
+    每个任务占一个核，所在进程（owner）尚无执行中任务时另占 pool_size 个核（进程池）；
+    队首任务超出预算即停止，没有执行中的任务时至少准入一个。
+    """
+    pools = {job.owner for job in running}
+    used = len(running) + pool_size * len(pools)
+    admitted: List[QueuedJob] = []
+    for job in order:
+        cost = 1 if job.owner in pools else 1 + pool_size
+        if used + cost > budget and (running or admitted):
+            break
+        admitted.append(job)
+        used += cost
+        pools.add(job.owner)
+    return admitted
+
+
+def job_slots(budget: int, pool_size: int) -> int:
+    """预算内可同时执行的任务数（任务共用一个进程池时）"""
+    return max(1, budget - pool_size)
+
+
+def estimate_starts(
+    order: Sequence[QueuedJob],
+    running: Sequence[RunningJob],
+    slots: int,
+    duration_of: Callable[[str], Optional[float]],
+) -> List[Optional[float]]:
+    """按顺序模拟各排队任务距现在的开始时间（秒；无法估计为 None）"""
+    finishing = sorted(
+        job.remaining if job.remaining is not None else math.inf for job in running
+    )
+    if len(finishing) >= slots:
+        # 执行中的任务多于空位（如预算刚调小）：后 slots 个结束时间对应各空位
+        free_at = finishing[len(finishing) - slots:]
+    else:
+        free_at = finishing + [0.0] * (slots - len(finishing))
+    heapq.heapify(free_at)
+
+    starts: List[Optional[float]] = []
+    for job in order:
+        start = heapq.heappop(free_at)
+        starts.append(None if start == math.inf else start)
+        duration = duration_of(job.relation_type)
+        heapq.heappush(free_at, start + duration if duration is not None else math.inf)
+    return starts
+
+
+class JobScheduler:
+    """按 CPU 预算准入任务的运行器包装（线程安全）"""
+
+    def __init__(
+        self,
+        runner,
+        budget: int = GENERATION_CPU_BUDGET,
+        pool_size: int = GENERATION_WORKERS,
+    ):
+        self._runner = runner
+        self.budget = max(1, budget)
+        self.pool_size = max(0, pool_size)
+        self._lock = threading.Lock()
+        # key: run_id
+        self._queued: Dict[str, GenerationTask] = {}
+        self._running: Dict[str, GenerationTask] = {}
+        # key: relation_type，已完成任务执行耗时的平滑值（秒）
+        self._durations: Dict[str, float] = {}
+        # key: user_id，最近一次准入时间
+        self._served: Dict[str, float] = {}
+        self._registry = None
+        self._owner = ""
+
+    def attach_registry(self, registry, owner: str):
+        """改为经任务注册表在所有进程间调度"""
+        with self._lock:
+            self._registry = registry
+            self._owner = owner
+
+    def submit(self, task: GenerationTask):
+        # 排队期间的占位，开始执行后由运行器替换
+        task.future = Future()
+        with self._lock:
+            self._queued[task.run_id] = task
+        self.dispatch()
+
+    def stop(self, task: GenerationTask):
+        with self._lock:
+            queued = self._queued.pop(task.run_id, None) is not None
+        if not queued:
+            self._runner.stop(task)
+            return
+        task.stop_event.set()
+        task.update(status="stopped", queue_position=None, expected_start=None)
+        task.future.set_result(None)
+        self.dispatch()
+
+    def warmup(self):
+        self._runner.warmup()
+
+    def shutdown(self):
+        self._runner.shutdown()
+
+    def dispatch(self):
+        """准入可执行的任务，并刷新其余排队任务的位次与预计时间"""
+        with self._lock:
+            if not self._queued:
+                return
+            if self._registry is not None:
+                admitted = self._registry.admit(self._owner, self.budget, self.pool_size)
+            else:
+                state = self._local_state()
+                order = fair_order(state.queued, state.running, state.served)
+                admitted = [
+                    job.run_id
+                    for job in admit_within_budget(order, state.running, self.budget, self.pool_size)
+                ]
+
+            now = time.time()
+            started = [self._queued.pop(run_id) for run_id in admitted if run_id in self._queued]
+            for task in started:
+                self._running[task.run_id] = task
+                self._served[task.user_id] = now
+                task.update(
+                    queue_position=None,
+                    expected_start=None,
+                    expected_duration=self._durations.get(task.relation_type),
+                    run_started=now,
+                )
+
+            if self._registry is not None:
+                state = self._registry.queue_state()
+            else:
+                state = self._local_state()
+            order = fair_order(state.queued, state.running, state.served)
+            starts = estimate_starts(
+                order, state.running, job_slots(self.budget, self.pool_size), self._durations.get
+            )
+            plan = {
+                job.run_id: (position, start)
+                for position, (job, start) in enumerate(zip(order, starts), 1)
+            }
+            waiting = list(self._queued.values())
+
+        for task in started:
+            self._runner.submit(task)
+            if task.stop_event.is_set():
+                # 准入后、提交前收到的停止请求
+                self._runner.stop(task)
+            task.future.add_done_callback(lambda _, task=task: self._finished(task))
+            logger.info(
+                f"Generation {task.relation_type} (user={task.user_id}) admitted, "
+                f"{len(waiting)} queued"
+            )
+
+        for task in waiting:
+            position, start = plan.get(task.run_id, (None, None))
+            expected_start = now + start if start is not None else None
+            if (
+                position != task.queue_position
+                or (expected_start is None) != (task.expected_start is None)
+                or (expected_start is not None
+                    and abs(expected_start - task.expected_start) >= ETA_REFRESH_SECONDS)
+            ):
+                task.update(
+                    queue_position=position,
+                    expected_start=expected_start,
+                    expected_duration=self._durations.get(task.relation_type),
+                )
+
+    def _local_state(self) -> QueueState:
+        """本进程的调度状态（调用方持有 self._lock）"""
+        running = [
+            RunningJob(task.run_id, task.user_id, task.remaining())
+            for task in self._running.values()
+        ]
+        queued = [
+            QueuedJob(task.run_id, task.user_id, task.relation_type, task.started_at.timestamp())
+            for task in self._queued.values()
+        ]
+        return QueueState(running, queued, self._served)
+
+    def _finished(self, task: GenerationTask):
+        with self._lock:
+            self._running.pop(task.run_id, None)
+            if task.status == "completed" and task.run_started is not None:
+                duration = time.time() - task.run_started
+                previous = self._durations.get(task.relation_type)
+                self._durations[task.relation_type] = (
+                    duration if previous is None
+                    else previous + DURATION_SMOOTHING * (duration - previous)
+                )
+            registry = self._registry
+        # 注册表模式下由同步线程在发布终态后调度（空出的名额此时才对其他进程可见）
+        if registry is None:
+            self.dispatch()
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+生成任务注册表 — 多个 worker 进程共享任务状态
+
+GenerationService 的任务对象只存在于启动它的进程中；多 worker 部署时，
+各进程通过注册表协调：
+- claim()：原子地占用 (user_id, relation_type)，同时检查互斥类型，
+  不同进程不会重复启动同一任务；
+- publish()：任务所在进程定期写入状态快照，兼作心跳；
+  运行中的任务超过 STALE_AFTER 秒未更新，视为所在进程已退出，可被重新占用；
+- request_stop() / stop_requests()：任意进程请求停止，任务所在进程同步时响应；
+- snapshots() / versions()：某用户的任务快照及变更序号（进度 SSE 据此唤醒）；
+- admit() / queue_state()：占用的任务先排队，各进程共享 CPU 预算，
+  按 scheduler.fair_order 的顺序准入（见 scheduler.py）。
+
+每次占用生成新的 run_id，快照只写入同一 run_id 的行，已结束任务的迟到写入不会覆盖新任务。
+
+TaskRegistry 为接口；默认实现 SqliteTaskRegistry（WAL 模式）适用于同一主机上的多个 worker，
+跨主机部署可另行实现（如基于 PostgreSQL）。
+未配置或无法打开时 get_task_registry() 返回 None，GenerationService 只使用进程内任务表。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from backend.services.scheduler import (
+    QueuedJob,
+    QueueState,
+    RunningJob,
+    admit_within_budget,
+    fair_order,
+)
+
+logger = logging.getLogger(__name__)
+
+# 空字符串表示禁用（单进程部署无需注册表）
+TASK_REGISTRY_PATH = os.environ.get(
+    "TASK_REGISTRY_PATH", "/opt/vocabulary_app/feature-store/generation-tasks.sqlite3"
+)
+
+# 运行中任务的心跳超过该秒数未更新即视为失联
+STALE_AFTER = 30.0
+
+LOST_ERROR = "生成任务所在进程已退出"
+
+# 表结构版本（任务状态是临时数据，版本不符时直接重建）
+SCHEMA_VERSION = 2
+
+
+class RegisteredTask(NamedTuple):
+    """注册表中的一条任务记录"""
+    run_id: str
+    owner: str
+    snapshot: dict
+
+
+class TaskRegistry(ABC):
+    """跨进程任务注册表接口（实现需线程安全）"""
+
+    @abstractmethod
+    def claim(
+        self, user_id: str, relation_type: str, conflicting: Iterable[str],
+        owner: str, run_id: str, snapshot: dict,
+    ) -> bool:
+        """占用任务；该 key 或互斥类型有未失联的运行中任务时返回 False"""
+
+    @abstractmethod
+    def publish(self, snapshots: Dict[str, dict]) -> None:
+        """写入 {run_id: 快照} 并刷新心跳（快照变化时递增变更序号）"""
+
+    @abstractmethod
+    def request_stop(self, user_id: str, relation_type: str) -> bool:
+        """请求停止运行中的任务；没有运行中的任务时返回 False"""
+
+    @abstractmethod
+    def stop_requests(self, owner: str) -> List[str]:
+        """owner 进程中被请求停止的运行中任务的 run_id"""
+
+    @abstractmethod
+    def snapshots(self, user_id: str) -> Dict[str, RegisteredTask]:
+        """某用户各关系类型最近一次任务的记录（失联任务报告为 error）"""
+
+    @abstractmethod
+    def versions(self, user_ids: Iterable[str]) -> Dict[str, int]:
+        """各用户任务记录的最大变更序号"""
+
+    @abstractmethod
+    def active_count(self) -> int:
+        """所有用户中未失联的运行中任务数"""
+
+    @abstractmethod
+    def admit(self, owner: str, budget: int, pool_size: int) -> List[str]:
+        """按公平顺序在 CPU 预算内准入排队任务，返回本次准入的、属于 owner 的 run_id（原子操作）"""
+
+    @abstractmethod
+    def queue_state(self) -> QueueState:
+        """所有进程中未失联的执行中任务、排队任务及各用户最近一次准入时间"""
+
+
+class SqliteTaskRegistry(TaskRegistry):
+    """SQLite 任务注册表（WAL 模式，单连接 + 锁；占用在 BEGIN IMMEDIATE 事务中完成）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # isolation_level=None：自动提交，需要原子性的地方显式 BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS generation_tasks")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS generation_tasks ("
+                "user_id TEXT NOT NULL, relation_type TEXT NOT NULL, "
+                "run_id TEXT NOT NULL, owner TEXT NOT NULL, status TEXT NOT NULL, "
+                "snapshot TEXT NOT NULL, heartbeat_at REAL NOT NULL, "
+                "stop_requested INTEGER NOT NULL DEFAULT 0, seq INTEGER NOT NULL, "
+                "queued_at REAL NOT NULL, admitted_at REAL, "
+                "PRIMARY KEY (user_id, relation_type)"
+                ") WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS generation_tasks_run_id "
+                "ON generation_tasks (run_id)"
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, user_id, relation_type, conflicting, owner, run_id, snapshot) -> bool:
+        keys = [relation_type, *conflicting]
+        placeholders = ", ".join("?" * len(keys))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                busy = self._conn.execute(
+                    "SELECT 1 FROM generation_tasks WHERE user_id = ? "
+                    f"AND relation_type IN ({placeholders}) "
+                    "AND status = 'running' AND heartbeat_at >= ? LIMIT 1",
+                    (user_id, *keys, now - STALE_AFTER),
+                ).fetchone()
+                if busy:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO generation_tasks "
+                    "(user_id, relation_type, run_id, owner, status, snapshot, "
+                    "heartbeat_at, stop_requested, seq, queued_at, admitted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0, "
+                    "(SELECT coalesce(max(seq), 0) + 1 FROM generation_tasks), ?, NULL)",
+                    (user_id, relation_type, run_id, owner, snapshot["status"],
+                     json.dumps(snapshot), now, now),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def publish(self, snapshots: Dict[str, dict]) -> None:
+        if not snapshots:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for run_id, snapshot in snapshots.items():
+                    value = json.dumps(snapshot)
+                    self._conn.execute(
+                        "UPDATE generation_tasks SET heartbeat_at = ?, status = ?, "
+                        "seq = CASE WHEN snapshot = ? THEN seq "
+                        "ELSE (SELECT max(seq) + 1 FROM generation_tasks) END, "
+                        "snapshot = ? WHERE run_id = ?",
+                        (now, snapshot["status"], value, value, run_id),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def request_stop(self, user_id: str, relation_type: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE generation_tasks SET stop_requested = 1 "
+                "WHERE user_id = ? AND relation_type = ? "
+                "AND status = 'running' AND heartbeat_at >= ?",
+                (user_id, relation_type, time.time() - STALE_AFTER),
+            )
+            return cursor.rowcount > 0
+
+    def stop_requests(self, owner: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id FROM generation_tasks "
+                "WHERE owner = ? AND status = 'running' AND stop_requested = 1",
+                (owner,),
+            ).fetchall()
+        return [run_id for (run_id,) in rows]
+
+    def snapshots(self, user_id: str) -> Dict[str, RegisteredTask]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT relation_type, run_id, owner, snapshot, heartbeat_at "
+                "FROM generation_tasks WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+        stale_before = time.time() - STALE_AFTER
+        result = {}
+        for relation_type, run_id, owner, value, heartbeat_at in rows:
+            snapshot = json.loads(value)
+            if snapshot["status"] == "running" and heartbeat_at < stale_before:
+                snapshot.update(status="error", error=LOST_ERROR, stage=None)
+            result[relation_type] = RegisteredTask(run_id, owner, snapshot)
+        return result
+
+    def versions(self, user_ids: Iterable[str]) -> Dict[str, int]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        placeholders = ", ".join("?" * len(user_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, max(seq) FROM generation_tasks "
+                f"WHERE user_id IN ({placeholders}) GROUP BY user_id",
+                user_ids,
+            ).fetchall()
+        return dict(rows)
+
+    def active_count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT count(*) FROM generation_tasks "
+                "WHERE status = 'running' AND heartbeat_at >= ?",
+                (time.time() - STALE_AFTER,),
+            ).fetchone()
+        return count
+
+    def admit(self, owner: str, budget: int, pool_size: int) -> List[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._queue_state()
+                # 只准入顺序靠前且属于本进程的任务，排在前面的其他进程任务由其所在进程准入
+                order = fair_order(state.queued, state.running, state.served)
+                admitted = [
+                    job.run_id
+                    for job in admit_within_budget(order, state.running, budget, pool_size)
+                    if job.owner == owner
+                ]
+                self._conn.executemany(
+                    "UPDATE generation_tasks SET admitted_at = ? WHERE run_id = ?",
+                    [(now, run_id) for run_id in admitted],
+                )
+                self._conn.execute("COMMIT")
+                return admitted
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def queue_state(self) -> QueueState:
+        with self._lock:
+            return self._queue_state()
+
+    def _queue_state(self) -> QueueState:
+        rows = self._conn.execute(
+            "SELECT run_id, user_id, relation_type, owner, queued_at, admitted_at, snapshot "
+            "FROM generation_tasks WHERE status = 'running' AND heartbeat_at >= ?",
+            (time.time() - STALE_AFTER,),
+        ).fetchall()
+        running: List[RunningJob] = []
+        queued: List[QueuedJob] = []
+        for run_id, user_id, relation_type, owner, queued_at, admitted_at, value in rows:
+            if admitted_at is not None:
+                running.append(RunningJob(run_id, user_id, json.loads(value).get("eta"), owner))
+            else:
+                queued.append(QueuedJob(run_id, user_id, relation_type, queued_at, owner))
+        # 已结束任务的准入时间同样计入（刚执行完的用户不会立即插到其他用户前面）
+        served = dict(self._conn.execute(
+            "SELECT user_id, max(admitted_at) FROM generation_tasks "
+            "WHERE admitted_at IS NOT NULL GROUP BY user_id"
+        ).fetchall())
+        return QueueState(running, queued, served)
+
+
+_registry: Optional[TaskRegistry] = None
+_registry_disabled = False
+_registry_lock = threading.Lock()
+
+
+def get_task_registry() -> Optional[TaskRegistry]:
+    """获取进程级任务注册表（double-checked locking；禁用或打开失败时返回 None）"""
+    global _registry, _registry_disabled
+    if _registry is not None or _registry_disabled:
+        return _registry
+    with _registry_lock:
+        if _registry is not None or _registry_disabled:
+            return _registry
+        if not TASK_REGISTRY_PATH:
+            _registry_disabled = True
+            return None
+        try:
+            os.makedirs(os.path.dirname(TASK_REGISTRY_PATH) or ".", exist_ok=True)
+            _registry = SqliteTaskRegistry(TASK_REGISTRY_PATH)
+            logger.info(f"Task registry opened: {TASK_REGISTRY_PATH}")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Task registry unavailable, tracking tasks in-process only: {e}")
+            _registry_disabled = True
+        return _registry
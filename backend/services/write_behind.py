@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+生成结果异步写入（write-behind）
+
+生成器线程的 on_save 只把一批关系/日志放入有界队列就返回，由任务专用的写线程落库：
+- 写线程取出一批后，顺带取走队列中已积压的批次，合并为一个事务写入
+  （合并后同一单词、关系类型的日志只保留最后一条，与逐批 upsert 的结果相同）；
+- 队列满时 submit() 阻塞，生成速度受写库速度约束（背压），内存不会无限增长；
+- 写库失败按指数退避重试，重试在写线程中进行，不阻塞生成；
+- close() 写完全部已入队批次后才返回，任务停止、出错或服务关闭时都不会丢失已产出的关系。
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.generators.relation_store import RelationBuffer
+
+logger = logging.getLogger(__name__)
+
+# 队列中最多积压的批次数（每批约为生成器的 flush 阈值）
+WRITE_QUEUE_BATCHES = 16
+
+# 合并写入时单个事务的最大行数（关系 + 日志）
+MAX_MERGED_ROWS = 5000
+
+_CLOSE = object()
+
+
+def _dedupe_logs(logs: List[Dict]) -> List[Dict]:
+    """同一 (word_id, relation_type) 只保留最后一条（单条 upsert 语句不能两次更新同一行）"""
+    latest = {(entry["word_id"], entry["relation_type"]): entry for entry in logs}
+    if len(latest) == len(logs):
+        return logs
+    return list(latest.values())
+
+
+class WriteBehindSaver:
+    """单个生成任务的异步写入器（submit 线程安全）"""
+
+    MAX_RETRIES = 3
+
+    def __init__(
+        self,
+        save_batch: Callable[[List[RelationBuffer], List[Dict]], int],
+        on_saved: Optional[Callable[[int], None]] = None,
+        on_error: Optional[Callable[[], None]] = None,
+        max_pending: int = WRITE_QUEUE_BATCHES,
+        name: str = "gen-writer",
+    ):
+        self._save_batch = save_batch    # (关系缓冲列表, logs) → 一个事务写入，返回插入的关系行数，失败抛异常
+        self._on_saved = on_saved        # (插入的关系行数)
+        self._on_error = on_error        # 重试耗尽，放弃一批
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, relations: RelationBuffer, logs: List[Dict]):
+        """入队一批待写数据（队列满时阻塞）"""
+        self._queue.put((relations, logs))
+
+    def close(self, timeout: Optional[float] = None):
+        """写完所有已入队的批次后结束写线程"""
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Writer {self._thread.name} still draining after {timeout}s")
+
+    def _run(self):
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+            buffers, logs = [item[0]], list(item[1])
+            rows = len(item[0]) + len(item[1])
+
+            # 合并已积压的批次
+            while rows < MAX_MERGED_ROWS:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                buffers.append(item[0])
+                logs.extend(item[1])
+                rows += len(item[0]) + len(item[1])
+
+            self._write(buffers, _dedupe_logs(logs))
+
+    def _write(self, buffers: List[RelationBuffer], logs: List[Dict]):
+        relation_count = sum(map(len, buffers))
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                inserted = self._save_batch(buffers, logs)
+                if self._on_saved:
+                    self._on_saved(inserted)
+                return
+            except Exception as e:
+                if attempt < self.MAX_RETRIES - 1:
+                    wait = 2 ** attempt
+                    logger.warning(
+                        f"Save batch failed (attempt {attempt + 1}/{self.MAX_RETRIES}), "
+                        f"retrying in {wait}s: {e}"
+                    )
+                    time.sleep(wait)
+                else:
+                    logger.error(
+                        f"Save batch failed after {self.MAX_RETRIES} attempts, "
+                        f"skipping {relation_count} relations: {e}"
+                    )
+                    if self._on_error:
+                        self._on_error()
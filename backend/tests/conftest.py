@@ -0,0 +1,12 @@
+"""后端单元测试公共配置。
+
+backend.extensions 导入时要求 DATABASE_URL（只建引擎、不连接），
+这里的测试都不访问数据库，给一个占位值即可；从任意目录运行时仓库根目录需在 sys.path 中。
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
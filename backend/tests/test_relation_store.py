@@ -0,0 +1,352 @@
+"""relation_store 单元测试：打包键集合、列式缓冲、Bloom 过滤器与 Python 的 set / 元组对照。
+
+单词 id 是 int4（SERIAL），打包键为 word_id << 32 | related_id，
+因此边界值取 2^31 - 1（数据库上限）与 2^32 - 1（打包低位上限）。
+Bloom 过滤器在数据库端由 generation_job._BLOOM_WORDS 构建、在 Python 端查询，
+这里按 SQL 的算术（bigint、bit_or 返回有符号值）重建过滤器，确认两端一致。
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from backend.generators.base import BaseGenerator, GenerationResult
+from backend.generators.relation_store import (
+    ABSENT,
+    BLOOM_HASHES,
+    BLOOM_MULTIPLIERS,
+    POSSIBLE,
+    PRESENT,
+    BloomFilter,
+    FilteredRelationSet,
+    RelationBuffer,
+    RelationSet,
+    pack_pair,
+)
+
+INT4_MAX = 2**31 - 1
+U32_MAX = 2**32 - 1
+BOUNDARY_IDS = [0, 1, 2**16, INT4_MAX - 1, INT4_MAX, 2**31, U32_MAX - 1, U32_MAX]
+
+
+def random_rows(seed, count, types=("synonym", "antonym")):
+    rng = random.Random(seed)
+    ids = BOUNDARY_IDS + [rng.randrange(U32_MAX + 1) for _ in range(50)]
+    return [(rng.choice(ids), rng.choice(ids), rng.choice(types)) for _ in range(count)]
+
+
+def assert_matches(relation_set, expected, probes):
+    for word_id, related_id, rt in probes:
+        want = PRESENT if (word_id, related_id, rt) in expected else ABSENT
+        assert relation_set.lookup(word_id, related_id, rt) == want, (word_id, related_id, rt)
+
+
+# ── 打包键 ─────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("word_id", BOUNDARY_IDS)
+@pytest.mark.parametrize("related_id", BOUNDARY_IDS)
+def test_pack_pair_is_injective_and_ordered(word_id, related_id):
+    key = pack_pair(word_id, related_id)
+    assert 0 <= key < 2**64
+    assert (key >> 32, key & U32_MAX) == (word_id, related_id)
+
+
+def test_pack_pair_order_matches_tuple_order():
+    pairs = [(w, r) for w in BOUNDARY_IDS for r in BOUNDARY_IDS]
+    assert sorted(pairs) == sorted(pairs, key=lambda p: pack_pair(*p))
+
+
+# ── from_rows / lookup ─────────────────────────────────────────────
+
+def test_from_rows_sorted_input():
+    rows = sorted(set(random_rows(1, 400)), key=lambda r: (r[2], r[0], r[1]))
+    relation_set = RelationSet.from_rows(rows)
+    expected = set(rows)
+    assert len(relation_set) == len(expected)
+    assert_matches(relation_set, expected, random_rows(2, 2000) + rows)
+
+
+def test_from_rows_unsorted_input_with_duplicates():
+    rows = random_rows(3, 600)
+    rows += rows[:100]
+    random.Random(4).shuffle(rows)
+    relation_set = RelationSet.from_rows(rows)
+    expected = set(rows)
+    assert len(relation_set) == len(expected)
+    assert_matches(relation_set, expected, random_rows(5, 2000) + rows)
+
+
+def test_lookup_is_directed_and_per_type():
+    relation_set = RelationSet.from_rows([(INT4_MAX, 1, "synonym")])
+    assert relation_set.lookup(INT4_MAX, 1, "synonym") == PRESENT
+    assert relation_set.lookup(1, INT4_MAX, "synonym") == ABSENT
+    assert relation_set.lookup(INT4_MAX, 1, "antonym") == ABSENT
+    assert relation_set.lookup(INT4_MAX - 1, 1, "synonym") == ABSENT
+
+
+def test_empty_set():
+    relation_set = RelationSet.from_rows([])
+    assert len(relation_set) == 0
+    assert relation_set.lookup(1, 2, "synonym") == ABSENT
+    assert relation_set.degrees("synonym") == {}
+
+
+# ── add / degrees ──────────────────────────────────────────────────
+
+def test_add_merges_with_loaded_keys():
+    loaded = set(random_rows(6, 300))
+    added = set(random_rows(7, 300))
+    relation_set = RelationSet.from_rows(loaded)
+    for word_id, related_id, rt in added:
+        relation_set.add(word_id, related_id, rt)
+    expected = loaded | added
+    assert_matches(relation_set, expected, random_rows(8, 2000) + list(expected))
+
+
+@pytest.mark.parametrize("relation_type", ["synonym", "antonym", "topic"])
+def test_degrees_count_loaded_and_added(relation_type):
+    loaded = set(random_rows(9, 300))
+    added = set(random_rows(10, 100)) - loaded
+    relation_set = RelationSet.from_rows(loaded)
+    for row in added:
+        relation_set.add(*row)
+    expected = Counter(w for w, _, rt in loaded | added if rt == relation_type)
+    assert relation_set.degrees(relation_type) == dict(expected)
+
+
+def test_degrees_returns_a_copy():
+    relation_set = RelationSet.from_rows([(1, 2, "synonym")])
+    degrees = relation_set.degrees("synonym")
+    degrees[1] += 5
+    assert relation_set.degrees("synonym") == {1: 1}
+
+
+# ── RelationBuffer ─────────────────────────────────────────────────
+
+def test_buffer_round_trip():
+    rng = random.Random(11)
+    rows = [
+        (rng.choice([1, INT4_MAX, rng.randrange(INT4_MAX)]),
+         rng.choice([1, INT4_MAX, rng.randrange(INT4_MAX)]),
+         round(rng.random(), 2))
+        for _ in range(500)
+    ]
+    buffer = RelationBuffer("confused")
+    for row in rows:
+        buffer.append(*row)
+    assert len(buffer) == len(rows)
+    assert list(buffer.rows()) == [(w, r, "confused", c) for w, r, c in rows]
+
+
+def test_buffer_keeps_two_decimal_confidences_exact():
+    buffer = RelationBuffer("synonym")
+    for confidence in (0.85, 0.1, 0.33, 1.0):
+        buffer.append(1, 2, confidence)
+    assert [c for *_, c in buffer.rows()] == [0.85, 0.1, 0.33, 1.0]
+
+
+def test_buffer_rejects_ids_beyond_int4():
+    buffer = RelationBuffer("synonym")
+    with pytest.raises(OverflowError):
+        buffer.append(INT4_MAX + 1, 1, 0.5)
+
+
+# ── Bloom 过滤器 ───────────────────────────────────────────────────
+
+def random_pairs(seed, count):
+    rng = random.Random(seed)
+
+    def pick():
+        return rng.choice([1, 2, INT4_MAX - 1, INT4_MAX, rng.randrange(1, INT4_MAX)])
+
+    return {(pick(), pick()) for _ in range(count)}
+
+
+def to_signed(value):
+    """Postgres bigint 的取值（bit_or 含第 63 位时为负）"""
+    return value - 2**64 if value >= 2**63 else value
+
+
+def sql_bloom_words(bits, pairs):
+    """按 _BLOOM_WORDS 的算术构建 (slot, 有符号 64 位值) 行"""
+    a, b, c, d = BLOOM_MULTIPLIERS
+    slots = {}
+    for word_id, related_id in pairs:
+        h1 = (word_id * a + related_id * b) % bits
+        h2 = (word_id * c + related_id * d) % (bits - 1) + 1
+        for i in range(BLOOM_HASHES):
+            bit = (h1 + i * h2) % bits
+            slots[bit // 64] = slots.get(bit // 64, 0) | (1 << (bit % 64))
+    return [(slot, to_signed(value)) for slot, value in slots.items()]
+
+
+def built_by_add(bits, pairs):
+    bloom = BloomFilter(bits)
+    for pair in pairs:
+        bloom.add(*pair)
+    return bloom
+
+
+def test_bloom_products_fit_in_bigint():
+    assert max(BLOOM_MULTIPLIERS) * INT4_MAX * 2 < 2**63
+
+
+def test_bloom_sql_uses_same_multipliers_and_parameters():
+    from backend.services.generation_job import _BLOOM_WORDS
+
+    sql = str(_BLOOM_WORDS)
+    for multiplier in BLOOM_MULTIPLIERS:
+        assert str(multiplier) in sql
+    for param in (":bits", ":hashes", ":uid", ":rt"):
+        assert param in sql
+
+
+@pytest.mark.parametrize("count", [1, 100, 3000])
+def test_from_words_matches_add(count):
+    pairs = random_pairs(count, count)
+    bits = BloomFilter.bits_for(len(pairs))
+    positions = BloomFilter(bits)._positions
+    rows = {}
+    for pair in pairs:
+        for bit in positions(*pair):
+            rows[bit >> 6] = rows.get(bit >> 6, 0) | (1 << (bit & 63))
+    from_positions = BloomFilter.from_words(bits, [(k, to_signed(v)) for k, v in rows.items()])
+    assert from_positions.words == built_by_add(bits, pairs).words
+
+
+@pytest.mark.parametrize("count", [1, 100, 3000])
+def test_from_words_matches_sql_arithmetic(count):
+    pairs = random_pairs(count + 1, count)
+    bits = BloomFilter.bits_for(len(pairs))
+    from_sql = BloomFilter.from_words(bits, sql_bloom_words(bits, pairs))
+    assert from_sql.words == built_by_add(bits, pairs).words
+
+
+def test_might_contain_has_no_false_negatives():
+    pairs = random_pairs(12, 5000)
+    bits = BloomFilter.bits_for(len(pairs))
+    bloom = BloomFilter.from_words(bits, sql_bloom_words(bits, pairs))
+    assert all(bloom.might_contain(*pair) for pair in pairs)
+
+    others = random_pairs(13, 20000) - pairs
+    false_positives = sum(bloom.might_contain(*pair) for pair in others)
+    assert false_positives / len(others) < 0.03
+
+
+# ── FilteredRelationSet.settle ─────────────────────────────────────
+
+def make_filtered(existing, relation_type="synonym"):
+    """existing 为库中已有的有向词对；返回 (集合, pair_loader 调用记录)"""
+    bits = BloomFilter.bits_for(len(existing))
+    bloom = BloomFilter.from_words(bits, sql_bloom_words(bits, existing))
+    calls = []
+
+    def pair_loader(rt, pairs):
+        calls.append((rt, list(pairs)))
+        return [pair for pair in pairs if pair in existing]
+
+    def degree_loader(rt):
+        return dict(Counter(w for w, _ in existing)) if rt == relation_type else {}
+
+    relation_set = FilteredRelationSet(
+        {relation_type: bloom}, {relation_type: len(existing)}, degree_loader, pair_loader
+    )
+    return relation_set, bloom, calls
+
+
+def false_positives(bloom, existing, seed, count):
+    found = []
+    rng = random.Random(seed)
+    while len(found) < count:
+        pair = (rng.randrange(1, INT4_MAX), rng.randrange(1, INT4_MAX))
+        if pair not in existing and bloom.might_contain(*pair):
+            found.append(pair)
+    return found
+
+
+def test_settle_resolves_possible_hits():
+    existing = random_pairs(14, 500)
+    relation_set, bloom, calls = make_filtered(existing)
+    fakes = false_positives(bloom, existing, 15, 5)
+    real = sorted(existing)[:20]
+
+    for pair in real + fakes:
+        assert relation_set.lookup(*pair, "synonym") == POSSIBLE
+    relation_set.settle("synonym", real + fakes)
+
+    assert len(calls) == 1
+    assert sorted(calls[0][1]) == sorted(real + fakes)
+    for pair in real:
+        assert relation_set.lookup(*pair, "synonym") == PRESENT
+    for pair in fakes:
+        assert relation_set.lookup(*pair, "synonym") == ABSENT
+
+
+def test_settle_skips_absent_added_and_settled_pairs():
+    existing = random_pairs(16, 500)
+    relation_set, bloom, calls = make_filtered(existing)
+    absent = next(p for p in random_pairs(17, 1000) if not bloom.might_contain(*p))
+    real = sorted(existing)[:3]
+    added = sorted(existing)[3]
+    relation_set.add(*added, "synonym")
+
+    relation_set.settle("synonym", [absent, added, *real, real[0]])
+    assert len(calls) == 1
+    assert sorted(calls[0][1]) == sorted(real)
+
+    relation_set.settle("synonym", real)
+    relation_set.settle("synonym", [absent])
+    assert len(calls) == 1
+
+
+def test_settle_is_per_relation_type():
+    existing = random_pairs(18, 200)
+    relation_set, _, calls = make_filtered(existing)
+    pair = sorted(existing)[0]
+    relation_set.settle("antonym", [pair])
+    assert calls == []
+    assert relation_set.lookup(*pair, "antonym") == ABSENT
+
+
+def test_filtered_degrees_combine_loader_and_added():
+    existing = {(1, 2), (1, 3), (2, 1)}
+    relation_set, _, _ = make_filtered(existing)
+    relation_set.add(1, 4, "synonym")
+    relation_set.add(5, 1, "synonym")
+    assert relation_set.degrees("synonym") == {1: 3, 2: 1, 5: 1}
+
+
+def test_exact_set_settle_is_a_no_op():
+    relation_set = RelationSet.from_rows([(1, 2, "synonym")])
+    relation_set.settle("synonym", [(1, 2), (3, 4)])
+    assert relation_set.lookup(1, 2, "synonym") == PRESENT
+    assert relation_set.lookup(3, 4, "synonym") == ABSENT
+
+
+# ── _add_relation 在过滤器模式下与精确模式一致 ─────────────────────
+
+class _Generator(BaseGenerator):
+    relation_type = "synonym"
+
+    def generate(self, words, word_index, existing_relations, processed_word_ids):
+        return GenerationResult(stats={})
+
+
+def test_add_relation_counts_match_exact_mode():
+    existing_pairs = random_pairs(19, 300)
+    existing = existing_pairs | {(r, w) for w, r in existing_pairs}
+    filtered, bloom, _ = make_filtered(existing)
+    exact = RelationSet.from_rows((w, r, "synonym") for w, r in existing)
+
+    candidates = sorted(existing_pairs)[:50] + false_positives(bloom, existing, 20, 10)
+    candidates += sorted(random_pairs(21, 50) - existing)
+    candidates += candidates[:5]    # 重复出现的词对第二次视为已存在
+
+    results = {}
+    for name, relation_set in (("exact", exact), ("filtered", filtered)):
+        generator = _Generator(flush_threshold=10**6)
+        results[name] = [generator._add_relation(w, r, 0.9, relation_set) for w, r in candidates]
+        results[name + "_written"] = len(generator._pending_relations)
+    assert results["filtered"] == results["exact"]
+    assert results["filtered_written"] == results["exact_written"]
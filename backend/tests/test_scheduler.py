@@ -0,0 +1,226 @@
+"""scheduler 单元测试：排队顺序（用户轮转）、CPU 预算准入、排队位次的开始时间估计。
+
+纯函数部分以表格驱动；注册表部分用临时目录中的 SqliteTaskRegistry，
+确认多个进程（owner）共享队列时 admit 只返回调用方自己的任务。
+"""
+
+import math
+
+import pytest
+
+from backend.services.scheduler import (
+    QueuedJob,
+    RunningJob,
+    admit_within_budget,
+    estimate_starts,
+    fair_order,
+    job_slots,
+)
+from backend.services.task_registry import SqliteTaskRegistry
+
+
+def queued(run_id, user_id, queued_at, owner="", relation_type="synonym"):
+    return QueuedJob(run_id, user_id, relation_type, queued_at, owner)
+
+
+def running(run_id, user_id, remaining=None, owner=""):
+    return RunningJob(run_id, user_id, remaining, owner)
+
+
+def run_ids(jobs):
+    return [job.run_id for job in jobs]
+
+
+# ── fair_order ─────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize(
+    "jobs, active, served, expected",
+    [
+        # 同一用户内按入队时间，与传入顺序无关
+        (
+            [queued("a2", "a", 2.0), queued("a1", "a", 1.0), queued("a3", "a", 3.0)],
+            [], {},
+            ["a1", "a2", "a3"],
+        ),
+        # 一个用户先提交多个任务，不挤占后来的用户：按用户轮转
+        (
+            [queued("a1", "a", 1.0), queued("a2", "a", 2.0), queued("a3", "a", 3.0),
+             queued("b1", "b", 4.0), queued("c1", "c", 5.0), queued("b2", "b", 6.0)],
+            [], {},
+            ["a1", "b1", "c1", "a2", "b2", "a3"],
+        ),
+        # 执行中任务少的用户优先
+        (
+            [queued("a1", "a", 1.0), queued("b1", "b", 2.0)],
+            [running("ra", "a")], {},
+            ["b1", "a1"],
+        ),
+        # 负载相同时最久没有任务被准入的用户优先（没有记录视为最早）
+        (
+            [queued("a1", "a", 1.0), queued("b1", "b", 2.0), queued("c1", "c", 3.0)],
+            [], {"a": 20.0, "b": 10.0},
+            ["c1", "b1", "a1"],
+        ),
+        # 本轮已排过的用户视为刚被准入，排在同负载的其他用户之后
+        (
+            [queued("a1", "a", 1.0), queued("a2", "a", 2.0), queued("b1", "b", 3.0)],
+            [running("rb", "b")], {"b": 5.0},
+            ["a1", "b1", "a2"],
+        ),
+        ([], [running("ra", "a")], {}, []),
+    ],
+)
+def test_fair_order(jobs, active, served, expected):
+    assert run_ids(fair_order(jobs, active, served)) == expected
+
+
+# ── admit_within_budget ────────────────────────────────────────────────────
+
+@pytest.mark.parametrize(
+    "order, active, budget, pool_size, expected",
+    [
+        # 进程池按 owner 只计一次：首个任务 1 + 4，同进程后续任务各 1
+        (
+            [queued("q1", "a", 1.0, "p1"), queued("q2", "b", 2.0, "p1"),
+             queued("q3", "c", 3.0, "p1")],
+            [], 7, 4,
+            ["q1", "q2", "q3"],
+        ),
+        (
+            [queued("q1", "a", 1.0, "p1"), queued("q2", "b", 2.0, "p1"),
+             queued("q3", "c", 3.0, "p1")],
+            [], 6, 4,
+            ["q1", "q2"],
+        ),
+        # 已有执行中任务的进程不再计池：2 + 4 已占用，同进程任务只占 1
+        (
+            [queued("q1", "a", 1.0, "p1")],
+            [running("r1", "x", owner="p1"), running("r2", "y", owner="p1")], 7, 4,
+            ["q1"],
+        ),
+        # 另一进程需要自己的池：1 + 4 超出剩余预算
+        (
+            [queued("q1", "a", 1.0, "p2")],
+            [running("r1", "x", owner="p1"), running("r2", "y", owner="p1")], 10, 4,
+            [],
+        ),
+        (
+            [queued("q1", "a", 1.0, "p2")],
+            [running("r1", "x", owner="p1"), running("r2", "y", owner="p1")], 11, 4,
+            ["q1"],
+        ),
+        # 没有执行中任务时队首总能准入，即使超出预算
+        ([queued("q1", "a", 1.0, "p1"), queued("q2", "b", 2.0, "p1")], [], 1, 8, ["q1"]),
+        # 队首超出预算即停止，后面更便宜的任务不插队
+        (
+            [queued("q1", "a", 1.0, "p2"), queued("q2", "b", 2.0, "p1")],
+            [running("r1", "x", owner="p1")], 4, 2,
+            [],
+        ),
+        (
+            [queued("q1", "a", 1.0, "p1"), queued("q2", "b", 2.0, "p2"),
+             queued("q3", "c", 3.0, "p1")],
+            [], 5, 2,
+            ["q1"],
+        ),
+        # 没有进程池（GENERATION_WORKERS=0）时每个任务只占一个核
+        (
+            [queued("q1", "a", 1.0, "p1"), queued("q2", "b", 2.0, "p2"),
+             queued("q3", "c", 3.0, "p3")],
+            [running("r1", "x", owner="p4")], 3, 0,
+            ["q1", "q2"],
+        ),
+        ([], [], 4, 2, []),
+    ],
+)
+def test_admit_within_budget(order, active, budget, pool_size, expected):
+    assert run_ids(admit_within_budget(order, active, budget, pool_size)) == expected
+
+
+@pytest.mark.parametrize(
+    "budget, pool_size, expected",
+    [(8, 4, 4), (5, 4, 1), (4, 4, 1), (2, 8, 1), (3, 0, 3)],
+)
+def test_job_slots(budget, pool_size, expected):
+    assert job_slots(budget, pool_size) == expected
+
+
+# ── estimate_starts ────────────────────────────────────────────────────────
+
+DURATIONS = {"synonym": 10.0, "antonym": 4.0, "topic": None}
+
+
+@pytest.mark.parametrize(
+    "relation_types, remaining, slots, expected",
+    [
+        # 空位立即可用，之后按最早释放的空位依次排入
+        (["synonym", "synonym", "synonym"], [], 2, [0.0, 0.0, 10.0]),
+        (["antonym", "synonym", "antonym"], [3.0], 2, [0.0, 3.0, 4.0]),
+        # 执行中任务多于空位（预算刚调小）：取后 slots 个结束时间
+        (["antonym", "antonym"], [1.0, 5.0, 8.0], 2, [5.0, 8.0]),
+        # 执行中任务剩余时间未知：该空位无法估计
+        (["antonym", "antonym"], [None, 2.0], 2, [2.0, 6.0]),
+        (["antonym", "antonym"], [None], 1, [None, None]),
+        # 没有历史耗时的任务之后，同一空位上的任务无法估计
+        (["topic", "antonym", "antonym"], [], 1, [0.0, None, None]),
+        (["topic", "antonym", "antonym"], [], 2, [0.0, 0.0, 4.0]),
+    ],
+)
+def test_estimate_starts(relation_types, remaining, slots, expected):
+    order = [
+        queued(f"q{i}", f"u{i}", float(i), relation_type=rt)
+        for i, rt in enumerate(relation_types)
+    ]
+    active = [running(f"r{i}", "x", value) for i, value in enumerate(remaining)]
+    assert estimate_starts(order, active, slots, DURATIONS.get) == expected
+
+
+def test_estimate_starts_without_history():
+    order = [queued("q1", "a", 1.0), queued("q2", "b", 2.0)]
+    starts = estimate_starts(order, [running("r1", "x", math.inf)], 1, lambda rt: None)
+    assert starts == [None, None]
+
+
+# ── TaskRegistry.admit（多进程共享队列）────────────────────────────────────
+
+@pytest.fixture
+def registry(tmp_path):
+    return SqliteTaskRegistry(str(tmp_path / "tasks.sqlite3"))
+
+
+def claim(registry, user_id, owner, run_id, relation_type="synonym"):
+    assert registry.claim(
+        user_id, relation_type, [], owner, run_id, {"status": "running"}
+    )
+
+
+def test_admit_returns_only_callers_jobs(registry):
+    # 排队顺序 r1(p1) → r2(p2) → r3(p1)；预算足够全部准入
+    claim(registry, "u1", "p1", "r1")
+    claim(registry, "u2", "p2", "r2")
+    claim(registry, "u3", "p1", "r3")
+
+    assert registry.admit("p1", budget=10, pool_size=2) == ["r1", "r3"]
+    # 已准入的任务不再返回；p1 的池已计入，p2 的任务仍放得下
+    assert registry.admit("p1", budget=10, pool_size=2) == []
+    assert registry.admit("p2", budget=10, pool_size=2) == ["r2"]
+
+    state = registry.queue_state()
+    assert sorted((job.run_id, job.owner) for job in state.running) == [
+        ("r1", "p1"), ("r2", "p2"), ("r3", "p1"),
+    ]
+    assert state.queued == []
+
+
+def test_admit_waits_for_other_owners_head(registry):
+    # 队首属于 p1：p2 的任务即使放得下也不能越过它
+    claim(registry, "u1", "p1", "r1")
+    claim(registry, "u2", "p2", "r2")
+
+    assert registry.admit("p2", budget=4, pool_size=2) == []
+    assert registry.admit("p1", budget=4, pool_size=2) == ["r1"]
+    # r1 与 p1 的池占 3 个核，p2 的任务需要 1 + 2
+    assert registry.admit("p2", budget=4, pool_size=2) == []
+
+    registry.publish({"r1": {"status": "completed"}})
+    assert registry.admit("p2", budget=4, pool_size=2) == ["r2"]
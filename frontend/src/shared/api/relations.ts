@@ -25,6 +25,9 @@ export interface GenerationTaskStatus {
   saved: number
   skipped: number    // 因已生成过该类型关系而跳过的单词数
   error?: string
+  stage?: string | null  // 组合任务（relation_type = 'all'）当前执行的关系类型
+  queue_position?: number | null  // 排队中时的位次（从 1 开始），执行中为 null
+  eta?: number | null    // 预计剩余秒数（含排队时间），无法估计时为 null
 }
 
 export class RelationsApi {
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn 配置（在项目根目录启动时自动加载；命令行参数优先）
+
+GUNICORN_PRELOAD=1 启用预加载模式，降低每个 worker 的内存：
+- master 进程导入应用，并在 fork 前同步预热关系生成所需的共享数据
+  （生成器模块与 data.py 词表、WordNet reader、预编译词典/闭包表）；
+- 预热期间关闭 GC，fork 前 gc.freeze() 把这些长期对象移入永久代，
+  worker 内的 GC 不再扫描（从而不再改写）它们，页面以写时复制方式保持共享；
+- 每个 worker 启动后重新开启 GC，并丢弃从 master 继承的数据库连接池。
+生成数据只在 GENERATION_RUNNER=thread 时驻留 worker；默认的生成进程模式下
+master 只预加载应用代码（见 backend/services/job_runner.py）。
+
+注意：预加载模式下 SIGHUP（systemctl reload）只重启 worker、不会重新导入代码，
+部署新代码需 systemctl restart。
+内存对比：python scripts/benchmark_preload.py
+
+GUNICORN_ASGI=1 使用 uvicorn worker 运行 backend.asgi:app：进度 SSE 与 AI 对话流
+以协程运行，不再各占一个线程（见 backend/asgi.py）。命令行指定的应用需同时
+改为 backend.asgi:app（未指定时使用下面的 wsgi_app）。
+"""
+import gc
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# 配置先于应用加载，需自行读取 backend/.env（与 backend/__init__.py 相同）
+load_dotenv(Path(__file__).parent / "backend" / ".env")
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+if os.environ.get("GUNICORN_ASGI", "0") == "1":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "backend.asgi:app"
+
+if preload_app:
+    # master 中同步预热（见 when_ready），不启动后台预热线程：线程不会随 fork 延续
+    os.environ["GENERATION_WARMUP"] = "0"
+    # 避免预热过程中的回收在共享页面上留下空洞
+    gc.disable()
+
+
+def when_ready(server):
+    """master 就绪、首批 worker fork 之前"""
+    if not server.cfg.preload_app:
+        return
+    from backend.services.job_runner import GENERATION_RUNNER
+    if GENERATION_RUNNER == "thread":
+        # 生成进程模式下 worker 不持有生成数据，无需在 master 中预热
+        from backend.services.generation_service import generation_service
+        generation_service.warmup()
+    gc.freeze()
+    server.log.info(f"Preloaded generation state, {gc.get_freeze_count()} objects frozen")
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # master 此后新建的对象（如重启 worker 时）同样冻结
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    gc.enable()
+    # 连接池中的连接不能跨进程共享；close=False 只丢弃引用，不关闭 master 的连接
+    extensions = sys.modules.get("backend.extensions")
+    if extensions is not None:
+        extensions.engine.dispose(close=False)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+关系批量写入基准：逐行 VALUES 占位符（旧写法） vs unnest 数组参数（relation_writer）
+
+需要一个已应用 supabase/migrations 的本地 PostgreSQL（DATABASE_URL 指向它）。
+在连接内创建同结构的临时表（遮蔽同名正式表，不写入任何真实数据），
+按不同批大小写入相同的关系与生成日志（含重复行，覆盖 ON CONFLICT 路径），
+报告每秒写入行数、不同 SQL 文本数，并校验两种写法的最终表内容一致。
+
+用法：DATABASE_URL=postgresql://... python scripts/benchmark_relation_writer.py [--rows 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from backend.database.relation_writer import insert_relations, upsert_generation_logs
+from backend.extensions import engine
+from backend.generators.relation_store import RelationBuffer
+
+RELATION_TYPES = ["synonym", "antonym", "root", "confused", "topic"]
+
+
+def legacy_save(session, buffers, logs, user_id):
+    """旧写法：每批拼接 :u{i}, :w{i}, ... 命名占位符"""
+    BATCH_SIZE = 500
+    relations = [
+        {"word_id": w, "related_word_id": r, "relation_type": t, "confidence": c}
+        for buffer in buffers for w, r, t, c in buffer.rows()
+    ]
+    for offset in range(0, len(relations), BATCH_SIZE):
+        batch = relations[offset:offset + BATCH_SIZE]
+        values_parts = []
+        params = {}
+        for i, rel in enumerate(batch):
+            values_parts.append(f"(:u{i}, :w{i}, :r{i}, :t{i}, :c{i})")
+            params[f"u{i}"] = user_id
+            params[f"w{i}"] = rel["word_id"]
+            params[f"r{i}"] = rel["related_word_id"]
+            params[f"t{i}"] = rel["relation_type"]
+            params[f"c{i}"] = rel["confidence"]
+        session.execute(text(
+            "INSERT INTO words_relations "
+            "(user_id, word_id, related_word_id, relation_type, confidence) "
+            f"VALUES {', '.join(values_parts)} "
+            "ON CONFLICT (word_id, related_word_id, relation_type) DO NOTHING"
+        ), params)
+    for offset in range(0, len(logs), BATCH_SIZE):
+        batch = logs[offset:offset + BATCH_SIZE]
+        values_parts = []
+        params = {}
+        for i, log_entry in enumerate(batch):
+            values_parts.append(f"(:u{i}, :w{i}, :t{i}, :p{i}, :f{i})")
+            params[f"u{i}"] = user_id
+            params[f"w{i}"] = log_entry["word_id"]
+            params[f"t{i}"] = log_entry["relation_type"]
+            params[f"p{i}"] = log_entry["processed_at"]
+            params[f"f{i}"] = log_entry["found_count"]
+        session.execute(text(
+            "INSERT INTO relation_generation_log "
+            "(user_id, word_id, relation_type, processed_at, found_count) "
+            f"VALUES {', '.join(values_parts)} "
+            "ON CONFLICT (word_id, relation_type) "
+            "DO UPDATE SET processed_at = EXCLUDED.processed_at, "
+            "found_count = EXCLUDED.found_count"
+        ), params)
+
+
+def bulk_save(session, buffers, logs, user_id):
+    insert_relations(session, user_id, buffers)
+    upsert_generation_logs(session, user_id, logs)
+
+
+def make_batches(rows: int, batch_size: int):
+    """
+    模拟生成器的 flush：双向关系 + 每词一条日志，约 10% 的关系与之前的批次重复
+
+    每批为 [RelationBuffer, ...]（每种关系类型一个缓冲）与日志列表。
+    """
+    rnd = random.Random(0)
+    batches = []
+    produced = []
+    logged_word = 0
+    while sum(len(b) for buffers, _ in batches for b in buffers) < rows:
+        relations = {rt: RelationBuffer(rt) for rt in RELATION_TYPES}
+        count = 0
+        while count < batch_size:
+            if produced and rnd.random() < 0.1:
+                word_id, related_id, rt, confidence = rnd.choice(produced)
+                relations[rt].append(word_id, related_id, confidence)
+                count += 1
+                continue
+            word_id, related_id = rnd.randrange(1, 50000), rnd.randrange(1, 50000)
+            rt = rnd.choice(RELATION_TYPES)
+            confidence = round(rnd.random(), 2)
+            for a, b in ((word_id, related_id), (related_id, word_id)):
+                relations[rt].append(a, b, confidence)
+                produced.append((a, b, rt, confidence))
+                count += 1
+        logs = []
+        for _ in range(batch_size // 4):
+            logged_word += 1
+            logs.append({
+                "word_id": logged_word % 20000 + 1,
+                "relation_type": rnd.choice(RELATION_TYPES),
+                "processed_at": datetime(2026, 1, 1, 0, 0, logged_word % 60).isoformat(),
+                "found_count": rnd.randrange(10),
+            })
+        # 同一批内 (word_id, relation_type) 不能重复更新
+        logs = list({(e["word_id"], e["relation_type"]): e for e in logs}.values())
+        batches.append(([b for b in relations.values() if len(b)], logs))
+    return batches
+
+
+def run(save, batches, user_id) -> dict:
+    statements = set()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.add(statement)
+
+    with engine.connect() as conn:
+        for table in ("words_relations", "relation_generation_log"):
+            conn.execute(text(
+                f"CREATE TEMP TABLE {table} (LIKE public.{table} INCLUDING ALL)"
+            ))
+        conn.commit()
+
+        event.listen(conn, "before_cursor_execute", record)
+        session = Session(bind=conn)
+        rows = 0
+        started = time.perf_counter()
+        for buffers, logs in batches:
+            save(session, buffers, logs, user_id)
+            session.commit()
+            rows += sum(map(len, buffers)) + len(logs)
+        elapsed = time.perf_counter() - started
+        event.remove(conn, "before_cursor_execute", record)
+
+        contents = (
+            conn.execute(text(
+                "SELECT word_id, related_word_id, relation_type::text, confidence "
+                "FROM words_relations ORDER BY 1, 2, 3"
+            )).fetchall(),
+            conn.execute(text(
+                "SELECT word_id, relation_type::text, processed_at, found_count "
+                "FROM relation_generation_log ORDER BY 1, 2"
+            )).fetchall(),
+        )
+        session.close()
+        conn.execute(text("DROP TABLE pg_temp.words_relations, pg_temp.relation_generation_log"))
+        conn.commit()
+
+    return {
+        "rows_per_sec": rows / elapsed,
+        "elapsed_s": elapsed,
+        "statements": len(statements),
+        "contents": contents,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关系批量写入基准")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    user_id = str(uuid.uuid4())
+    print(f"关系批量写入基准（约 {args.rows} 行关系 / 写法）")
+    print(f"  {'batch':>6} {'写法':<8} {'rows/s':>10} {'耗时 s':>8} {'SQL 文本数':>10}")
+    for batch_size in (200, 1000, 5000):
+        batches = make_batches(args.rows, batch_size)
+        legacy = run(legacy_save, batches, user_id)
+        bulk = run(bulk_save, batches, user_id)
+        if legacy["contents"] != bulk["contents"]:
+            raise SystemExit(f"写入结果不一致（batch={batch_size}）")
+        for name, result in (("VALUES", legacy), ("unnest", bulk)):
+            print(
+                f"  {batch_size:>6} {name:<8} {result['rows_per_sec']:>10.0f} "
+                f"{result['elapsed_s']:>8.2f} {result['statements']:>10}"
+            )
+    print("  两种写法最终表内容一致")
+
+
+if __name__ == "__main__":
+    main()
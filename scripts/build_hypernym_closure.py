@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+构建 TopicGenerator 使用的 WordNet 上位词闭包表
+
+按 TopicGenerator.MAX_HYPERNYM_DEPTH / MIN_ANCESTOR_DEPTH 生成，写入 HYPERNYM_CLOSURE_DIR。
+已是最新（WordNet 版本、参数、排除集合均匹配）时跳过；--force 强制重建。
+
+用法：python scripts/build_hypernym_closure.py [--force]
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.generators.hypernym_closure import build_closure, closure_path, load_closure
+from backend.generators.topic_generator import TopicGenerator, _GENERIC_ANCESTORS
+from backend.generators.wordnet_utils import NLTK_AVAILABLE
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not NLTK_AVAILABLE:
+        print("nltk not available")
+        return 1
+
+    max_depth = TopicGenerator.MAX_HYPERNYM_DEPTH
+    min_depth = TopicGenerator.MIN_ANCESTOR_DEPTH
+    path = closure_path(max_depth, min_depth)
+
+    if "--force" not in sys.argv[1:] and load_closure(max_depth, min_depth, _GENERIC_ANCESTORS):
+        print(f"上位词闭包表已是最新: {path}")
+        return 0
+
+    count = build_closure(path, max_depth, min_depth, _GENERIC_ANCESTORS)
+    print(f"上位词闭包表已生成: {path}（{count} 个义项）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+编译同义/反义词典（WordNet 词元 + data.py 手工反义词表）
+
+写入 LEXICON_PATH。已是最新（WordNet 版本、data.py、词典格式均匹配）时跳过；--force 强制重建。
+
+用法：python scripts/build_lexicon.py [--force]
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.generators.lexicon import LEXICON_PATH, compile_lexicon, get_lexicon
+from backend.generators.wordnet_utils import NLTK_AVAILABLE
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not NLTK_AVAILABLE:
+        print("nltk not available")
+        return 1
+
+    if "--force" not in sys.argv[1:] and get_lexicon():
+        print(f"词典已是最新: {LEXICON_PATH}")
+        return 0
+
+    count = compile_lexicon(LEXICON_PATH)
+    print(f"词典已生成: {LEXICON_PATH}（{count} 个词条）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+构建 WordNet 索引快照（词元索引、卫星义项、词形变化例外表）
+
+写入 WORDNET_SNAPSHOT_PATH。已是最新（WordNet 版本、快照格式均匹配）时跳过；--force 强制重建。
+需在上位词闭包表、同义/反义词典之前运行，后两者构建时即可直接使用快照。
+
+用法：python scripts/build_wordnet_snapshot.py [--force]
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.generators.wordnet_utils import NLTK_AVAILABLE, wordnet_version
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not NLTK_AVAILABLE:
+        print("nltk not available")
+        return 1
+
+    from nltk.corpus import wordnet
+    from backend.generators.wordnet_snapshot import (
+        WORDNET_SNAPSHOT_PATH, build_snapshot, open_snapshot,
+    )
+
+    version = wordnet_version()
+    if "--force" not in sys.argv[1:] and open_snapshot(WORDNET_SNAPSHOT_PATH, version):
+        print(f"WordNet 快照已是最新: {WORDNET_SNAPSHOT_PATH}")
+        return 0
+
+    # 快照必须从 NLTK 原生 reader 导出
+    wordnet.ensure_loaded()
+    count = build_snapshot(wordnet, WORDNET_SNAPSHOT_PATH, version)
+    print(f"WordNet 快照已生成: {WORDNET_SNAPSHOT_PATH}（{count} 个词元）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+清理特征库中的旧版本特征
+
+特征库打开时不删除其他版本的行（部署期间新旧代码的进程可能同时运行）；
+部署重载完成后运行本脚本，只保留当前代码版本的特征。未配置 FEATURE_STORE_PATH 时跳过。
+
+用法：python scripts/prune_feature_store.py
+"""
+
+import sys
+import os
+import logging
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.generators.feature_store import FEATURE_STORE_PATH, get_feature_store
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = get_feature_store()
+    if store is None:
+        print("特征库未启用，跳过")
+        return 0
+
+    count = store.prune()
+    print(f"特征库已清理: {FEATURE_STORE_PATH}（删除 {count} 行旧版本特征，当前版本 {store.version}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())